@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS ISO Analysis Cache
+Remembers source ISO analyses in SQLite, so re-adding an ISO fills the
+component tree at once instead of analyzing it again
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from platform_utils import PlatformHelper
+from package_index import PackageIndex
+from iso_analysis import analyze_iso
+from iso9660 import SECTOR_SIZE
+
+# Bump when the stored analysis changes shape so old entries are ignored
+FORMAT_VERSION = 1
+
+# Volume descriptors live in sectors 16 onwards; their timestamps and volume id
+# change with every image build
+DESCRIPTOR_SPAN = (16 * SECTOR_SIZE, 8 * SECTOR_SIZE)
+SAMPLE_BLOCKS = 16
+SAMPLE_SIZE = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    format INTEGER NOT NULL,
+    info TEXT NOT NULL,
+    package_index TEXT,
+    created REAL,
+    used REAL
+);
+CREATE INDEX IF NOT EXISTS analyses_fingerprint ON analyses (fingerprint, size);
+"""
+
+
+def default_cache_path() -> Path:
+    return PlatformHelper.get_config_directory() / "analysis-cache.db"
+
+
+def image_fingerprint(path) -> str:
+    """
+    Identity of an image from its volume descriptors and evenly spaced samples
+
+    Reads about a megabyte however large the image is. Any rebuilt ISO has new
+    descriptors, and an image edited in place almost always changes a sample.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        fd = f.fileno()
+        size = os.fstat(fd).st_size
+        digest.update(str(size).encode())
+        digest.update(os.pread(fd, DESCRIPTOR_SPAN[1], DESCRIPTOR_SPAN[0]))
+        if size > SAMPLE_SIZE:
+            step = (size - SAMPLE_SIZE) // SAMPLE_BLOCKS
+            for i in range(SAMPLE_BLOCKS + 1):
+                digest.update(os.pread(fd, SAMPLE_SIZE, i * step))
+        else:
+            digest.update(os.pread(fd, size, 0))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Source ISO analyses keyed by path, size, mtime and a sampled fingerprint"""
+
+    def __init__(self, db_path: Path = None):
+        """
+        Initialize analysis cache
+
+        Args:
+            db_path: SQLite database (default: <config dir>/analysis-cache.db)
+        """
+        self.db_path = Path(db_path or default_cache_path())
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _identity(iso_path) -> Dict:
+        path = Path(iso_path).resolve()
+        st = path.stat()
+        return {'path': str(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                'fingerprint': image_fingerprint(path)}
+
+    def get(self, iso_path) -> Optional[Dict]:
+        """
+        Cached analysis of an ISO, or None if it is unknown or has changed
+
+        An ISO copied or renamed elsewhere is found by its fingerprint; one
+        rewritten in place (new mtime) is analyzed again.
+        """
+        try:
+            identity = self._identity(iso_path)
+        except OSError:
+            return None
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT * FROM analyses WHERE path = ? AND size = ? AND mtime_ns = ? "
+                "AND fingerprint = ? AND format = ?",
+                (identity['path'], identity['size'], identity['mtime_ns'],
+                 identity['fingerprint'], FORMAT_VERSION)
+            ).fetchone()
+            if row is None:
+                row = db.execute(
+                    "SELECT * FROM analyses WHERE fingerprint = ? AND size = ? AND format = ? "
+                    "AND path != ? ORDER BY used DESC LIMIT 1",
+                    (identity['fingerprint'], identity['size'], FORMAT_VERSION, identity['path'])
+                ).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE analyses SET used = ? WHERE path = ?", (time.time(), row['path']))
+
+        iso_info = json.loads(row['info'])
+        iso_info['path'] = str(iso_path)
+        iso_info['name'] = Path(iso_path).name
+        if row['package_index']:
+            try:
+                iso_info['package_index'] = PackageIndex(row['package_index'])
+                iso_info['base_packages'] = set(iso_info['base_packages'])
+            except (OSError, ValueError):
+                # The index was pruned; component sizes are still exact
+                iso_info.pop('base_packages', None)
+        return iso_info
+
+    def put(self, iso_path, iso_info: Dict):
+        """Store an analysis, replacing any older one for the same path"""
+        identity = self._identity(iso_path)
+        info = {key: value for key, value in iso_info.items() if key != 'package_index'}
+        index = iso_info.get('package_index')
+        if 'base_packages' in info:
+            info['base_packages'] = sorted(info['base_packages'])
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO analyses (path, size, mtime_ns, fingerprint, format, "
+                "info, package_index, created, used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (identity['path'], identity['size'], identity['mtime_ns'], identity['fingerprint'],
+                 FORMAT_VERSION, json.dumps(info), str(index.path) if index is not None else None,
+                 now, now)
+            )
+
+    def entries(self) -> List[Dict]:
+        """Cached analyses, most recently used first"""
+        with self._connect() as db:
+            rows = db.execute("SELECT path, size, fingerprint, created, used FROM analyses "
+                              "ORDER BY used DESC").fetchall()
+        return [dict(row) for row in rows]
+
+    def prune(self, keep: int = 100) -> int:
+        """Drop entries for images that are gone and all but the keep most recently used"""
+        removed = 0
+        with self._connect() as db:
+            rows = db.execute("SELECT path FROM analyses ORDER BY used DESC").fetchall()
+            for position, row in enumerate(rows):
+                if position >= keep or not os.path.exists(row['path']):
+                    db.execute("DELETE FROM analyses WHERE path = ?", (row['path'],))
+                    removed += 1
+        return removed
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute("DELETE FROM analyses")
+
+
+def analyze_cached(iso_path, progress_callback: Callable = None,
+                   cache: AnalysisCache = None, partial_callback: Callable = None) -> Dict:
+    """analyze_iso, answered from the cache when the image is unchanged"""
+    cache = cache or AnalysisCache()
+    iso_info = cache.get(iso_path)
+    if iso_info is not None:
+        return iso_info
+    iso_info = analyze_iso(iso_path, progress_callback, partial_callback=partial_callback)
+    cache.put(iso_path, iso_info)
+    return iso_info
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS ISO Analysis Cache - Inspect and prune cached ISO analyses'
+    )
+    parser.add_argument('--db', help='Cache database (default: <config dir>/analysis-cache.db)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('list', help='Show cached analyses')
+    prune = sub.add_parser('prune', help='Drop missing images and old entries')
+    prune.add_argument('--keep', type=int, default=100, help='Entries to keep')
+    sub.add_parser('clear', help='Drop every entry')
+    check = sub.add_parser('check', help='Tell whether an ISO is answered from the cache')
+    check.add_argument('image')
+
+    args = parser.parse_args()
+    cache = AnalysisCache(args.db)
+
+    if args.command == 'list':
+        for entry in cache.entries():
+            used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['used']))
+            print(f"{used}  {entry['size'] / 1024 ** 3:6.2f} GB  {entry['path']}")
+    elif args.command == 'prune':
+        print(f"✓ Removed {cache.prune(args.keep)} entries")
+    elif args.command == 'clear':
+        cache.clear()
+        print("✓ Cache cleared")
+    elif args.command == 'check':
+        start = time.perf_counter()
+        hit = cache.get(args.image) is not None
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"✓ Cached ({elapsed:.1f} ms)" if hit else f"⚠ Not cached ({elapsed:.1f} ms)")
+        return 0 if hit else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
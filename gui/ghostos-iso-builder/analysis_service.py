@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS ISO Analysis Service
+Analyzes many source ISOs side by side in worker processes, streaming partial
+results back as they are found
+"""
+
+import os
+import sys
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
+
+from package_index import PackageIndex
+
+# Event kinds, in the order a job reports them; every job ends with done or error
+EVENT_KINDS = ('progress', 'volume', 'packages', 'done', 'error')
+
+
+def _analyze_worker(job_id: int, iso_path: str, events, cache_db, use_cache: bool):
+    """Body of a worker process: analyze one ISO, reporting through its own events pipe"""
+    from iso_analysis import analyze_iso
+    from analysis_cache import AnalysisCache, analyze_cached
+
+    def send(kind, payload):
+        events.send((job_id, kind, payload))
+
+    try:
+        progress = lambda percent, message: send('progress', (percent, message))
+        if use_cache:
+            iso_info = analyze_cached(iso_path, progress, AnalysisCache(cache_db), send)
+        else:
+            iso_info = analyze_iso(iso_path, progress, partial_callback=send)
+        # The mapped index stays behind; the parent maps the same file
+        index = iso_info.pop('package_index', None)
+        if index is not None:
+            iso_info['package_index'] = str(index.path)
+            index.close()
+        send('done', iso_info)
+    except Exception as e:
+        send('error', str(e))
+    finally:
+        events.close()
+
+
+class AnalysisService:
+    """
+    Bounded pool of analysis processes
+
+    Every ISO gets its own short-lived process, at most max_workers at a time,
+    so parsing runs outside the GUI process and off its GIL. Each process
+    reports through a pipe of its own, so cancelling a running analysis can
+    terminate it mid-message without harming the other jobs. The service has
+    no thread of its own: the caller drives it with poll(), from a GUI timer
+    or a loop.
+    """
+
+    def __init__(self, max_workers: int = None, cache_db: Path = None, use_cache: bool = True):
+        """
+        Initialize analysis service
+
+        Args:
+            max_workers: Analyses running at the same time (default: CPU count)
+            cache_db: Analysis cache database (default: <config dir>/analysis-cache.db)
+            use_cache: Answer unchanged ISOs from the analysis cache
+        """
+        self.max_workers = max(1, max_workers or os.cpu_count() or 2)
+        self.cache_db = cache_db
+        self.use_cache = use_cache
+        # Workers start clean instead of inheriting the GUI's Qt state
+        self._context = multiprocessing.get_context('spawn')
+        self._queued = deque()
+        self._running: Dict[int, multiprocessing.Process] = {}
+        # Read end of each running job's events pipe
+        self._pipes: Dict[int, object] = {}
+        self._paths: Dict[int, str] = {}
+        self._next_id = 1
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._paths)
+
+    def submit(self, iso_path) -> int:
+        """Queue an ISO for analysis, returning its job id"""
+        job_id = self._next_id
+        self._next_id += 1
+        self._paths[job_id] = str(iso_path)
+        self._queued.append(job_id)
+        self._start_queued()
+        return job_id
+
+    def cancel(self, job: Union[int, str]) -> bool:
+        """Cancel a job by id or ISO path; a running analysis is terminated"""
+        ids = [job] if isinstance(job, int) else [
+            job_id for job_id, path in self._paths.items() if path == str(job)]
+        cancelled = False
+        for job_id in ids:
+            if self._paths.pop(job_id, None) is None:
+                continue
+            cancelled = True
+            if job_id in self._queued:
+                self._queued.remove(job_id)
+            self._finish(job_id, terminate=True)
+        self._start_queued()
+        return cancelled
+
+    def _start_queued(self):
+        while self._queued and len(self._running) < self.max_workers:
+            job_id = self._queued.popleft()
+            reader, writer = self._context.Pipe(duplex=False)
+            process = self._context.Process(
+                target=_analyze_worker,
+                args=(job_id, self._paths[job_id], writer, self.cache_db, self.use_cache),
+                name=f"iso-analysis-{job_id}", daemon=True
+            )
+            process.start()
+            # Only the worker holds the write end, so its exit reads as end of file
+            writer.close()
+            self._running[job_id] = process
+            self._pipes[job_id] = reader
+
+    def _finish(self, job_id: int, terminate: bool = False):
+        self._paths.pop(job_id, None)
+        process = self._running.pop(job_id, None)
+        if process is not None:
+            if terminate:
+                process.terminate()
+            process.join()
+        reader = self._pipes.pop(job_id, None)
+        if reader is not None:
+            reader.close()
+
+    def poll(self, timeout: float = 0.0) -> List[Tuple[int, str, str, object]]:
+        """
+        Events reported since the last poll, waiting up to timeout for the first
+
+        Returns:
+            (job_id, iso_path, kind, payload) tuples. progress carries
+            (percent, message), volume and packages a dict of the fields found
+            so far, done the full iso_info and error a message. Events of
+            cancelled jobs are dropped.
+        """
+        readers = {reader: job_id for job_id, reader in self._pipes.items()}
+        events = []
+        for reader in wait(list(readers), timeout) if readers else []:
+            job_id = readers[reader]
+            try:
+                while job_id in self._pipes and reader.poll():
+                    _, kind, payload = reader.recv()
+                    iso_path = self._paths[job_id]
+                    if kind == 'done':
+                        payload = self._restore(payload)
+                        self._finish(job_id)
+                    elif kind == 'error':
+                        self._finish(job_id)
+                    events.append((job_id, iso_path, kind, payload))
+            except EOFError:
+                # The worker died without a last word (killed, crashed interpreter)
+                iso_path = self._paths[job_id]
+                process = self._running[job_id]
+                process.join()
+                events.append((job_id, iso_path, 'error',
+                               f"Analysis process exited with code {process.exitcode}"))
+                self._finish(job_id)
+        self._start_queued()
+        return events
+
+    @staticmethod
+    def _restore(iso_info: Dict) -> Dict:
+        index_path = iso_info.pop('package_index', None)
+        if index_path:
+            try:
+                iso_info['package_index'] = PackageIndex(index_path)
+            except (OSError, ValueError):
+                iso_info.pop('base_packages', None)
+        return iso_info
+
+    def shutdown(self):
+        """Cancel everything still queued or running"""
+        for job_id in list(self._paths):
+            self.cancel(job_id)
+
+
+def analyze_many(iso_paths: List, max_workers: int = None, callback: Callable = None,
+                 **kwargs) -> Dict[str, Union[Dict, Exception]]:
+    """
+    Analyze several ISOs in parallel and wait for all of them
+
+    Args:
+        iso_paths: Source ISOs
+        max_workers: Analyses running at the same time
+        callback: Called with each (job_id, iso_path, kind, payload) event
+        **kwargs: Passed to AnalysisService
+
+    Returns:
+        ISO path to its iso_info, or to a RuntimeError if it failed
+    """
+    service = AnalysisService(max_workers, **kwargs)
+    results = {}
+    try:
+        for path in iso_paths:
+            service.submit(path)
+        while service.busy:
+            for event in service.poll(timeout=0.5):
+                if callback:
+                    callback(*event)
+                _, iso_path, kind, payload = event
+                if kind == 'done':
+                    results[iso_path] = payload
+                elif kind == 'error':
+                    results[iso_path] = RuntimeError(payload)
+    finally:
+        service.shutdown()
+    return results
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS ISO Analysis Service - Analyze several ISOs in parallel'
+    )
+    parser.add_argument('images', nargs='+', help='ISO images')
+    parser.add_argument('--workers', type=int, help='Analyses running at the same time')
+    parser.add_argument('--no-cache', action='store_true', help='Analyze even unchanged ISOs')
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    def report(job_id, iso_path, kind, payload):
+        name = Path(iso_path).name
+        if kind == 'volume':
+            print(f"[*] {name}: {payload['label']}")
+        elif kind == 'packages':
+            print(f"[*] {name}: {payload['live_packages']} live packages")
+        elif kind == 'done':
+            available = sum(component['available'] for category in payload['components'].values()
+                            for component in category.values())
+            print(f"✓ {name}: {available} components available")
+        elif kind == 'error':
+            print(f"✗ {name}: {payload}")
+
+    results = analyze_many(args.images, args.workers, report, use_cache=not args.no_cache)
+    failed = sum(isinstance(result, Exception) for result in results.values())
+    print(f"[*] Analyzed {len(results) - failed}/{len(results)} ISOs in "
+          f"{time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
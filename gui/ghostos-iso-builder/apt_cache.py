@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Shared APT Cache
+Host-side .deb archive and package list cache shared by all builds
+"""
+
+import sys
+import time
+import fcntl
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+from platform_utils import PlatformHelper
+
+
+class AptArchiveCache:
+    """
+    Package cache bind-mounted into every build chroot
+
+    Locking model:
+      - every build holds the prune lock *shared* while it uses the cache,
+        so installs can read .debs concurrently
+      - downloads additionally hold the download lock *exclusively*, because
+        apt's partial/ directory and archive lock cannot be shared
+      - pruning takes the prune lock *exclusively*, as it deletes files
+    """
+
+    CHROOT_ARCHIVES = "/var/cache/apt/archives"
+    CHROOT_LISTS = "var/lib/apt/lists"
+
+    DEFAULT_MAX_AGE_DAYS = 30
+    DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+    def __init__(self, cache_dir: str = None):
+        """
+        Initialize apt cache
+
+        Args:
+            cache_dir: Cache location (default: <data dir>/apt-cache)
+        """
+        self.cache_dir = Path(cache_dir or PlatformHelper.get_data_directory() / "apt-cache")
+        self.archives_dir = self.cache_dir / "archives"
+        self.lists_dir = self.cache_dir / "lists"
+        (self.archives_dir / "partial").mkdir(parents=True, exist_ok=True)
+        self.lists_dir.mkdir(parents=True, exist_ok=True)
+
+    def binds(self) -> list:
+        """Bind mounts for a ChrootSession"""
+        return [(str(self.archives_dir), self.CHROOT_ARCHIVES)]
+
+    @contextmanager
+    def _flock(self, name: str, mode: int):
+        lock_file = open(self.cache_dir / name, 'a')
+        try:
+            fcntl.flock(lock_file, mode)
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    @contextmanager
+    def using(self):
+        """Hold the cache open for reading; blocks pruning"""
+        with self._flock(".prune.lock", fcntl.LOCK_SH):
+            yield self
+
+    @contextmanager
+    def downloading(self):
+        """Serialize apt downloads into the shared archive directory"""
+        with self._flock(".download.lock", fcntl.LOCK_EX):
+            yield self
+
+    def seed_lists(self, rootfs_dir: Path):
+        """
+        Copy the shared package lists into a chroot
+
+        Each build keeps private lists so a concurrent 'apt-get update' elsewhere
+        cannot change package versions between its download and install steps.
+        Seeded lists turn the build's own update into cheap If-Modified-Since checks.
+        """
+        target = Path(rootfs_dir) / self.CHROOT_LISTS
+        target.mkdir(parents=True, exist_ok=True)
+        with self.downloading():
+            self._copy_lists(self.lists_dir, target)
+
+    def save_lists(self, rootfs_dir: Path):
+        """Publish a chroot's freshly updated lists back to the shared cache"""
+        with self.downloading():
+            self._copy_lists(Path(rootfs_dir) / self.CHROOT_LISTS, self.lists_dir)
+
+    def _copy_lists(self, source: Path, target: Path):
+        for entry in source.iterdir():
+            if entry.is_file() and entry.name != 'lock':
+                shutil.copy2(entry, target / entry.name)
+
+    def entries(self) -> List[Dict]:
+        """Cached .deb files, least recently used first"""
+        result = []
+        for deb in self.archives_dir.glob("*.deb"):
+            try:
+                st = deb.stat()
+            except OSError:
+                continue
+            result.append({
+                'path': deb,
+                'size': st.st_size,
+                'last_used': max(st.st_atime, st.st_mtime),
+            })
+        return sorted(result, key=lambda e: e['last_used'])
+
+    def total_size(self) -> int:
+        return sum(entry['size'] for entry in self.entries())
+
+    def prune(self, max_age_days: float = None, max_bytes: int = None,
+              blocking: bool = True) -> Dict:
+        """
+        Delete .debs older than max_age_days, then the least recently used
+        ones until the archive fits max_bytes
+
+        Args:
+            blocking: Wait for running builds; if False, skip pruning while busy
+
+        Returns:
+            Dict with 'removed' count and 'freed' bytes
+        """
+        max_age_days = self.DEFAULT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        max_bytes = self.DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+        stats = {'removed': 0, 'freed': 0}
+
+        mode = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            with self._flock(".prune.lock", mode):
+                entries = self.entries()
+                total = sum(entry['size'] for entry in entries)
+                cutoff = time.time() - max_age_days * 86400
+                for entry in entries:
+                    if entry['last_used'] >= cutoff and total <= max_bytes:
+                        break
+                    entry['path'].unlink(missing_ok=True)
+                    total -= entry['size']
+                    stats['removed'] += 1
+                    stats['freed'] += entry['size']
+        except BlockingIOError:
+            pass
+        return stats
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS APT Cache - Inspect and prune the shared package cache'
+    )
+    parser.add_argument('--cache-dir', help='Cache directory (default: user data dir)')
+    parser.add_argument('--prune', action='store_true', help='Prune by age and size')
+    parser.add_argument('--max-age-days', type=float, help='Drop packages unused for this long')
+    parser.add_argument('--max-size-gb', type=float, help='Shrink the archive to this size')
+
+    args = parser.parse_args()
+    cache = AptArchiveCache(args.cache_dir)
+
+    if args.prune:
+        max_bytes = int(args.max_size_gb * 1024 ** 3) if args.max_size_gb is not None else None
+        stats = cache.prune(args.max_age_days, max_bytes)
+        print(f"✓ Removed {stats['removed']} package(s), freed {stats['freed'] / 1024 ** 2:.1f} MB")
+        return 0
+
+    entries = cache.entries()
+    print(f"APT cache: {cache.cache_dir}")
+    print(f"  Packages: {len(entries)}")
+    print(f"  Size:     {sum(e['size'] for e in entries) / 1024 ** 3:.2f} GB")
+    print(f"  Lists:    {len(list(cache.lists_dir.iterdir()))} file(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
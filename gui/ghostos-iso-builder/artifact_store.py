@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Artifact Store
+Content-addressed store of finished ISOs: identical builds resolve to the
+existing image, and retention keeps the output directory bounded
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from build_checkpoints import builder_source_hash, tool_signature
+from iso_finalizer import CHECKSUM_SUFFIXES, compute_digests, write_checksum_files
+from iso_delta import DELTA_SUFFIX, INDEX_SUFFIX
+
+# Config sections that change how a build runs, not what it produces
+OPERATIONAL_KEYS = ('workspace', 'artifact_store', 'telemetry', 'resources', 'build_workers',
+                    'rootfs_cache', 'apt_cache', 'chroot', 'variant')
+
+
+def config_id(config: dict) -> str:
+    """Identity of a build config for retention, ignoring operational settings"""
+    relevant = {key: value for key, value in config.items() if key not in OPERATIONAL_KEYS}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ArtifactStore:
+    """ISO images keyed by the fingerprint of everything that went into them"""
+
+    # Bump when the ISO layout changes so old artifacts stop matching
+    FORMAT_VERSION = 1
+    DEFAULT_KEEP_PER_CONFIG = 3
+
+    def __init__(self, store_dir: Path, max_bytes: int = None,
+                 keep_per_config: int = None):
+        """
+        Initialize artifact store
+
+        Args:
+            store_dir: Store location; on the output directory's filesystem,
+                       ISOs are hardlinks rather than copies
+            max_bytes: Total size limit before least recently used artifacts go
+            keep_per_config: Newest artifacts kept per config (older builds of it go)
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.keep_per_config = (keep_per_config if keep_per_config is not None
+                                else self.DEFAULT_KEEP_PER_CONFIG)
+
+    @classmethod
+    def make_key(cls, stage_fingerprints: Dict[str, str], checksums: List[str] = None) -> str:
+        """Artifact key from the build's stage fingerprints, the builder and the ISO writer"""
+        identity = {
+            'format': cls.FORMAT_VERSION,
+            'builder': builder_source_hash(),
+            'stages': stage_fingerprints,
+            'checksums': sorted(checksums or []),
+            'tools': [tool_signature('xorriso')],
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+    def _paths(self, key: str):
+        image = self.store_dir / f"{key}.iso"
+        return image, image.with_suffix('.json')
+
+    def _read_meta(self, meta_file: Path) -> Optional[Dict]:
+        try:
+            return json.loads(meta_file.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta: Dict):
+        meta_file = self._paths(meta['key'])[1]
+        tmp = meta_file.with_name(f".{meta_file.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(meta, indent=2))
+        os.replace(tmp, meta_file)
+
+    @contextmanager
+    def _locked(self):
+        with open(self.store_dir / ".lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    @staticmethod
+    def _link(source: Path, target: Path):
+        """Hardlink source at target, or copy (reflink where possible) across filesystems"""
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(source, tmp)
+        except OSError:
+            shutil.copyfile(source, tmp)
+        os.replace(tmp, target)
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """Return artifact metadata for key, or None on a miss"""
+        image, meta_file = self._paths(key)
+        if not image.exists():
+            return None
+        return self._read_meta(meta_file)
+
+    def checkout(self, key: str, target: Path, algorithms: List[str] = None) -> Optional[Path]:
+        """
+        Place the artifact for key at target, with its checksum files
+
+        Returns:
+            target, or None on a miss
+        """
+        target = Path(target)
+        with self._locked():
+            meta = self.lookup(key)
+            if meta is None:
+                return None
+            image = self._paths(key)[0]
+            target.parent.mkdir(parents=True, exist_ok=True)
+            self._link(image, target)
+
+            digests = meta.get('digests', {})
+            missing = [name for name in algorithms or digests if name not in digests]
+            if missing:
+                digests.update(compute_digests(image, missing))
+            write_checksum_files(target, {name: digests[name] for name in algorithms or digests})
+
+            meta['digests'] = digests
+            meta['last_used'] = time.time()
+            meta['hits'] = meta.get('hits', 0) + 1
+            meta['links'] = sorted(set(meta.get('links', [])) | {str(target)})
+            self._write_meta(meta)
+        return target
+
+    def publish(self, key: str, image_path: Path, digests: Dict[str, str] = None,
+                config: dict = None) -> Dict:
+        """Record a freshly built ISO as the artifact for key, then apply retention"""
+        image_path = Path(image_path)
+        with self._locked():
+            image = self._paths(key)[0]
+            self._link(image_path, image)
+            now = time.time()
+            meta = {
+                'key': key,
+                'size': image.stat().st_size,
+                'config_id': config_id(config or {}),
+                'version': (config or {}).get('version'),
+                'digests': dict(digests or {}),
+                'created': now,
+                'last_used': now,
+                'hits': 0,
+                'links': [str(image_path)],
+            }
+            self._write_meta(meta)
+        self.prune()
+        return meta
+
+    def entries(self) -> List[Dict]:
+        """List artifacts, most recently used first"""
+        result = []
+        for meta_file in self.store_dir.glob("*.json"):
+            meta = self._read_meta(meta_file)
+            if meta and self._paths(meta['key'])[0].exists():
+                result.append(meta)
+        return sorted(result, key=lambda m: m.get('last_used', 0), reverse=True)
+
+    def total_size(self) -> int:
+        return sum(entry['size'] for entry in self.entries())
+
+    def remove(self, key: str):
+        """Drop an artifact together with the output ISOs that are links to it"""
+        image, meta_file = self._paths(key)
+        meta = self._read_meta(meta_file) or {}
+        for link in meta.get('links', []):
+            link = Path(link)
+            try:
+                # Only delete files that still are this artifact, not whatever replaced them
+                if not os.path.samefile(link, image):
+                    continue
+            except OSError:
+                continue
+            link.unlink()
+            for suffix in list(CHECKSUM_SUFFIXES.values()) + [INDEX_SUFFIX, DELTA_SUFFIX]:
+                link.with_name(link.name + suffix).unlink(missing_ok=True)
+        image.unlink(missing_ok=True)
+        meta_file.unlink(missing_ok=True)
+
+    def prune(self, max_bytes: int = None, keep_per_config: int = None) -> List[str]:
+        """
+        Apply retention: the newest keep_per_config artifacts of each config,
+        then least recently used first until the store fits max_bytes
+
+        Returns:
+            Keys removed
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        keep = self.keep_per_config if keep_per_config is None else keep_per_config
+        removed = []
+        with self._locked():
+            by_config: Dict[str, List[Dict]] = {}
+            for entry in self.entries():
+                by_config.setdefault(entry.get('config_id'), []).append(entry)
+            for entries in by_config.values():
+                entries.sort(key=lambda m: m.get('created', 0), reverse=True)
+                for entry in entries[keep:] if keep else []:
+                    self.remove(entry['key'])
+                    removed.append(entry['key'])
+
+            if max_bytes is not None:
+                total = 0
+                for entry in self.entries():
+                    total += entry['size']
+                    if total > max_bytes:
+                        self.remove(entry['key'])
+                        removed.append(entry['key'])
+
+            # Leftovers of interrupted publishes
+            for tmp in self.store_dir.glob(".*.tmp"):
+                tmp.unlink(missing_ok=True)
+        return removed
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Artifact Store - List and prune stored ISO builds'
+    )
+    parser.add_argument('--store-dir', default=str(Path.home() / "heckcheckos-ultimate" / ".artifacts"),
+                        help='Store directory (default: ~/heckcheckos-ultimate/.artifacts)')
+    parser.add_argument('--prune', action='store_true', help='Apply the retention policy now')
+    parser.add_argument('--keep', type=int, help='Artifacts kept per config when pruning')
+    parser.add_argument('--max-gb', type=float, help='Total size kept when pruning')
+    parser.add_argument('--remove', metavar='KEY', help='Remove one artifact by key (prefix allowed)')
+
+    args = parser.parse_args()
+    store = ArtifactStore(args.store_dir)
+
+    if args.remove:
+        matches = [e['key'] for e in store.entries() if e['key'].startswith(args.remove)]
+        if len(matches) != 1:
+            print(f"✗ Key prefix matches {len(matches)} artifacts")
+            return 1
+        with store._locked():
+            store.remove(matches[0])
+        print("✓ Removed 1 artifact")
+        return 0
+
+    if args.prune:
+        removed = store.prune(int(args.max_gb * 1024 ** 3) if args.max_gb is not None else None,
+                              args.keep)
+        print(f"✓ Removed {len(removed)} artifact(s)")
+        return 0
+
+    entries = store.entries()
+    print(f"ISO artifacts in {store.store_dir}:")
+    for entry in entries:
+        last_used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used']))
+        print(f"  {entry['key'][:12]}  {entry['size'] / 1024 ** 3:6.2f} GB  "
+              f"config {entry.get('config_id', '?')[:8]}  version {entry.get('version') or '?'}  "
+              f"hits={entry.get('hits', 0)}  links={len(entry.get('links', []))}  last used {last_used}")
+    print(f"Total: {store.total_size() / 1024 ** 3:.2f} GB in {len(entries)} artifact(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
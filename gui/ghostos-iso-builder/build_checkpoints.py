@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Build Checkpoints
+Fingerprints stage inputs so resumed builds skip unchanged stages
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import functools
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def path_signature(path) -> list:
+    """Cheap identity of a file or directory tree: paths, sizes and mtimes"""
+    path = Path(path)
+    if not path.exists():
+        return [str(path), None]
+    if not path.is_dir():
+        st = path.stat()
+        return [str(path), st.st_size, st.st_mtime_ns]
+
+    entries = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            try:
+                st = os.lstat(full)
+            except OSError:
+                continue
+            entries.append([os.path.relpath(full, path), st.st_size, st.st_mtime_ns])
+    return [str(path), entries]
+
+
+def tool_signature(tool: str) -> list:
+    """Identify the installed version of a build tool by its binary"""
+    location = shutil.which(tool)
+    if location is None:
+        return [tool, None]
+    st = os.stat(location)
+    return [tool, os.path.realpath(location), st.st_size, st.st_mtime_ns]
+
+
+@functools.lru_cache(maxsize=None)
+def builder_source_hash() -> str:
+    """
+    Digest of the builder's own modules
+
+    Config stages are described by code alone, and every stage's output
+    depends on the code that runs it, so a builder update must not reuse
+    checkpoints (or stored ISOs) made by the previous version.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).resolve().parent.glob('*.py')):
+        digest.update(path.name.encode() + b'\0')
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def stage_fingerprints(stages: Dict, dependencies: Dict[str, set], order: List[str],
+                       format_version: int = 1) -> Dict[str, str]:
+    """
+    Fingerprint every stage in dependency order
+
+    A stage fingerprint covers its own declared inputs, the builder's source
+    and the fingerprints of the stages it depends on, so a change invalidates
+    everything downstream.
+    """
+    fingerprints = {}
+    for name in order:
+        stage = stages[name]
+        identity = {
+            'format': format_version,
+            'builder': builder_source_hash(),
+            'stage': name,
+            'data': stage.fingerprint,
+            'files': [path_signature(p) for p in stage.input_files],
+            'tools': [tool_signature(t) for t in stage.tools],
+            'upstream': sorted(fingerprints[dep] for dep in dependencies[name]),
+        }
+        encoded = json.dumps(identity, sort_keys=True, default=str).encode()
+        fingerprints[name] = hashlib.sha256(encoded).hexdigest()
+    return fingerprints
+
+
+class StageCheckpoints:
+    """Completion markers for build stages, stored in a persistent workspace"""
+
+    # Bump when fingerprint contents change meaning
+    FORMAT_VERSION = 2
+
+    def __init__(self, checkpoint_dir: Path):
+        """
+        Initialize checkpoint store
+
+        Args:
+            checkpoint_dir: Directory holding one marker file per stage
+        """
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.fingerprints: Dict[str, str] = {}
+
+    def compute(self, stages: Dict, dependencies: Dict[str, set], order: List[str]) -> Dict[str, str]:
+        """Fingerprint every stage (see stage_fingerprints) and remember the result"""
+        self.fingerprints = stage_fingerprints(stages, dependencies, order, self.FORMAT_VERSION)
+        return self.fingerprints
+
+    def _marker(self, name: str) -> Path:
+        return self.checkpoint_dir / f"{name}.json"
+
+    def _read(self, name: str) -> Optional[Dict]:
+        try:
+            return json.loads(self._marker(name).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def is_current(self, stage) -> bool:
+        """True if the stage finished before with the same fingerprint"""
+        if not stage.checkpoint:
+            return False
+        marker = self._read(stage.name)
+        return bool(marker) and marker.get('fingerprint') is not None and \
+            marker.get('fingerprint') == self.fingerprints.get(stage.name)
+
+    def result(self, stage):
+        """Value the stage returned when it last completed"""
+        marker = self._read(stage.name)
+        return marker.get('result') if marker else None
+
+    def ran_before(self, stage) -> bool:
+        """True if the stage ran here before (finished or not) and is not current"""
+        return self._marker(stage.name).exists() and not self.is_current(stage)
+
+    def invalidate(self, stage):
+        """
+        Mark a stage as started before it runs
+
+        A crash cannot leave a stale marker, and the next build still knows
+        the stage left output behind (see ran_before). The previous result is
+        kept for the stage's undo.
+        """
+        marker = self._marker(stage.name)
+        if not stage.checkpoint:
+            marker.unlink(missing_ok=True)
+            return
+        tmp = marker.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'stage': stage.name, 'fingerprint': None,
+                                   'result': self.result(stage)}, indent=2, default=str))
+        os.replace(tmp, marker)
+
+    def record(self, stage, result=None):
+        """Mark a stage complete"""
+        if not stage.checkpoint:
+            return
+        marker = self._marker(stage.name)
+        tmp = marker.with_suffix('.tmp')
+        tmp.write_text(json.dumps({
+            'stage': stage.name,
+            'fingerprint': self.fingerprints.get(stage.name),
+            'result': result,
+        }, indent=2, default=str))
+        os.replace(tmp, marker)
@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Build Queue
+SQLite-backed queue of ISO builds, run by a pool of worker processes and
+driven over a local socket by the GUI and CLI
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import sqlite3
+import threading
+import subprocess
+import socketserver
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from platform_utils import PlatformHelper
+from mount_namespace import namespace_command
+from cgroup_governor import enter_governed_build, governed_build
+
+TERMINAL_STATES = ('done', 'failed', 'cancelled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    config TEXT NOT NULL,
+    output_dir TEXT,
+    workspace TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker INTEGER,
+    pid INTEGER,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    output TEXT,
+    error TEXT,
+    submitted REAL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, priority, id);
+"""
+
+
+def default_queue_dir() -> Path:
+    return PlatformHelper.get_data_directory() / "build-queue"
+
+
+class BuildQueue:
+    """Persistent job table shared by the server, its workers and the job processes"""
+
+    def __init__(self, db_path: Path = None):
+        """
+        Initialize build queue
+
+        Args:
+            db_path: SQLite database (default: <data dir>/build-queue/queue.db)
+        """
+        self.db_path = Path(db_path or default_queue_dir() / "queue.db")
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.log_dir = self.db_path.parent / "logs"
+        self.log_dir.mkdir(exist_ok=True)
+        with self._connect() as db:
+            # WAL lets job processes report progress while others read
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _job(row, with_config: bool = False) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        config = job.pop('config')
+        if with_config:
+            job['config'] = json.loads(config)
+        return job
+
+    def log_path(self, job_id: int) -> Path:
+        return self.log_dir / f"{job_id}.log"
+
+    def submit(self, config: dict, name: str = None, priority: int = 0,
+               output_dir: str = None) -> int:
+        """Queue a build config, returning its job id"""
+        from iso_builder_backend import ISOBuilder
+        # Jobs resuming the same persistent workspace must not run side by side
+        builder = ISOBuilder(config, output_dir)
+        workspace = str(builder.workspace_path) if builder.persistent_workspace else None
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO jobs (name, config, output_dir, workspace, priority, submitted) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, json.dumps(config), output_dir, workspace, priority, time.time())
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id: int, with_config: bool = False) -> Optional[Dict]:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row, with_config)
+
+    def jobs(self, limit: int = 100) -> List[Dict]:
+        """Most recent jobs first"""
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def claim(self, worker: int) -> Optional[Dict]:
+        """Atomically take the next runnable job for a worker"""
+        with self._transaction() as db:
+            busy = {row[0] for row in db.execute(
+                "SELECT workspace FROM jobs WHERE status = 'running' AND workspace IS NOT NULL")}
+            for row in db.execute("SELECT * FROM jobs WHERE status = 'queued' "
+                                  "ORDER BY priority DESC, id").fetchall():
+                if row['workspace'] in busy:
+                    continue
+                db.execute("UPDATE jobs SET status = 'running', worker = ?, started = ?, "
+                           "progress = 0, message = NULL WHERE id = ?",
+                           (worker, time.time(), row['id']))
+                return self._job(row, with_config=True)
+        return None
+
+    def set_pid(self, job_id: int, pid: int):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET pid = ? WHERE id = ?", (pid, job_id))
+
+    def update_progress(self, job_id: int, percent: float, message: str = None):
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND status = 'running'",
+                       (percent, message, job_id))
+
+    def finish(self, job_id: int, status: str, output=None, error: str = None) -> bool:
+        """Record a running job's outcome; False if it was cancelled meanwhile"""
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = ?, output = ?, error = ?, finished = ?, pid = NULL, "
+                "progress = CASE WHEN ? = 'done' THEN 100 ELSE progress END "
+                "WHERE id = ? AND status = 'running'",
+                (status, json.dumps(output) if output is not None else None, error,
+                 time.time(), status, job_id)
+            )
+            return cursor.rowcount > 0
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued or running job; a running job's worker stops its process"""
+        with self._connect() as db:
+            cursor = db.execute("UPDATE jobs SET status = 'cancelled', finished = ? "
+                                "WHERE id = ? AND status IN ('queued', 'running')",
+                                (time.time(), job_id))
+            return cursor.rowcount > 0
+
+    def recover(self) -> int:
+        """Requeue jobs left running by a server that died; persistent workspaces resume"""
+        with self._connect() as db:
+            cursor = db.execute("UPDATE jobs SET status = 'queued', worker = NULL, pid = NULL "
+                                "WHERE status = 'running'")
+            return cursor.rowcount
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line, one JSON response per line ('watch' streams)"""
+
+    def _send(self, message: dict):
+        self.wfile.write((json.dumps(message, default=str) + '\n').encode())
+        self.wfile.flush()
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get('cmd') == 'watch':
+                    self._watch(int(request['id']))
+                    return
+                self._send(dict(ok=True, **self.server.owner.handle(request)))
+            except (BrokenPipeError, ConnectionResetError):
+                return
+            except Exception as e:
+                self._send({'ok': False, 'error': str(e)})
+
+    def _watch(self, job_id: int):
+        queue = self.server.owner.queue
+        last = None
+        while True:
+            job = queue.get(job_id)
+            if job is None:
+                raise KeyError(f"No such job: {job_id}")
+            state = (job['status'], job['progress'], job['message'])
+            if state != last:
+                self._send({'ok': True, 'job': job})
+                last = state
+            if job['status'] in TERMINAL_STATES:
+                return
+            time.sleep(self.server.owner.POLL_INTERVAL)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class BuildQueueServer:
+    """
+    Runs queued builds on a pool of workers and serves the socket API
+
+    Each worker thread supervises one job process at a time. A job process
+    builds in its own workspace (ISOBuilder creates one per build) and writes
+    its progress straight into the queue database.
+    """
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, queue: BuildQueue, socket_path: Path = None, workers: int = 2):
+        """
+        Initialize build server
+
+        Args:
+            queue: Job database
+            socket_path: Unix socket to listen on (default: next to the database)
+            workers: Number of builds run at the same time
+        """
+        self.queue = queue
+        self.socket_path = Path(socket_path or queue.db_path.with_name("queue.sock"))
+        self.workers = workers
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def handle(self, request: dict) -> dict:
+        """Answer one socket request"""
+        cmd = request.get('cmd')
+        if cmd == 'submit':
+            job_id = self.queue.submit(request['config'], request.get('name'),
+                                       request.get('priority', 0), request.get('output_dir'))
+            self._wake.set()
+            return {'id': job_id}
+        if cmd == 'list':
+            return {'jobs': self.queue.jobs(request.get('limit', 100))}
+        if cmd == 'status':
+            job = self.queue.get(int(request['id']))
+            if job is None:
+                raise KeyError(f"No such job: {request['id']}")
+            return {'job': job}
+        if cmd == 'cancel':
+            return {'cancelled': self.queue.cancel(int(request['id']))}
+        raise ValueError(f"Unknown command: {cmd}")
+
+    def job_command(self, job: Dict) -> List[str]:
+        """
+        Command line of the process that runs one job
+
+        Every job gets its own mount namespace, so concurrent builds cannot see
+        or leak each other's chroot and overlay mounts.
+        """
+        cpus = max(1, (os.cpu_count() or 1) // self.workers)
+        return namespace_command([sys.executable, str(Path(__file__).resolve()),
+                                  '--db', str(self.queue.db_path),
+                                  'run', str(job['id']), '--cpus', str(cpus)])
+
+    def _run_job(self, job: Dict, worker: int):
+        print(f"[*] Worker {worker}: starting job {job['id']} ({job['name'] or 'unnamed'})")
+        # Resource limits per the job's 'resources' config (see cgroup_governor.py)
+        with governed_build(job['config'], f"job-{job['id']}") as env:
+            with open(self.queue.log_path(job['id']), 'ab') as log:
+                # Own session: cancelling kills the job and every tool it started
+                proc = subprocess.Popen(self.job_command(job), stdin=subprocess.DEVNULL,
+                                        stdout=log, stderr=subprocess.STDOUT,
+                                        start_new_session=True, env=dict(os.environ, **env))
+            self.queue.set_pid(job['id'], proc.pid)
+            while True:
+                try:
+                    proc.wait(timeout=1)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                if self._stopping.is_set() or self.queue.get(job['id'])['status'] == 'cancelled':
+                    # SIGTERM lets the job unmount and clean its workspace
+                    os.killpg(proc.pid, signal.SIGTERM)
+                    proc.wait()
+                    break
+        if self._stopping.is_set():
+            # Left 'running' on purpose: the next server start requeues it
+            return
+        if proc.returncode != 0 and self.queue.finish(
+                job['id'], 'failed', error=f"Build process exited with code {proc.returncode}"):
+            print(f"  ⚠ Job {job['id']} exited with code {proc.returncode}")
+        print(f"✓ Worker {worker}: job {job['id']} {self.queue.get(job['id'])['status']}")
+
+    def _supervise(self, worker: int):
+        while not self._stopping.is_set():
+            job = self.queue.claim(worker)
+            if job is None:
+                self._wake.wait(self.POLL_INTERVAL * 4)
+                self._wake.clear()
+                continue
+            try:
+                self._run_job(job, worker)
+            except Exception as e:
+                self.queue.finish(job['id'], 'failed', error=str(e))
+
+    def serve_forever(self):
+        """Run workers and the socket API until interrupted"""
+        requeued = self.queue.recover()
+        if requeued:
+            print(f"[*] Requeued {requeued} interrupted job(s)")
+
+        self.socket_path.unlink(missing_ok=True)
+        server = _UnixServer(str(self.socket_path), _RequestHandler)
+        server.owner = self
+        # Jobs run as the server's user (root), so only that user may submit them
+        os.chmod(self.socket_path, 0o600)
+
+        threads = [threading.Thread(target=self._supervise, args=(worker,),
+                                    name=f"build-worker-{worker}", daemon=True)
+                   for worker in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        print(f"✓ Build queue listening on {self.socket_path} with {self.workers} worker(s)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n[*] Stopping build queue...")
+        finally:
+            self._stopping.set()
+            self._wake.set()
+            server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+            for thread in threads:
+                thread.join()
+
+
+class BuildQueueClient:
+    """Talks to a running BuildQueueServer"""
+
+    def __init__(self, socket_path: Path = None):
+        """
+        Initialize client
+
+        Args:
+            socket_path: Server socket (default: <data dir>/build-queue/queue.sock)
+        """
+        self.socket_path = Path(socket_path or default_queue_dir() / "queue.sock")
+
+    def available(self) -> bool:
+        """True if a server is listening"""
+        try:
+            with self._connect():
+                return True
+        except OSError:
+            return False
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _stream(self, request: dict) -> Iterator[dict]:
+        with self._connect() as sock:
+            sock.sendall((json.dumps(request) + '\n').encode())
+            with sock.makefile('r') as reader:
+                for line in reader:
+                    response = json.loads(line)
+                    if not response.pop('ok'):
+                        raise RuntimeError(response['error'])
+                    yield response
+
+    def _request(self, request: dict) -> dict:
+        for response in self._stream(request):
+            return response
+        raise RuntimeError("Build queue closed the connection")
+
+    def submit(self, config: dict, name: str = None, priority: int = 0,
+               output_dir: str = None) -> int:
+        return self._request({'cmd': 'submit', 'config': config, 'name': name,
+                              'priority': priority, 'output_dir': output_dir})['id']
+
+    def jobs(self) -> List[Dict]:
+        return self._request({'cmd': 'list'})['jobs']
+
+    def status(self, job_id: int) -> Dict:
+        return self._request({'cmd': 'status', 'id': job_id})['job']
+
+    def cancel(self, job_id: int) -> bool:
+        return self._request({'cmd': 'cancel', 'id': job_id})['cancelled']
+
+    def watch(self, job_id: int) -> Iterator[Dict]:
+        """Yield the job each time its status or progress changes, until it ends"""
+        for response in self._stream({'cmd': 'watch', 'id': job_id}):
+            yield response['job']
+
+
+def run_job(queue: BuildQueue, job_id: int, cpus: int = None) -> int:
+    """Build one claimed job in this process, reporting progress to the queue"""
+    from variant_builds import run_build
+
+    # Turn SIGTERM (cancel, server shutdown) into an exception so cleanup runs
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    job = queue.get(job_id, with_config=True)
+    config = job['config']
+    if cpus:
+        # Keep concurrent builds from each starting one compressor thread per core
+        squashfs = dict(config.get('squashfs', {}))
+        squashfs.setdefault('processors', cpus)
+        config['squashfs'] = squashfs
+
+    last = [0.0, -1]
+
+    def progress_callback(percent, message=None):
+        # Tools can report many times a second; the database only needs a few
+        now = time.monotonic()
+        if int(percent) != last[1] or now - last[0] >= 1:
+            last[:] = [now, int(percent)]
+            queue.update_progress(job_id, percent, message)
+
+    try:
+        with enter_governed_build():
+            output = run_build(config, job['output_dir'], progress_callback)
+        if isinstance(output, dict):
+            output = {name: str(path) for name, path in output.items()}
+        else:
+            output = str(output)
+    except Exception as e:
+        print(f"✗ Build failed: {e}")
+        queue.finish(job_id, 'failed', error=str(e))
+        return 1
+    queue.finish(job_id, 'done', output=output)
+    print(f"✓ Build complete: {output}")
+    return 0
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Build Queue - Queue ISO builds and run them on a worker pool'
+    )
+    parser.add_argument('--db', help='Queue database (default: <data dir>/build-queue/queue.db)')
+    parser.add_argument('--socket', help='Server socket (default: next to the database)')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help='Run the queue server and its workers')
+    serve.add_argument('--workers', type=int, default=2, help='Builds run at the same time')
+
+    submit = sub.add_parser('submit', help='Queue a build config (JSON file)')
+    submit.add_argument('config')
+    submit.add_argument('--name', help='Job name')
+    submit.add_argument('--priority', type=int, default=0, help='Higher runs first')
+    submit.add_argument('--output-dir', help='Output directory for the ISO')
+    submit.add_argument('--watch', action='store_true', help='Follow the job until it ends')
+
+    sub.add_parser('list', help='Show recent jobs')
+    for name, text in (('watch', 'Follow a job until it ends'), ('cancel', 'Cancel a job')):
+        command = sub.add_parser(name, help=text)
+        command.add_argument('id', type=int)
+
+    # Started by the server for each job
+    run = sub.add_parser('run', help=argparse.SUPPRESS)
+    run.add_argument('id', type=int)
+    run.add_argument('--cpus', type=int)
+
+    args = parser.parse_args()
+    socket_path = args.socket or (Path(args.db).with_name("queue.sock") if args.db else None)
+
+    if args.command == 'serve':
+        BuildQueueServer(BuildQueue(args.db), socket_path, args.workers).serve_forever()
+        return 0
+    if args.command == 'run':
+        return run_job(BuildQueue(args.db), args.id, args.cpus)
+
+    client = BuildQueueClient(socket_path)
+    if args.command == 'submit':
+        with open(args.config) as f:
+            config = json.load(f)
+        job_id = client.submit(config, args.name or Path(args.config).stem,
+                               args.priority, args.output_dir)
+        print(f"✓ Queued job {job_id}")
+        if not args.watch:
+            return 0
+        args.id = job_id
+    elif args.command == 'list':
+        print(f"{'ID':>5} {'Status':<10} {'Progress':>8}  Name")
+        for job in client.jobs():
+            print(f"{job['id']:>5} {job['status']:<10} {job['progress']:>7.0f}%  {job['name'] or ''}")
+        return 0
+    elif args.command == 'cancel':
+        print("✓ Cancelled" if client.cancel(args.id) else "⚠ Job already finished")
+        return 0
+
+    job = None
+    for job in client.watch(args.id):
+        print(f"[{job['progress']:3.0f}%] {job['status']}: {job['message'] or ''}")
+    if job and job['status'] == 'done':
+        print(f"✓ Output: {json.loads(job['output'])}")
+        return 0
+    if job and job['error']:
+        print(f"✗ {job['error']}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
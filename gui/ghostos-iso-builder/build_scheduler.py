@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Build Scheduler
+Runs ISO build stages as a dependency graph on a worker pool
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class BuildStage:
+    """A named unit of build work with declared inputs and outputs"""
+
+    def __init__(self, name: str, func: Callable, inputs: Iterable[str] = (),
+                 outputs: Iterable[str] = (), weight: float = 1.0,
+                 description: str = None, fingerprint=None,
+                 input_files: Iterable = (), tools: Iterable[str] = (),
+                 checkpoint: bool = True, undo: Callable = None):
+        """
+        Initialize build stage
+
+        Args:
+            name: Unique stage name
+            func: Callable taking a stage-local progress callback (percent, message)
+            inputs: Resources this stage reads; it runs after their producers
+            outputs: Resources this stage produces
+            weight: Relative expected duration, used for overall progress
+            description: Human readable progress message
+            fingerprint: JSON-serializable config subset the stage depends on
+            input_files: Host files or directories the stage reads
+            tools: Host tools whose version affects the stage output
+            checkpoint: Whether a completed run may be reused by later builds
+            undo: Called with the result of the stage's previous run before it
+                  runs again in the same workspace, for stages that must not
+                  run on top of their own old output
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.weight = weight
+        self.description = description or name
+        self.fingerprint = fingerprint
+        self.input_files = list(input_files)
+        self.tools = list(tools)
+        self.checkpoint = checkpoint
+        self.undo = undo
+
+    def __repr__(self):
+        return f"BuildStage({self.name!r})"
+
+
+class StageScheduler:
+    """Executes build stages concurrently while honouring their dependencies"""
+
+    def __init__(self, stages: List[BuildStage], max_workers: int = None,
+                 progress_callback: Callable = None):
+        """
+        Initialize scheduler
+
+        Args:
+            stages: Stages forming the build graph
+            max_workers: Worker pool size (default: min(4, CPU count))
+            progress_callback: Called with (overall percent, message)
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate build stage names")
+
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.progress_callback = progress_callback
+        self.dependencies = self._resolve_dependencies()
+        self.order = self._topological_order()
+
+        self._lock = threading.Lock()
+        self._fractions: Dict[str, float] = {}
+        # Stage return values, shared with stages that consume them
+        self.results: Dict[str, object] = {}
+        # Stages that actually ran (as opposed to being reused from a checkpoint)
+        self.executed = set()
+
+    def _resolve_dependencies(self) -> Dict[str, set]:
+        """Map each stage to the set of stages producing its inputs"""
+        producers = {}
+        for stage in self.stages.values():
+            for resource in stage.outputs:
+                if resource in producers:
+                    raise ValueError(
+                        f"Resource '{resource}' produced by both "
+                        f"'{producers[resource]}' and '{stage.name}'"
+                    )
+                producers[resource] = stage.name
+
+        dependencies = {}
+        for stage in self.stages.values():
+            deps = set()
+            for resource in stage.inputs:
+                if resource not in producers:
+                    raise ValueError(f"Stage '{stage.name}' needs unknown resource '{resource}'")
+                deps.add(producers[resource])
+            deps.discard(stage.name)
+            dependencies[stage.name] = deps
+        return dependencies
+
+    def _topological_order(self) -> List[str]:
+        """Order stages so every stage follows its dependencies"""
+        order = []
+        remaining = {name: set(deps) for name, deps in self.dependencies.items()}
+        while remaining:
+            ready = sorted(name for name, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages: {', '.join(sorted(remaining))}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def overall_percent(self) -> int:
+        """Weighted completion of the whole graph"""
+        total = sum(stage.weight for stage in self.stages.values()) or 1
+        with self._lock:
+            done = sum(self.stages[name].weight * fraction
+                       for name, fraction in self._fractions.items())
+        return min(100, int(done * 100 / total))
+
+    def _set_fraction(self, name: str, fraction: float):
+        with self._lock:
+            # Never let a stage move progress backwards
+            self._fractions[name] = max(self._fractions.get(name, 0.0), min(1.0, fraction))
+
+    def _report(self, message: str):
+        if self.progress_callback:
+            self.progress_callback(self.overall_percent(), message)
+
+    def _stage_progress(self, stage: BuildStage) -> Callable:
+        """Build the stage-local progress callback handed to a stage"""
+        def report(percent, message=None):
+            self._set_fraction(stage.name, percent / 100.0)
+            self._report(message or stage.description)
+        return report
+
+    def _run_stage(self, stage: BuildStage, checkpoints):
+        self._report(stage.description)
+        if checkpoints:
+            if stage.undo and checkpoints.ran_before(stage):
+                stage.undo(checkpoints.result(stage))
+            checkpoints.invalidate(stage)
+        result = stage.func(self._stage_progress(stage))
+        self.results[stage.name] = result
+        if checkpoints:
+            checkpoints.record(stage, result)
+        self._set_fraction(stage.name, 1.0)
+
+    def _reusable(self, name: str, checkpoints) -> bool:
+        """A stage is reused only if it is current and nothing upstream re-ran"""
+        if checkpoints is None or self.dependencies[name] & self.executed:
+            return False
+        return checkpoints.is_current(self.stages[name])
+
+    def run(self, checkpoints=None):
+        """
+        Run every stage, starting each as soon as its dependencies finish
+
+        Args:
+            checkpoints: Optional StageCheckpoints; current stages are skipped
+                         and their recorded results reused
+
+        Raises:
+            The first exception raised by any stage, after running stages drain
+        """
+        pending = list(self.order)
+        completed = set()
+        running = {}
+        error: Optional[BaseException] = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers,
+                                thread_name_prefix="build-stage") as pool:
+            while pending or running:
+                if error is None:
+                    ready = [name for name in pending if self.dependencies[name] <= completed]
+                    # Longest stages first so they overlap with the short ones
+                    ready.sort(key=lambda name: self.stages[name].weight, reverse=True)
+                    for name in ready:
+                        pending.remove(name)
+                        stage = self.stages[name]
+                        if self._reusable(name, checkpoints):
+                            self.results[name] = checkpoints.result(stage)
+                            self._set_fraction(name, 1.0)
+                            completed.add(name)
+                            self._report(f"Up to date: {stage.description}")
+                            continue
+                        self.executed.add(name)
+                        running[pool.submit(self._run_stage, stage, checkpoints)] = name
+
+                    # Reused stages may have unblocked others
+                    if any(self.dependencies[name] <= completed for name in pending):
+                        continue
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    exc = future.exception()
+                    if exc is not None:
+                        if error is None:
+                            error = exc
+                    else:
+                        completed.add(name)
+
+        if error is not None:
+            raise error
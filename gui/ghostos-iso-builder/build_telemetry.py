@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Build Telemetry
+Per-stage timing, resource usage and subprocess records as JSON lines
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import threading
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# The stage record of the stage running on this thread, if any
+_local = threading.local()
+
+
+def record_command(cmd, returncode, seconds: float):
+    """Attribute a finished subprocess to the stage running on this thread, if any"""
+    record = getattr(_local, 'stage', None)
+    if record is not None:
+        record['commands'].append({
+            'cmd': [str(part) for part in cmd] if isinstance(cmd, (list, tuple)) else str(cmd),
+            'returncode': returncode,
+            'seconds': round(seconds, 3),
+        })
+
+
+def in_stage(func: Callable) -> Callable:
+    """
+    Bind func to the stage running on this thread
+
+    Worker threads do not see the stage of the thread that started them; wrap
+    what a stage hands to a thread pool so its subprocesses are still recorded.
+    """
+    record = getattr(_local, 'stage', None)
+
+    def run(*args, **kwargs):
+        previous = getattr(_local, 'stage', None)
+        _local.stage = record
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.stage = previous
+    return run
+
+
+def run_command(cmd, *args, **kwargs) -> subprocess.CompletedProcess:
+    """
+    Drop-in subprocess.run that records the command in the calling thread's stage
+
+    Outside a telemetry stage it behaves exactly like subprocess.run.
+    """
+    start = time.monotonic()
+    returncode = None
+    try:
+        result = subprocess.run(cmd, *args, **kwargs)
+        returncode = result.returncode
+        return result
+    except subprocess.CalledProcessError as e:
+        returncode = e.returncode
+        raise
+    finally:
+        record_command(cmd, returncode, time.monotonic() - start)
+
+
+def tree_bytes(path) -> int:
+    """Allocated size of a directory tree"""
+    total = 0
+    stack = [str(path)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                total += st.st_blocks * 512
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return total
+
+
+class BuildTelemetry:
+    """
+    Records stage start/end events for one build into a JSON lines file
+
+    Child CPU time comes from getrusage(RUSAGE_CHILDREN) and disk usage from
+    the watched directories. Both are process-wide, so stages that overlap on
+    the worker pool share each other's numbers; the subprocess list of each
+    stage is exact. Child max RSS is a peak over the process's whole life, so
+    it is reported once, at the end of the build.
+    """
+
+    def __init__(self, log_path: Path, watch_dirs: Dict[str, Path] = None,
+                 measure_disk: bool = True):
+        """
+        Initialize telemetry
+
+        Args:
+            log_path: JSON lines file to append events to
+            watch_dirs: Named directories whose growth is attributed to stages
+            measure_disk: Walk watch_dirs around every stage (costs a few seconds per build)
+        """
+        self.log_path = Path(log_path)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self.watch_dirs = dict(watch_dirs or {})
+        self.measure_disk = measure_disk
+        self._lock = threading.Lock()
+        self._build_start = time.monotonic()
+
+    def emit(self, event: str, **fields):
+        """Append one event line"""
+        fields = dict(event=event, time=round(time.time(), 3), **fields)
+        with self._lock:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(fields, default=str) + '\n')
+
+    def _disk_usage(self) -> Dict[str, int]:
+        if not self.measure_disk:
+            return {}
+        return {name: tree_bytes(path) for name, path in self.watch_dirs.items()}
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """Wrap a stage function so its run is recorded"""
+        def run(progress):
+            record = {'commands': []}
+            disk_before = self._disk_usage()
+            usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+            start = time.monotonic()
+            self.emit('stage_start', stage=name)
+            _local.stage = record
+            status = 'failed'
+            try:
+                result = func(progress)
+                status = 'ok'
+                return result
+            finally:
+                _local.stage = None
+                usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+                disk_after = self._disk_usage()
+                self.emit(
+                    'stage_end', stage=name, status=status,
+                    wall_seconds=round(time.monotonic() - start, 3),
+                    child_cpu_seconds=round(
+                        (usage_after.ru_utime - usage_before.ru_utime) +
+                        (usage_after.ru_stime - usage_before.ru_stime), 3),
+                    bytes_written={key: disk_after[key] - disk_before.get(key, 0)
+                                   for key in disk_after},
+                    commands=record['commands'],
+                )
+        return run
+
+    def build_start(self, **fields):
+        self._build_start = time.monotonic()
+        self.emit('build_start', **fields)
+
+    def build_end(self, status: str, reused: List[str] = ()):
+        for name in reused:
+            self.emit('stage_end', stage=name, status='reused', wall_seconds=0.0)
+        self.emit('build_end', status=status,
+                  wall_seconds=round(time.monotonic() - self._build_start, 3),
+                  # Largest child of the builder process so far, not of this build alone
+                  cumulative_child_peak_rss_kb=resource.getrusage(
+                      resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def load_events(log_path) -> List[Dict]:
+    events = []
+    with open(log_path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    return events
+
+
+def stage_summary(events: List[Dict]) -> Dict[str, Dict]:
+    """Last stage_end record per stage, plus the build total under '(total)'"""
+    summary = {}
+    for event in events:
+        if event['event'] == 'stage_end':
+            summary[event['stage']] = event
+        elif event['event'] == 'build_end':
+            summary['(total)'] = event
+    return summary
+
+
+def _failed_commands(record: Dict) -> int:
+    return sum(1 for c in record.get('commands', []) if c['returncode'] not in (0, None))
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Build Telemetry - Summarize one build or compare two'
+    )
+    parser.add_argument('logs', nargs='+', metavar='LOG', help='*.telemetry.jsonl file(s)')
+
+    args = parser.parse_args()
+    if len(args.logs) > 2:
+        parser.error("give one log to summarize or two to compare")
+
+    if len(args.logs) == 1:
+        summary = stage_summary(load_events(args.logs[0]))
+        print(f"{'Stage':<16} {'Status':<8} {'Wall (s)':>9} {'CPU (s)':>8} {'Written (MB)':>13} {'Cmds':>5}")
+        for name, record in summary.items():
+            written = sum((record.get('bytes_written') or {}).values()) / 1024 ** 2
+            print(f"{name:<16} {record.get('status', ''):<8} {record.get('wall_seconds', 0):>9.1f} "
+                  f"{record.get('child_cpu_seconds', 0):>8.1f} {written:>13.1f} "
+                  f"{len(record.get('commands', [])):>5}")
+        return 0
+
+    before = stage_summary(load_events(args.logs[0]))
+    after = stage_summary(load_events(args.logs[1]))
+    rows = []
+    for name in list(before) + [n for n in after if n not in before]:
+        old = before.get(name, {}).get('wall_seconds', 0.0)
+        new = after.get(name, {}).get('wall_seconds', 0.0)
+        rows.append((name, old, new, new - old, _failed_commands(after.get(name, {}))))
+
+    print(f"{'Stage':<16} {'Before (s)':>10} {'After (s)':>10} {'Change':>9}")
+    # Biggest regressions first; the build total stays at the bottom
+    rows.sort(key=lambda row: (row[0] == '(total)', -row[3]))
+    for name, old, new, delta, failed in rows:
+        note = f"  ⚠ {failed} failed command(s)" if failed else ""
+        print(f"{name:<16} {old:>10.1f} {new:>10.1f} {delta:>+9.1f}{note}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
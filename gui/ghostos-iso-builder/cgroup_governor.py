@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Cgroup Governor
+Per-build cgroup v2 groups with CPU, memory and IO limits, and reports of the
+throttling and OOM events they cause
+"""
+
+import os
+import sys
+import errno
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+# A build process moves itself into the group named here before doing any work
+CGROUP_ENV = "HECKCHECKOS_CGROUP"
+
+CONTROLLERS = ('cpu', 'memory', 'io')
+
+# Builds yield to the desktop and the GUI (default weight 100) unless configured otherwise
+DEFAULT_LIMITS = {
+    'enabled': True,
+    'cpu_weight': 50,
+    'cpu_max': None,
+    'memory_max': None,
+    'memory_high': None,
+    'swap_max': None,
+    'io_weight': 50,
+    'io_max': None,
+    'io_device': None,
+}
+
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(value) -> str:
+    """'8G', '512M', 1048576 or 'max' as the byte string cgroup files expect"""
+    if value is None or str(value) == 'max':
+        return 'max'
+    text = str(value).strip().upper().rstrip('B')
+    if text and text[-1] in SIZE_SUFFIXES:
+        return str(int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]]))
+    return str(int(text))
+
+
+def cgroup2_mount() -> Optional[Path]:
+    """Mount point of the cgroup v2 hierarchy, or None"""
+    try:
+        with open('/proc/self/mounts') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[2] == 'cgroup2':
+                    return Path(fields[1])
+    except OSError:
+        pass
+    return None
+
+
+def current_cgroup() -> Optional[str]:
+    """This process's cgroup v2 path, relative to the hierarchy root"""
+    try:
+        with open('/proc/self/cgroup') as f:
+            for line in f:
+                if line.startswith('0::'):
+                    return line[3:].strip()
+    except OSError:
+        pass
+    return None
+
+
+def block_device(path) -> str:
+    """MAJ:MIN of the whole disk holding path (io.max does not take partitions)"""
+    dev = os.stat(path).st_dev
+    number = f"{os.major(dev)}:{os.minor(dev)}"
+    sys_dir = Path('/sys/dev/block') / number
+    if (sys_dir / 'partition').exists():
+        return (sys_dir.resolve().parent / 'dev').read_text().strip()
+    return number
+
+
+class CgroupGovernor:
+    """
+    One build's cgroup v2 group
+
+    The build server (or GUI) creates the group and removes it once the build
+    exits; the build process enters the group itself, before it starts any
+    tool, so every process of the build is covered.
+    """
+
+    SUPERVISOR_GROUP = "heckcheckos-supervisor"
+    GROUP_PREFIX = "heckcheckos-build-"
+
+    # Groups this process created and has not removed yet
+    _active = set()
+    _active_lock = threading.Lock()
+
+    def __init__(self, path: Path, limits: Dict = None):
+        """
+        Initialize governor
+
+        Args:
+            path: Directory of the group in the cgroup v2 hierarchy
+            limits: 'resources' build config (see DEFAULT_LIMITS)
+        """
+        self.path = Path(path)
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+
+    @classmethod
+    def for_build(cls, config: dict, name: str, work_dir: Path = None) -> Optional['CgroupGovernor']:
+        """
+        Create the group for a build per its 'resources' config
+
+        Returns:
+            Governor of the new group, or None if limits are off or unsupported here
+        """
+        limits = dict(DEFAULT_LIMITS, **config.get('resources', {}))
+        if not limits['enabled'] or os.geteuid() != 0:
+            return None
+        mount, current = cgroup2_mount(), current_cgroup()
+        if mount is None or current is None:
+            print("  ⚠ No cgroup v2 hierarchy, building without resource limits")
+            return None
+        parent = mount / current.lstrip('/')
+        if parent.name == cls.SUPERVISOR_GROUP:
+            # An earlier build moved us into the leaf (see _delegate); its
+            # parent is still where build groups belong
+            parent = parent.parent
+        try:
+            cls._delegate(parent)
+        except OSError as e:
+            print(f"  ⚠ Cannot enable cgroup controllers in {parent} ({e}), building without resource limits")
+            return None
+
+        cls._sweep(parent)
+
+        # Named after the creating process, so other supervisors can tell
+        # whether the group is still in use
+        governor = cls(parent / f"{cls.GROUP_PREFIX}{os.getpid()}-{name}", limits)
+        with cls._active_lock:
+            governor.path.mkdir(exist_ok=True)
+            cls._active.add(governor.path)
+        workspace = config.get('workspace', {})
+        governor.apply(work_dir or Path(workspace.get('base_dir') or tempfile.gettempdir()))
+        return governor
+
+    @classmethod
+    def _sweep(cls, parent: Path):
+        """
+        Remove groups still busy with a background cleanup when their build ended
+
+        Only groups whose owner is gone, or which this process created and has
+        since given up on, are touched: an empty group may belong to another
+        supervisor whose build has not entered it yet.
+        """
+        with cls._active_lock:
+            for stale in parent.glob(f"{cls.GROUP_PREFIX}*"):
+                owner = stale.name[len(cls.GROUP_PREFIX):].split('-', 1)[0]
+                if not owner.isdigit():
+                    continue
+                if int(owner) == os.getpid():
+                    if stale in cls._active:
+                        continue
+                elif cls._alive(int(owner)):
+                    continue
+                try:
+                    stale.rmdir()
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    @classmethod
+    def _delegate(cls, parent: Path):
+        """Enable the controllers for child groups of parent"""
+        available = set((parent / 'cgroup.controllers').read_text().split())
+        missing = [c for c in CONTROLLERS if c not in available]
+        if missing:
+            raise OSError(errno.ENOTSUP, f"controllers not available: {', '.join(missing)}")
+        enabled = set((parent / 'cgroup.subtree_control').read_text().split())
+        if enabled.issuperset(CONTROLLERS):
+            return
+        request = ' '.join(f"+{c}" for c in CONTROLLERS)
+        try:
+            (parent / 'cgroup.subtree_control').write_text(request)
+        except OSError as e:
+            if e.errno != errno.EBUSY:
+                raise
+            # A group holding processes can't delegate controllers; step into a
+            # leaf. Other processes in the group are not ours to move, so if
+            # there are any this still fails and the build runs unlimited.
+            leaf = parent / cls.SUPERVISOR_GROUP
+            leaf.mkdir(exist_ok=True)
+            (leaf / 'cgroup.procs').write_text(str(os.getpid()))
+            (parent / 'cgroup.subtree_control').write_text(request)
+
+    def _write(self, name: str, value: str):
+        try:
+            (self.path / name).write_text(value)
+        except OSError as e:
+            print(f"  ⚠ Could not set {name}={value}: {e}")
+
+    def apply(self, work_dir: Path = None):
+        """Write the configured limits into the group"""
+        limits = self.limits
+        if limits['cpu_weight']:
+            self._write('cpu.weight', str(int(limits['cpu_weight'])))
+        if limits['cpu_max']:
+            # Quota in cores, over the default 100ms period
+            self._write('cpu.max', f"{int(float(limits['cpu_max']) * 100000)} 100000")
+        if limits['memory_high']:
+            self._write('memory.high', parse_size(limits['memory_high']))
+        if limits['memory_max']:
+            self._write('memory.max', parse_size(limits['memory_max']))
+        if limits['swap_max'] is not None:
+            self._write('memory.swap.max', parse_size(limits['swap_max']))
+        # An OOM kills the whole build rather than leaving it half-alive
+        self._write('memory.oom.group', '1')
+        if limits['io_weight']:
+            self._write('io.weight', f"default {int(limits['io_weight'])}")
+        if limits['io_max']:
+            device = limits['io_device'] or block_device(work_dir or Path.cwd())
+            rules = ' '.join(f"{key}={parse_size(value) if key.endswith('bps') else int(value)}"
+                             for key, value in limits['io_max'].items()
+                             if key in ('rbps', 'wbps', 'riops', 'wiops'))
+            self._write('io.max', f"{device} {rules}")
+
+    def environment(self) -> Dict[str, str]:
+        """Environment that makes a build process enter this group"""
+        return {CGROUP_ENV: str(self.path)}
+
+    @classmethod
+    def from_environment(cls) -> Optional['CgroupGovernor']:
+        path = os.environ.get(CGROUP_ENV)
+        return cls(Path(path)) if path else None
+
+    def enter(self):
+        """Move the calling process into the group"""
+        (self.path / 'cgroup.procs').write_text(str(os.getpid()))
+
+    def _read_keyed(self, name: str) -> Dict[str, int]:
+        try:
+            lines = (self.path / name).read_text().splitlines()
+        except OSError:
+            return {}
+        values = {}
+        for line in lines:
+            key, _, value = line.partition(' ')
+            if value.strip().isdigit():
+                values[key] = int(value)
+        return values
+
+    def events(self) -> Dict[str, int]:
+        """Throttling and OOM counters of the group so far"""
+        memory = self._read_keyed('memory.events')
+        cpu = self._read_keyed('cpu.stat')
+        events = {
+            'oom_kill': memory.get('oom_kill', 0),
+            'memory_high': memory.get('high', 0),
+            'memory_max': memory.get('max', 0),
+            'cpu_throttled': cpu.get('nr_throttled', 0),
+            'cpu_throttled_usec': cpu.get('throttled_usec', 0),
+        }
+        try:
+            events['memory_peak'] = int((self.path / 'memory.peak').read_text())
+        except (OSError, ValueError):
+            pass
+        return events
+
+    @staticmethod
+    def _report(before: Dict[str, int], after: Dict[str, int]):
+        if after['oom_kill'] > before['oom_kill']:
+            print(f"  ⚠ Out of memory: {after['oom_kill'] - before['oom_kill']} build "
+                  f"process(es) killed by memory_max")
+        if after['memory_high'] > before['memory_high']:
+            print("  ⚠ Build reached memory_high and is being reclaimed (slowed down)")
+        if after['cpu_throttled'] > before['cpu_throttled']:
+            seconds = (after['cpu_throttled_usec'] - before['cpu_throttled_usec']) / 1e6
+            print(f"  ⚠ CPU quota throttled the build for {seconds:.1f}s")
+
+    @contextmanager
+    def monitor(self, interval: float = 10.0):
+        """Print throttling and OOM events into the build log as they happen"""
+        stop = threading.Event()
+        start = self.events()
+
+        def watch():
+            last = start
+            while not stop.wait(interval):
+                current = self.events()
+                self._report(last, current)
+                last = current
+
+        thread = threading.Thread(target=watch, name="cgroup-monitor", daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+            end = self.events()
+            summary = (f"CPU throttled {end['cpu_throttled_usec'] / 1e6:.1f}s, "
+                       f"OOM kills {end['oom_kill']}")
+            if 'memory_peak' in end:
+                summary = f"peak memory {end['memory_peak'] / 1024 ** 3:.2f} GB, " + summary
+            print(f"  [*] Build resources: {summary}")
+
+    def report_exit(self):
+        """Log what the group recorded, once the build process has exited"""
+        # memory.oom.group kills the build's own monitor() along with it, so
+        # only the supervisor sees an OOM kill
+        oom_kills = self.events()['oom_kill']
+        if oom_kills:
+            print(f"  ⚠ Out of memory: {oom_kills} build process(es) in {self.path.name} "
+                  f"killed by memory_max")
+
+    def remove(self):
+        """Delete the group once every process in it has exited"""
+        with self._active_lock:
+            self._active.discard(self.path)
+        try:
+            self.path.rmdir()
+        except OSError as e:
+            # A background workspace teardown may still run in it; the next build sweeps it
+            if e.errno != errno.EBUSY:
+                print(f"  ⚠ Could not remove cgroup {self.path}: {e}")
+
+
+@contextmanager
+def governed_build(config: dict, name: str, work_dir: Path = None):
+    """
+    Group for a build child process, removed when the block ends
+
+    OOM kills are reported here, after the child exits: they take down the
+    child's own monitor too.
+
+    Yields:
+        Extra environment for the child ({} without a group)
+    """
+    governor = CgroupGovernor.for_build(config, name, work_dir)
+    try:
+        yield governor.environment() if governor else {}
+    finally:
+        if governor:
+            governor.report_exit()
+            governor.remove()
+
+
+@contextmanager
+def enter_governed_build():
+    """Join the group our parent created for us, reporting its events until the block ends"""
+    governor = CgroupGovernor.from_environment()
+    if governor is None:
+        yield None
+        return
+    try:
+        governor.enter()
+    except OSError as e:
+        print(f"  ⚠ Could not join build cgroup {governor.path}: {e}")
+        yield None
+        return
+    with governor.monitor():
+        yield governor
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Cgroup Governor - Check cgroup v2 support for build limits'
+    )
+    parser.parse_args()
+
+    mount, current = cgroup2_mount(), current_cgroup()
+    if mount is None or current is None:
+        print("✗ No cgroup v2 hierarchy mounted")
+        return 1
+    parent = mount / current.lstrip('/')
+    available = (parent / 'cgroup.controllers').read_text().split()
+    print(f"cgroup v2 mount:  {mount}")
+    print(f"Build parent:     {parent}")
+    print(f"Controllers:      {' '.join(available) or 'none'}")
+    missing = [c for c in CONTROLLERS if c not in available]
+    if missing:
+        print(f"⚠ Missing controllers: {', '.join(missing)}; builds run without those limits")
+        return 1
+    print("✓ Resource limits supported")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
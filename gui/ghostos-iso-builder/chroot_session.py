@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Chroot Session
+Mounts the chroot API filesystems once and runs many commands inside
+"""
+
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
+
+from build_telemetry import run_command
+from tool_runner import OutputParser, run_tool
+
+
+class ChrootSession:
+    """Context manager for running batches of commands in a chroot"""
+
+    API_MOUNTS = ['dev', 'dev/pts', 'proc', 'sys']
+
+    # Files the fast-install mode drops into the chroot for its duration
+    POLICY_RC_D = "usr/sbin/policy-rc.d"
+    POLICY_RC_D_MARKER = "Installed by Heck-CheckOS builder"
+    DPKG_UNSAFE_IO = "etc/dpkg/dpkg.cfg.d/heckcheckos-unsafe-io"
+    MANDB_FLAG = "var/lib/man-db/auto-update"
+    INITRAMFS_TOOL = "/usr/sbin/update-initramfs"
+
+    TRIGGER_POLICIES = ('defer', 'skip', 'immediate')
+
+    def __init__(self, rootfs_dir, fast_install: bool = False,
+                 trigger_policy: str = 'defer', binds: List[Tuple[str, str]] = None):
+        """
+        Initialize chroot session
+
+        Args:
+            rootfs_dir: Root of the chroot
+            fast_install: Suppress fsync, block service starts and hold back
+                          man-db/initramfs triggers while the session is open
+            trigger_policy: 'defer' runs held-back triggers once on exit,
+                            'skip' never runs them, 'immediate' leaves them alone
+            binds: Extra (host path, path inside chroot) bind mounts
+        """
+        if trigger_policy not in self.TRIGGER_POLICIES:
+            raise ValueError(f"Unknown trigger policy: {trigger_policy}")
+
+        self.rootfs_dir = Path(rootfs_dir)
+        self.fast_install = fast_install
+        self.trigger_policy = trigger_policy
+        self.binds = list(binds or [])
+        self._mounted: List[Path] = []
+        self._restore_policy_rc = None
+        self._eatmydata = False
+
+    def __enter__(self):
+        self.mount()
+        try:
+            if self.fast_install:
+                self._enable_fast_install()
+        except Exception:
+            self.unmount()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.fast_install:
+                # Do not spend minutes on triggers for a build that already failed
+                self._disable_fast_install(run_deferred=exc_type is None)
+        finally:
+            self.unmount()
+        return False
+
+    def _bind(self, source: str, target: Path):
+        target.mkdir(parents=True, exist_ok=True)
+        result = run_command(['mount', '--bind', source, str(target)])
+        if result.returncode == 0:
+            self._mounted.append(target)
+
+    def mount(self):
+        """Bind-mount the API filesystems and any extra binds"""
+        for mount in self.API_MOUNTS:
+            self._bind(f'/{mount}', self.rootfs_dir / mount)
+        for source, target in self.binds:
+            self._bind(str(source), self.rootfs_dir / str(target).lstrip('/'))
+
+    def unmount(self):
+        """Unmount everything this session mounted, innermost first"""
+        while self._mounted:
+            target = self._mounted.pop()
+            if run_command(['umount', str(target)]).returncode != 0:
+                # Something still holds the mount; detach it so the build can finish
+                run_command(['umount', '--lazy', str(target)], check=False)
+
+    def run(self, cmd: list, check: bool = True, env: dict = None,
+            parser: OutputParser = None, progress_callback=None) -> subprocess.CompletedProcess:
+        """
+        Run one command inside the chroot
+        
+        With a parser, output is streamed through it and progress reported
+        to progress_callback (see tool_runner.py).
+        """
+        if self._eatmydata:
+            cmd = ['eatmydata'] + cmd
+        run_env = dict(os.environ, **(env or {}))
+        full_cmd = ['chroot', str(self.rootfs_dir)] + cmd
+        if parser:
+            return run_tool(full_cmd, parser, progress_callback, check=check, echo=True, env=run_env)
+        return run_command(full_cmd, check=check, env=run_env)
+
+    def run_script(self, script: str, check: bool = True, env: dict = None) -> subprocess.CompletedProcess:
+        """Run a shell script inside the chroot with errexit set"""
+        tmp_dir = self.rootfs_dir / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, script_path = tempfile.mkstemp(prefix="heckcheckos-", suffix=".sh", dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write("set -e\n" + script)
+            inside = '/' + str(Path(script_path).relative_to(self.rootfs_dir))
+            return self.run(['/bin/sh', inside], check=check, env=env)
+        finally:
+            os.unlink(script_path)
+
+    def _enable_fast_install(self):
+        """Make package installation bound by unpack speed, not fsync and triggers"""
+        # Refuse service starts from maintainer scripts
+        policy = self.rootfs_dir / self.POLICY_RC_D
+        # A copy left behind by an interrupted session is ours, not the image's
+        if policy.exists() and self.POLICY_RC_D_MARKER.encode() not in policy.read_bytes():
+            self._restore_policy_rc = policy.read_bytes()
+        policy.parent.mkdir(parents=True, exist_ok=True)
+        policy.write_text(f"#!/bin/sh\n# {self.POLICY_RC_D_MARKER} during package installation\nexit 101\n")
+        policy.chmod(0o755)
+
+        # dpkg's own fsync suppression, plus eatmydata when the chroot has it
+        unsafe_io = self.rootfs_dir / self.DPKG_UNSAFE_IO
+        unsafe_io.parent.mkdir(parents=True, exist_ok=True)
+        unsafe_io.write_text("force-unsafe-io\n")
+        self._eatmydata = (self.rootfs_dir / "usr" / "bin" / "eatmydata").exists()
+
+        if self.trigger_policy == 'immediate':
+            return
+
+        # man-db only rebuilds its index when this flag file exists
+        mandb_flag = self.rootfs_dir / self.MANDB_FLAG
+        if mandb_flag.exists():
+            mandb_flag.rename(mandb_flag.with_suffix('.heckcheckos'))
+
+        # Divert update-initramfs so kernel and firmware installs don't regenerate it each time
+        stub = self.rootfs_dir / self.INITRAMFS_TOOL.lstrip('/')
+        if stub.is_symlink():
+            stub.unlink()  # Stub from an interrupted session; --rename must not keep it
+        self.run(['dpkg-divert', '--local', '--rename', '--add', self.INITRAMFS_TOOL],
+                 check=True)
+        stub.parent.mkdir(parents=True, exist_ok=True)
+        stub.symlink_to('/bin/true')
+
+    def _disable_fast_install(self, run_deferred: bool):
+        """Restore the chroot and run any triggers that were held back"""
+        self._eatmydata = False
+        policy = self.rootfs_dir / self.POLICY_RC_D
+        if self._restore_policy_rc is not None:
+            policy.write_bytes(self._restore_policy_rc)
+        else:
+            policy.unlink(missing_ok=True)
+        (self.rootfs_dir / self.DPKG_UNSAFE_IO).unlink(missing_ok=True)
+
+        if self.trigger_policy == 'immediate':
+            return
+
+        held_flag = (self.rootfs_dir / self.MANDB_FLAG).with_suffix('.heckcheckos')
+        if held_flag.exists():
+            held_flag.rename(self.rootfs_dir / self.MANDB_FLAG)
+
+        stub = self.rootfs_dir / self.INITRAMFS_TOOL.lstrip('/')
+        if stub.is_symlink():
+            stub.unlink()
+        self.run(['dpkg-divert', '--local', '--rename', '--remove', self.INITRAMFS_TOOL],
+                 check=False)
+
+        if self.trigger_policy != 'defer' or not run_deferred:
+            return
+
+        print("  [*] Running deferred man-db and initramfs triggers...")
+        self.run_script("""
+if [ -x /usr/bin/mandb ] && [ -e /var/lib/man-db/auto-update ]; then
+    mandb --quiet || true
+fi
+if [ -x /usr/sbin/update-initramfs ]; then
+    for modules in /lib/modules/*; do
+        [ -d "$modules" ] || continue
+        version="${modules##*/}"
+        if [ -e "/boot/initrd.img-$version" ]; then
+            update-initramfs -u -k "$version"
+        else
+            update-initramfs -c -k "$version"
+        fi
+    done
+fi
+""")
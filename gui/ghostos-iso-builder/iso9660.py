@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS ISO9660 Reader
+Reads directories and files straight out of an ISO image, without mounting it
+or root: ISO9660 with Rock Ridge or Joliet names, through a read-only mmap
+"""
+
+import io
+import os
+import sys
+import mmap
+import struct
+import calendar
+from collections import namedtuple
+from pathlib import PurePosixPath
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SECTOR_SIZE = 2048
+FIRST_DESCRIPTOR = 16
+
+# Escape sequences that mark a supplementary volume descriptor as Joliet (UCS-2 levels 1-3)
+JOLIET_ESCAPES = (b'%/@', b'%/C', b'%/E')
+
+ISOEntry = namedtuple('ISOEntry', ['name', 'path', 'is_dir', 'size', 'extents', 'mtime',
+                                   'mode', 'symlink'])
+ISOEntry.__doc__ = "A file or directory; extents are (byte offset, length) pairs in the image"
+
+
+def _record_time(data: bytes) -> Optional[int]:
+    """Seconds since the epoch of a 7-byte directory record date"""
+    year, month, day, hour, minute, second, offset = struct.unpack('<6Bb', data)
+    if not month:
+        return None
+    try:
+        stamp = calendar.timegm((1900 + year, month, day, hour, minute, second))
+    except ValueError:
+        return None
+    # The offset from GMT is in 15 minute intervals
+    return stamp - offset * 15 * 60
+
+
+class ISOFile(io.RawIOBase):
+    """Seekable read-only stream over a file's extents in the image"""
+
+    def __init__(self, image: 'ISOImage', entry: ISOEntry):
+        super().__init__()
+        self.name = entry.path
+        self._map = image._map
+        self._extents = entry.extents
+        self._size = entry.size
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        done = 0
+        skip = self._pos
+        for start, length in self._extents:
+            if skip >= length:
+                skip -= length
+                continue
+            count = min(length - skip, len(view) - done)
+            view[done:done + count] = self._map[start + skip:start + skip + count]
+            done += count
+            skip = 0
+            if done == len(view):
+                break
+        self._pos += done
+        return done
+
+
+class ISOImage:
+    """
+    Read-only view of an ISO9660 image
+
+    Only the volume descriptors and the directories on the way to a path are
+    read, and file data is streamed from the mapped image on demand, so the
+    page cache only ever sees the metadata and files actually used. Rock Ridge
+    names (and symlinks) are preferred, then Joliet, then plain ISO9660.
+    """
+
+    def __init__(self, path):
+        """
+        Open image
+
+        Args:
+            path: ISO image file
+
+        Raises:
+            ValueError if the file is not an ISO9660 image
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < (FIRST_DESCRIPTOR + 1) * SECTOR_SIZE:
+                raise ValueError(f"{path} is not an ISO9660 image")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._dirs: Dict[Tuple, List[ISOEntry]] = {}
+        try:
+            self._read_descriptors()
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _read_descriptors(self):
+        primary = joliet = None
+        for sector in range(FIRST_DESCRIPTOR, FIRST_DESCRIPTOR + 64):
+            offset = sector * SECTOR_SIZE
+            kind, ident = self._map[offset], self._map[offset + 1:offset + 6]
+            if ident != b'CD001':
+                break
+            if kind == 1 and primary is None:
+                primary = offset
+            elif kind == 2 and joliet is None and self._map[offset + 88:offset + 91] in JOLIET_ESCAPES:
+                joliet = offset
+            elif kind == 255:
+                break
+        if primary is None:
+            raise ValueError(f"{self.path} is not an ISO9660 image")
+
+        self.volume_id = self._map[primary + 40:primary + 72].decode('ascii', errors='replace').strip()
+        self.rock_ridge = False
+        self._susp_skip = 0
+        root = self._parse_record(primary + 156, joliet=False)
+        self._check_rock_ridge(root)
+        if self.rock_ridge or joliet is None:
+            self.joliet = False
+        else:
+            self.joliet = True
+            root = self._parse_record(joliet + 156, joliet=True)
+        self.root = ISOEntry('', '/', True, root['size'], tuple(root['extents']), root['mtime'],
+                             None, None)
+
+    def _check_rock_ridge(self, root: Dict):
+        """Rock Ridge announces itself with an SP entry in the root's '.' record"""
+        start = root['extents'][0][0]
+        length = self._map[start]
+        if not length:
+            return
+        name_len = self._map[start + 32]
+        su_start = start + 33 + name_len + (0 if name_len % 2 else 1)
+        su = self._map[su_start:start + length]
+        if su[:2] == b'SP' and su[4:6] == b'\xbe\xef':
+            self.rock_ridge = True
+            self._susp_skip = su[6]
+
+    def _parse_record(self, pos: int, joliet: bool) -> Dict:
+        m = self._map
+        length = m[pos]
+        ext_attr = m[pos + 1]
+        lba, size = struct.unpack_from('<I4xI', m, pos + 2)
+        flags = m[pos + 25]
+        name_len = m[pos + 32]
+        raw_name = m[pos + 33:pos + 33 + name_len]
+        record = {
+            'extents': [((lba + ext_attr) * SECTOR_SIZE, size)],
+            'size': size,
+            'mtime': _record_time(m[pos + 18:pos + 25]),
+            'is_dir': bool(flags & 0x02),
+            'multi_extent': bool(flags & 0x80),
+            'special': raw_name in (b'\x00', b'\x01'),
+            'mode': None,
+            'symlink': None,
+            'relocated': False,
+        }
+        if joliet:
+            name = raw_name.decode('utf-16-be', errors='replace')
+        else:
+            name = raw_name.decode('ascii', errors='replace')
+        if not record['is_dir']:
+            name = name.split(';', 1)[0]
+            if name.endswith('.') and not joliet:
+                name = name[:-1]
+        record['name'] = name
+
+        if self.rock_ridge and not joliet:
+            su_start = pos + 33 + name_len + (0 if name_len % 2 else 1) + self._susp_skip
+            self._parse_rock_ridge(record, su_start, pos + length)
+        return record
+
+    def _parse_rock_ridge(self, record: Dict, start: int, end: int):
+        m = self._map
+        nm = None
+        symlink = None
+        areas = [(start, end)]
+        while areas:
+            pos, end = areas.pop()
+            while pos + 4 <= end:
+                sig, length = bytes(m[pos:pos + 2]), m[pos + 2]
+                if length < 4:
+                    break
+                data = m[pos + 4:pos + length]
+                if sig == b'NM':
+                    if not data[0] & 0x06:
+                        nm = (nm or '') + data[1:].decode('utf-8', errors='replace')
+                elif sig == b'PX':
+                    record['mode'] = struct.unpack_from('<I', data)[0]
+                elif sig == b'SL':
+                    symlink = self._symlink_components(symlink or [], data)
+                elif sig == b'CL':
+                    # A deep directory moved elsewhere; this record stands in for it
+                    location = struct.unpack_from('<I', data)[0] * SECTOR_SIZE
+                    record['is_dir'] = True
+                    dot = self._parse_record(location, joliet=False)
+                    record['extents'], record['size'] = dot['extents'], dot['size']
+                elif sig == b'RE':
+                    record['relocated'] = True
+                elif sig == b'CE':
+                    block, offset, ce_len = struct.unpack_from('<I4xI4xI', data)
+                    ce_start = block * SECTOR_SIZE + offset
+                    areas.append((ce_start, ce_start + ce_len))
+                elif sig == b'ST':
+                    break
+                pos += length
+        if nm is not None:
+            record['name'] = nm
+        if symlink is not None:
+            record['symlink'] = self._join_symlink(symlink)
+
+    @staticmethod
+    def _symlink_components(parts: List, data: bytes) -> List:
+        pos = 1
+        while pos + 2 <= len(data):
+            flags, length = data[pos], data[pos + 1]
+            content = bytes(data[pos + 2:pos + 2 + length]).decode('utf-8', errors='replace')
+            if flags & 0x02:
+                content = '.'
+            elif flags & 0x04:
+                content = '..'
+            elif flags & 0x08:
+                content = '/'
+            if parts and parts[-1][1]:
+                # The previous component continues in this one
+                parts[-1] = (parts[-1][0] + content, bool(flags & 0x01))
+            else:
+                parts.append((content, bool(flags & 0x01)))
+            pos += 2 + length
+        return parts
+
+    @staticmethod
+    def _join_symlink(parts: List) -> str:
+        names = [name for name, _ in parts]
+        if names and names[0] == '/':
+            return '/' + '/'.join(names[1:])
+        return '/'.join(names)
+
+    def _read_directory(self, directory: ISOEntry) -> List[ISOEntry]:
+        key = directory.extents
+        if key in self._dirs:
+            return self._dirs[key]
+        entries = []
+        pending = None
+        for start, length in directory.extents:
+            pos, end = start, start + length
+            while pos < end:
+                record_len = self._map[pos]
+                if not record_len:
+                    # Records never span sectors; the rest of this one is padding
+                    pos = (pos // SECTOR_SIZE + 1) * SECTOR_SIZE
+                    continue
+                record = self._parse_record(pos, self.joliet)
+                pos += record_len
+                if record['special'] or record['relocated']:
+                    continue
+                if pending is not None and pending['name'] == record['name']:
+                    # Files over 4 GiB are split into several records of one name
+                    pending['extents'] += record['extents']
+                    pending['size'] += record['size']
+                    pending['multi_extent'] = record['multi_extent']
+                else:
+                    if pending is not None:
+                        entries.append(self._entry(directory, pending))
+                    pending = record
+                if not pending['multi_extent']:
+                    entries.append(self._entry(directory, pending))
+                    pending = None
+        if pending is not None:
+            entries.append(self._entry(directory, pending))
+        self._dirs[key] = entries
+        return entries
+
+    @staticmethod
+    def _entry(directory: ISOEntry, record: Dict) -> ISOEntry:
+        path = str(PurePosixPath(directory.path) / record['name'])
+        return ISOEntry(record['name'], path, record['is_dir'], record['size'],
+                        tuple(record['extents']), record['mtime'], record['mode'],
+                        record['symlink'])
+
+    def _match(self, entries: List[ISOEntry], name: str) -> Optional[ISOEntry]:
+        for entry in entries:
+            if entry.name == name:
+                return entry
+        if not (self.rock_ridge or self.joliet):
+            # Plain ISO9660 names are upper case
+            for entry in entries:
+                if entry.name.lower() == name.lower():
+                    return entry
+        return None
+
+    def entry(self, path: str) -> Optional[ISOEntry]:
+        """Entry at path, reading only the directories along it; None if absent"""
+        current = self.root
+        for part in PurePosixPath('/', path).parts[1:]:
+            if not current.is_dir:
+                return None
+            current = self._match(self._read_directory(current), part)
+            if current is None:
+                return None
+        return current
+
+    def exists(self, path: str) -> bool:
+        return self.entry(path) is not None
+
+    def listdir(self, path: str = '/') -> List[ISOEntry]:
+        directory = self.entry(path)
+        if directory is None or not directory.is_dir:
+            raise FileNotFoundError(f"No directory {path} in {self.path}")
+        return list(self._read_directory(directory))
+
+    def walk(self, path: str = '/') -> Iterator[Tuple[str, List[ISOEntry], List[ISOEntry]]]:
+        """Like os.walk, top-down; symlinked directories are not followed"""
+        entries = self.listdir(path)
+        dirs = [entry for entry in entries if entry.is_dir and entry.symlink is None]
+        files = [entry for entry in entries if not (entry.is_dir and entry.symlink is None)]
+        yield path, dirs, files
+        for directory in dirs:
+            yield from self.walk(directory.path)
+
+    def open(self, path: str) -> io.BufferedReader:
+        """Binary stream of a file's contents"""
+        entry = self.entry(path)
+        if entry is None or entry.is_dir:
+            raise FileNotFoundError(f"No file {path} in {self.path}")
+        return io.BufferedReader(ISOFile(self, entry), buffer_size=256 * 1024)
+
+    def read(self, path: str) -> bytes:
+        entry = self.entry(path)
+        if entry is None or entry.is_dir:
+            raise FileNotFoundError(f"No file {path} in {self.path}")
+        return b''.join(self._map[start:start + length] for start, length in entry.extents)
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS ISO9660 Reader - List and read files in an ISO without mounting it'
+    )
+    parser.add_argument('image', help='ISO image')
+    parser.add_argument('path', nargs='?', default='/', help='Directory to list or file to print')
+    parser.add_argument('-r', '--recursive', action='store_true', help='List directories recursively')
+
+    args = parser.parse_args()
+    with ISOImage(args.image) as image:
+        entry = image.entry(args.path)
+        if entry is None:
+            print(f"✗ {args.path}: not found in {args.image}")
+            return 1
+        if not entry.is_dir:
+            with image.open(args.path) as f:
+                while True:
+                    block = f.read(1024 * 1024)
+                    if not block:
+                        break
+                    sys.stdout.buffer.write(block)
+            return 0
+        walk = image.walk(args.path) if args.recursive else [(args.path, [], image.listdir(args.path))]
+        for _, dirs, files in walk:
+            for item in sorted(dirs + files, key=lambda e: e.path):
+                kind = 'l' if item.symlink else ('d' if item.is_dir else '-')
+                target = f" -> {item.symlink}" if item.symlink else ''
+                print(f"{kind} {item.size:>12}  {item.path}{target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS ISO Analysis
+Describes a source ISO for component selection: its label, live system
+packages, apt repositories and which components it can provide
+"""
+
+import os
+import sys
+import json
+import copy
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from iso9660 import ISOImage
+from package_index import (COMPONENT_PACKAGES, PackageIndex, base_packages, component_closure,
+                           format_size, installed_size, iso_packages_files)
+
+# Components offered per category, with a size estimate for ISOs without a package index
+COMPONENT_CATEGORIES = {
+    'Base System': {
+        'Linux Kernel': {'size': '250MB', 'required': True},
+        'System Libraries': {'size': '180MB', 'required': True},
+        'Init System': {'size': '50MB', 'required': True},
+    },
+    'Desktop Environment': {
+        'MATE Desktop': {'size': '420MB', 'required': False},
+        'XFCE Desktop': {'size': '380MB', 'required': False},
+        'KDE Plasma': {'size': '650MB', 'required': False},
+        'GNOME Desktop': {'size': '720MB', 'required': False},
+    },
+    'Security Tools': {
+        'Debian Security Suite': {'size': '1.2GB', 'required': False},
+        'Network Analysis': {'size': '450MB', 'required': False},
+        'Forensics Tools': {'size': '380MB', 'required': False},
+        'Password Cracking': {'size': '280MB', 'required': False},
+    },
+    'Development Tools': {
+        'GCC/G++ Compilers': {'size': '320MB', 'required': False},
+        'Python Development': {'size': '180MB', 'required': False},
+        'Node.js & NPM': {'size': '120MB', 'required': False},
+        'Git & Version Control': {'size': '85MB', 'required': False},
+    },
+    'Gaming Support': {
+        'Steam': {'size': '450MB', 'required': False},
+        'Lutris': {'size': '120MB', 'required': False},
+        'Wine/Proton': {'size': '380MB', 'required': False},
+        'GPU Drivers': {'size': '520MB', 'required': False},
+    },
+    'Productivity': {
+        'LibreOffice Suite': {'size': '620MB', 'required': False},
+        'GIMP': {'size': '180MB', 'required': False},
+        'Inkscape': {'size': '120MB', 'required': False},
+        'Blender': {'size': '350MB', 'required': False},
+    },
+}
+
+# Package lists of the live system, as Debian live and Ubuntu casper write them
+LIVE_PACKAGE_LISTS = ['live/filesystem.packages', 'casper/filesystem.manifest']
+
+
+def disk_info(image: ISOImage) -> Optional[str]:
+    """The distribution's own description of the disc (.disk/info)"""
+    entry = image.entry('.disk/info')
+    if entry is None or entry.is_dir:
+        return None
+    return image.read(entry.path).decode('utf-8', errors='replace').strip() or None
+
+
+def live_packages(image: ISOImage) -> Dict[str, str]:
+    """Packages installed in the ISO's live system, name to version"""
+    for path in LIVE_PACKAGE_LISTS:
+        entry = image.entry(path)
+        if entry is None or entry.is_dir:
+            continue
+        packages = {}
+        for line in image.read(entry.path).decode('utf-8', errors='replace').splitlines():
+            fields = line.split()
+            if fields:
+                # Multi-arch lists name packages as name:arch
+                packages[fields[0].split(':', 1)[0]] = fields[1] if len(fields) > 1 else ''
+        return packages
+    return {}
+
+
+def _available(component: str, installed: Dict[str, str], index: Optional[PackageIndex]) -> bool:
+    """Whether the ISO can provide every package of a component"""
+    if not installed and index is None:
+        # Nothing to check against; apt fetches it from the mirrors
+        return True
+    for name in COMPONENT_PACKAGES.get(component, []):
+        if name in installed:
+            continue
+        if index is not None and (name in index or index.providers(name)):
+            continue
+        return False
+    return True
+
+
+def analyze_iso(iso_path, progress_callback: Callable = None,
+                package_sizes: bool = True, index_cache: Path = None,
+                partial_callback: Callable = None) -> Dict:
+    """
+    Analyze a source ISO without mounting it
+
+    Only volume descriptors, a handful of directories and the small metadata
+    files are read. With package_sizes, the ISO's package index is built (once,
+    then cached) and component sizes are the installed size of their
+    dependency closure beyond the base system.
+
+    Args:
+        iso_path: Source ISO
+        progress_callback: Called with (percent, message)
+        package_sizes: Index the ISO's apt repository to size components exactly
+        index_cache: Package index cache directory (defaults to the data directory)
+        partial_callback: Called with (stage, fields) as parts of the result are
+            known: 'volume' (name, size, label, description), then 'packages'
+            (live_packages, repository)
+
+    Returns:
+        iso_info dict as used by the ISO loader: path, name, size, label,
+        description, live_packages, repository and components by category
+        (each with size, required and available)
+
+    Raises:
+        ValueError if the file is not an ISO9660 image
+    """
+    def progress(percent, message):
+        if progress_callback:
+            progress_callback(percent, message)
+
+    def partial(stage, fields):
+        if partial_callback:
+            partial_callback(stage, fields)
+
+    iso_path = str(iso_path)
+    progress(10, "Reading ISO metadata...")
+    with ISOImage(iso_path) as image:
+        volume = {
+            'name': Path(iso_path).name,
+            'size': os.path.getsize(iso_path),
+            'label': image.volume_id,
+            'description': disk_info(image),
+        }
+        partial('volume', volume)
+        progress(30, "Extracting package list...")
+        installed = live_packages(image)
+        repository = iso_packages_files(image)
+        dists = [path.split('/')[2] for path in repository]
+        partial('packages', {'live_packages': len(installed), 'repository': dists})
+
+    index = None
+    if package_sizes and repository:
+        progress(50, "Indexing package repository...")
+        index = PackageIndex.for_source(iso_path, index_cache)
+        if not len(index):
+            index = None
+
+    progress(80, "Categorizing components...")
+    components = copy.deepcopy(COMPONENT_CATEGORIES)
+    base = base_packages([index]) if index is not None else set()
+    for category in components.values():
+        for name, info in category.items():
+            info['available'] = info['required'] or _available(name, installed, index)
+            if index is not None and info['available']:
+                info['size'] = format_size(installed_size(component_closure([index], [name], base)))
+
+    iso_info = {
+        'path': iso_path,
+        **volume,
+        'live_packages': len(installed),
+        'repository': dists,
+        'components': components,
+    }
+    if index is not None:
+        # Lets the loader size a whole selection, counting shared dependencies once
+        iso_info['package_index'] = index
+        iso_info['base_packages'] = base
+    return iso_info
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS ISO Analysis - Show what a source ISO provides'
+    )
+    parser.add_argument('image', help='ISO image')
+    parser.add_argument('--no-sizes', action='store_true',
+                        help='Skip the package index (metadata only)')
+    parser.add_argument('--json', action='store_true', help='Print the analysis as JSON')
+
+    args = parser.parse_args()
+    try:
+        info = analyze_iso(args.image, package_sizes=not args.no_sizes)
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}")
+        return 1
+    info.pop('package_index', None)
+    info.pop('base_packages', None)
+    if args.json:
+        print(json.dumps(info, indent=2))
+        return 0
+
+    print(f"{info['name']}: {info['label']} ({info['size'] / 1024 ** 3:.2f} GB)")
+    if info['description']:
+        print(f"  {info['description']}")
+    print(f"  Live system packages: {info['live_packages']}")
+    print(f"  Package repository: {', '.join(sorted(set(info['repository']))) or 'none'}")
+    for category, components in info['components'].items():
+        print(f"  {category}:")
+        for name, component in components.items():
+            mark = '✓' if component['available'] else '✗'
+            print(f"    {mark} {name:<24} {component['size']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,16 +7,48 @@ Actual ISO creation with pre-applied configurations
 import os
 import sys
 import shutil
-import subprocess
-import tempfile
 import json
+from contextlib import ExitStack
 from pathlib import Path
 from datetime import datetime
 
+from platform_utils import PlatformHelper
+from build_telemetry import BuildTelemetry, run_command
+from tool_runner import (AptStatusParser, DebootstrapParser, MksquashfsParser,
+                         XorrisoParser, run_tool, scaled)
+from rootfs_cache import RootfsSnapshotCache
+from rootfs_overlay import OverlayRootfs
+from workspace_manager import WorkspaceManager
+from build_scheduler import BuildStage, StageScheduler
+from build_checkpoints import StageCheckpoints, stage_fingerprints
+from chroot_session import ChrootSession
+from apt_cache import AptArchiveCache
+from iso_repository import IsoRepositories
+from squashfs_profiles import get_profile, mksquashfs_command
+from squashfs_layers import SquashfsLayers
+from squashfs_merge import SquashfsMerge, unpacked_packages
+from iso_finalizer import finalize_image
+from iso_delta import create_delta, find_base
+from artifact_store import ArtifactStore
+from package_index import (COMPONENT_PACKAGES, PackageIndex, base_packages, dependency_closure,
+                           format_size, installed_size)
+from reproducible_build import (build_timestamp, clamp_mtimes, reproducible_environment,
+                                scrub_rootfs, source_date_epoch, xorriso_options)
+
 
 class ISOBuilder:
     """Builds custom Heck-CheckOS ISO with pre-applied configurations"""
     
+    # debootstrap inputs - these also form the rootfs snapshot cache key
+    BOOTSTRAP_SUITE = 'bookworm'
+    BOOTSTRAP_ARCH = 'amd64'
+    BOOTSTRAP_MIRROR = 'http://deb.debian.org/debian'
+    BOOTSTRAP_INCLUDE = [
+        'wget', 'curl', 'ca-certificates', 'gnupg', 'sudo', 'systemd',
+        'network-manager', 'tpm2-tools', 'tpm-tools', 'libtss2-esys0',
+        'libtss2-tcti-device0', 'cpufrequtils', 'linux-cpupower', 'amd64-microcode',
+    ]
+    
     def __init__(self, config: dict, output_dir: str = None):
         """
         Initialize ISO builder
@@ -30,6 +62,22 @@ class ISOBuilder:
         self.work_dir = None
         self.iso_dir = None
         self.rootfs_dir = None
+        self._stage_results = {}
+        self._squashfs_layers = None
+        self._overlay = None
+        self._tree_hold = None
+        self._iso_digests = {}
+        # Set in reproducible mode (see reproducible_build.py)
+        self._source_date_epoch = source_date_epoch(self.config)
+        # Persistent workspaces survive the build so the next run can resume
+        workspace = self.config.get('workspace', {})
+        self._workspace_manager = WorkspaceManager(workspace.get('base_dir'))
+        self.persistent_workspace = workspace.get('persistent', False)
+        if self.persistent_workspace:
+            self.workspace_path = Path(
+                workspace.get('dir') or
+                PlatformHelper.get_data_directory() / "workspaces" / workspace.get('name', 'default')
+            )
         
     def check_dependencies(self):
         """Check if required tools are installed"""
@@ -38,7 +86,6 @@ class ISOBuilder:
             'mksquashfs',
             'xorriso',
             'grub-mkstandalone',
-            'isohybrid',
             'chroot'
         ]
         
@@ -62,40 +109,150 @@ class ISOBuilder:
             )
     
     def create_work_dirs(self):
-        """Create working directories"""
-        self.work_dir = Path(tempfile.mkdtemp(prefix="heckcheckos-build-"))
+        """
+        Create working directories
+        
+        'workspace': {'tmpfs': True} builds in RAM when the predicted size fits
+        'ram_fraction' (default 0.5) of available memory; 'preflight': False
+        skips the free-space checks.
+        """
+        workspace = self.config.get('workspace', {})
+        estimate = self.estimate_space()
+        preflight = workspace.get('preflight', True)
+        
+        if self.persistent_workspace:
+            self.work_dir = self.workspace_path
+            if workspace.get('fresh', False):
+                self.discard_workspace()
+            # A workspace being resumed already holds most of its data
+            if preflight and not (self.work_dir / "rootfs").exists():
+                self.work_dir.parent.mkdir(parents=True, exist_ok=True)
+                WorkspaceManager.preflight(self.work_dir.parent, estimate['workspace'])
+            self.work_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            self.work_dir = self._workspace_manager.create(
+                estimate['workspace'] if preflight else 0,
+                tmpfs=workspace.get('tmpfs', False),
+                ram_fraction=workspace.get('ram_fraction', 0.5)
+            )
+        
+        if preflight:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            WorkspaceManager.preflight(self.output_dir, estimate['iso'], purpose="ISO")
         self.iso_dir = self.work_dir / "iso"
         self.rootfs_dir = self.work_dir / "rootfs"
         
         # Create directory structure
-        (self.iso_dir / "boot" / "grub").mkdir(parents=True)
-        (self.iso_dir / "EFI" / "BOOT").mkdir(parents=True)
-        (self.iso_dir / "live").mkdir(parents=True)
-        self.rootfs_dir.mkdir(parents=True)
+        (self.iso_dir / "boot" / "grub").mkdir(parents=True, exist_ok=True)
+        (self.iso_dir / "EFI" / "BOOT").mkdir(parents=True, exist_ok=True)
+        (self.iso_dir / "live").mkdir(parents=True, exist_ok=True)
+        self.rootfs_dir.mkdir(parents=True, exist_ok=True)
+        
+        if self.config.get('rootfs_overlay', {}).get('enabled', False):
+            self._overlay = OverlayRootfs(self.work_dir, self.rootfs_dir)
+            self._resume_overlay()
         
         print(f"✓ Working directory: {self.work_dir}")
     
+    def _resume_overlay(self):
+        """Remount a persistent workspace's overlay rootfs from its last build"""
+        lower = self._overlay.lower_dir()
+        if lower is None:
+            return
+        cache = self._rootfs_cache()
+        if cache:
+            self._tree_hold = cache.hold_tree(lower.name)
+        if not self._overlay.remount():
+            # The base tree was evicted; the recorded stage results no longer apply
+            print("  ⚠ Base tree of this workspace is gone, rebuilding from scratch")
+            self._overlay.reset()
+            shutil.rmtree(self.work_dir / ".checkpoints", ignore_errors=True)
+    
+    def estimate_space(self) -> dict:
+        """Predicted rootfs, workspace and ISO sizes for this config (see WorkspaceManager)"""
+        package_count = len(self.config.get('packages', []))
+        package_count += sum(len(components) for components in
+                             self.config.get('selected_components', {}).values())
+        extra_bytes = sum(Path(f['path']).stat().st_size
+                          for f in self.config.get('custom_files', [])
+                          if Path(f['path']).is_file())
+        
+        # Measured size of the cached base system beats the generic guess
+        base_bytes = None
+        cache = self._rootfs_cache()
+        if cache:
+            key = RootfsSnapshotCache.make_key(
+                self.BOOTSTRAP_SUITE, self.BOOTSTRAP_ARCH,
+                self.BOOTSTRAP_MIRROR, self.BOOTSTRAP_INCLUDE
+            )
+            meta = cache.lookup(key)
+            if meta and meta.get('tree_size'):
+                base_bytes = meta['tree_size']
+        return WorkspaceManager.estimate(package_count, base_bytes, extra_bytes)
+    
+    def discard_workspace(self):
+        """Delete a persistent workspace so the next build starts from scratch"""
+        if self.persistent_workspace and self.workspace_path.exists():
+            print(f"[*] Discarding workspace {self.workspace_path}...")
+            OverlayRootfs(self.workspace_path, self.workspace_path / "rootfs").unmount()
+            shutil.rmtree(self.workspace_path)
+    
     def bootstrap_base_system(self, progress_callback=None):
-        """Bootstrap Debian 12 base system"""
+        """Bootstrap Debian 12 base system, reusing a cached snapshot when possible"""
         if progress_callback:
-            progress_callback(10, "Bootstrapping Debian 12 (Bookworm)...")
+            progress_callback(0, "Bootstrapping Debian 12 (Bookworm)...")
+        
+        # A resumed workspace may hold an older tree; never bootstrap on top of it
+        if self._overlay:
+            self._overlay.reset()
+            self._release_tree()
+        if any(self.rootfs_dir.iterdir()):
+            shutil.rmtree(self.rootfs_dir)
+            self.rootfs_dir.mkdir(parents=True)
+        
+        cache = self._rootfs_cache()
+        key = RootfsSnapshotCache.make_key(
+            self.BOOTSTRAP_SUITE, self.BOOTSTRAP_ARCH,
+            self.BOOTSTRAP_MIRROR, self.BOOTSTRAP_INCLUDE
+        )
+        if cache and self._overlay:
+            # Starting a build costs a mount, not an extraction
+            self._tree_hold = cache.hold_tree(key)
+            tree = cache.materialize(key)
+            if tree:
+                self._overlay.mount(tree)
+                print(f"✓ Base system mounted from snapshot {key[:12]} (overlay)")
+                return
+            self._release_tree()
+        elif cache and cache.restore(key, self.rootfs_dir):
+            print(f"✓ Base system restored from snapshot {key[:12]}")
+            return
         
         print("[*] Bootstrapping Debian 12 (Bookworm) base system...")
         
         cmd = [
             'debootstrap',
-            '--arch=amd64',
-            '--include=wget,curl,ca-certificates,gnupg,sudo,systemd,network-manager,tpm2-tools,tpm-tools,libtss2-esys0,libtss2-tcti-device0,cpufrequtils,linux-cpupower,amd64-microcode',
-            'bookworm',
+            f'--arch={self.BOOTSTRAP_ARCH}',
+            f'--include={",".join(self.BOOTSTRAP_INCLUDE)}',
+            self.BOOTSTRAP_SUITE,
             str(self.rootfs_dir),
-            'http://deb.debian.org/debian'
+            self.BOOTSTRAP_MIRROR
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = run_tool(cmd, DebootstrapParser(), progress_callback, check=False)
         if result.returncode != 0:
-            raise RuntimeError(f"Debootstrap failed: {result.stderr}")
+            raise RuntimeError(f"Debootstrap failed: {result.stdout}")
         
         print("✓ Base system bootstrapped")
+        
+        if cache:
+            print("[*] Saving base system snapshot...")
+            cache.store(key, self.rootfs_dir, {
+                'suite': self.BOOTSTRAP_SUITE,
+                'arch': self.BOOTSTRAP_ARCH,
+                'mirror': self.BOOTSTRAP_MIRROR,
+                'include': sorted(self.BOOTSTRAP_INCLUDE),
+            })
     
     def configure_repositories(self):
         """Configure Debian repositories"""
@@ -121,7 +278,7 @@ deb http://deb.debian.org/debian bookworm-backports main contrib non-free non-fr
             progress_callback: Progress callback function
         """
         if progress_callback:
-            progress_callback(20, f"Merging components from {len(iso_sources)} ISO sources...")
+            progress_callback(0, f"Merging components from {len(iso_sources)} ISO sources...")
         
         print(f"[*] Merging components from {len(iso_sources)} ISO source(s)...")
         
@@ -129,7 +286,7 @@ deb http://deb.debian.org/debian bookworm-backports main contrib non-free non-fr
         merge_manifest = {
             'iso_sources': iso_sources,
             'selected_components': selected_components,
-            'merge_timestamp': datetime.now().isoformat()
+            'merge_timestamp': build_timestamp(self._source_date_epoch)
         }
         
         # Save merge manifest
@@ -138,41 +295,77 @@ deb http://deb.debian.org/debian bookworm-backports main contrib non-free non-fr
         manifest_file = manifest_dir / "merge-manifest.json"
         manifest_file.write_text(json.dumps(merge_manifest, indent=2))
         
-        # Extract packages from selected components
-        merged_packages = []
+        # Components map to real package sets, checked against the source ISOs' own indexes
+        roots = []
         for category, components in selected_components.items():
             for component in components:
-                # Map component names to package names
-                # This is simplified - in production would parse actual ISO package lists
-                package_name = self._component_to_package(component['name'])
-                if package_name:
-                    merged_packages.append(package_name)
-        
-        print(f"✓ Prepared {len(merged_packages)} packages from merged sources")
+                packages = COMPONENT_PACKAGES.get(component['name'])
+                if packages is None:
+                    print(f"  ⚠ Unknown component {component['name']}, skipping")
+                    continue
+                roots += [name for name in packages if name not in roots]
+        
+        indexes = [index for index in (PackageIndex.for_source(iso) for iso in iso_sources
+                                       if Path(iso).exists())
+                   if len(index)]
+        if not indexes:
+            print("  ⚠ Source ISOs carry no package index, packages are resolved by apt alone")
+            self.extract_merged_packages(iso_sources, roots, progress_callback)
+            print(f"✓ Prepared {len(roots)} packages from merged sources")
+            return roots
+        
+        # Offline builds can only install what the ISOs carry
+        offline = self.config.get('iso_repository', {}).get('offline', False)
+        base = base_packages(indexes)
+        merged_packages = []
+        for name in roots:
+            closure = dependency_closure(indexes, [name], exclude=base)
+            if closure.missing:
+                if offline:
+                    print(f"  ⚠ {name} does not resolve from the source ISOs "
+                          f"({', '.join(closure.missing[:3])}), skipping")
+                    continue
+                print(f"  ⚠ {name} needs packages the source ISOs lack "
+                      f"({', '.join(closure.missing[:3])}); apt fetches them from the mirrors")
+            merged_packages.append(name)
+        
+        closure = dependency_closure(indexes, merged_packages, exclude=base)
+        self.extract_merged_packages(iso_sources, merged_packages, progress_callback)
+        print(f"✓ Prepared {len(merged_packages)} packages from merged sources "
+              f"({len(closure.packages)} with dependencies, "
+              f"{format_size(installed_size(closure))} installed)")
         
         return merged_packages
     
-    def _component_to_package(self, component_name: str) -> str:
-        """Map component name to actual package name"""
-        # Mapping of component display names to actual Debian packages
-        component_map = {
-            'MATE Desktop': 'mate-desktop-environment',
-            'XFCE Desktop': 'xfce4',
-            'KDE Plasma': 'kde-plasma-desktop',
-            'GNOME Desktop': 'gnome',
-            'LibreOffice Suite': 'libreoffice',
-            'GIMP': 'gimp',
-            'Inkscape': 'inkscape',
-            'Blender': 'blender',
-            'GCC/G++ Compilers': 'build-essential',
-            'Python Development': 'python3-dev python3-pip',
-            'Node.js & NPM': 'nodejs npm',
-            'Git & Version Control': 'git',
-            'Network Analysis': 'wireshark nmap',
-            'Forensics Tools': 'sleuthkit testdisk',
-        }
+    def extract_merged_packages(self, iso_sources: list, packages: list, progress_callback=None):
+        """
+        Copy merged packages out of the source ISOs' live squashfs images
         
-        return component_map.get(component_name, None)
+        Controlled by 'squashfs_merge': {'enabled': True, 'processors': None}.
+        Packages found installed in a source's live system (with everything
+        they depend on) are extracted into the rootfs and registered with dpkg
+        as unpacked; the packages stage configures them and apt installs only
+        the rest. Without unsquashfs every package goes through apt.
+        """
+        merge_config = self.config.get('squashfs_merge', {})
+        if not merge_config.get('enabled', True) or not packages:
+            return None
+        if not SquashfsMerge.available():
+            print("  ⚠ unsquashfs not found, merged packages are installed by apt")
+            return None
+        
+        print("[*] Copying merged packages from the source live systems...")
+        merge = SquashfsMerge(self.rootfs_dir, [iso for iso in iso_sources if Path(iso).exists()],
+                              self.work_dir / ".merge", self.BOOTSTRAP_ARCH,
+                              merge_config.get('processors'))
+        try:
+            result = merge.merge(packages, scaled(progress_callback, 10, 100))
+        finally:
+            shutil.rmtree(self.work_dir / ".merge", ignore_errors=True)
+        print(f"✓ Copied {len(result.extracted)} packages ({result.files} files) from source ISOs")
+        if result.left:
+            print(f"  ⚠ Not in any live system, left for apt: {', '.join(result.left[:10])}")
+        return result
     
     def disable_telemetry_and_tracking(self, progress_callback=None):
         """
@@ -180,7 +373,7 @@ deb http://deb.debian.org/debian bookworm-backports main contrib non-free non-fr
         Blocks common telemetry domains and services
         """
         if progress_callback:
-            progress_callback(25, "Disabling telemetry and tracking...")
+            progress_callback(0, "Disabling telemetry and tracking...")
         
         print("[*] Disabling telemetry and blocking unwanted API calls...")
         
@@ -287,7 +480,7 @@ ff02::2         ip6-allrouters
             'blocked_domains_count': 50,
             'disabled_services': systemd_mask_services,
             'dns_privacy': 'enabled',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': build_timestamp(self._source_date_epoch)
         }
         
         privacy_file = privacy_dir / "privacy-config.json"
@@ -480,7 +673,7 @@ For support: See /usr/share/doc/heckcheckos/
         Even if it means reduced functionality
         """
         if progress_callback:
-            progress_callback(28, "Enacting Privacy Over Privilege...")
+            progress_callback(0, "Enacting Privacy Over Privilege...")
         
         print("[*] Enacting Privacy Over Privilege - Maximum privacy mode...")
         
@@ -649,7 +842,7 @@ Defaults secure_path="/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/b
                 "enable_network_discovery": "Edit /etc/NetworkManager/conf.d/heckcheckos-privacy.conf",
                 "enable_captive_portal": "Set enabled=true in NetworkManager connectivity section"
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": build_timestamp(self._source_date_epoch)
         }
         
         privacy_manifest.write_text(json.dumps(manifest_data, indent=2))
@@ -690,7 +883,7 @@ EOF
         Balances privacy with program functionality
         """
         if progress_callback:
-            progress_callback(32, "Configuring program autonomy...")
+            progress_callback(0, "Configuring program autonomy...")
         
         print("[*] Configuring program autonomy - Allow natural program operations...")
         
@@ -905,7 +1098,7 @@ allow_localhost_apis=yes
                 "development": "Can use localhost services, databases, web servers",
                 "communication": "Slack, Discord, etc. can operate normally"
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": build_timestamp(self._source_date_epoch)
         }
         
         autonomy_manifest.write_text(json.dumps(manifest_data, indent=2))
@@ -927,9 +1120,14 @@ allow_localhost_apis=yes
         print("  ✓ No interference with standard program operations")
     
     def apply_theme(self, theme_config: dict, progress_callback=None):
-        """Apply theme configuration to the system"""
+        """
+        Apply theme configuration to the system
+        
+        Returns:
+            Rootfs-relative paths written
+        """
         if progress_callback:
-            progress_callback(30, "Applying theme customizations...")
+            progress_callback(0, "Applying theme customizations...")
         
         print(f"[*] Applying theme: {theme_config.get('mode', 'default')}")
         
@@ -940,12 +1138,13 @@ allow_localhost_apis=yes
         # Write theme configuration
         theme_file = theme_dir / "current.json"
         theme_file.write_text(json.dumps(theme_config, indent=2))
+        written = [str(theme_file.relative_to(self.rootfs_dir))]
         
         # Apply theme mode
         mode = theme_config.get('mode', 'default')
+        gtk_settings = self.rootfs_dir / "etc" / "gtk-3.0" / "settings.ini"
         if mode == 'dark':
             # Set dark theme as default
-            gtk_settings = self.rootfs_dir / "etc" / "gtk-3.0" / "settings.ini"
             gtk_settings.parent.mkdir(parents=True, exist_ok=True)
             gtk_settings.write_text("""[Settings]
 gtk-application-prefer-dark-theme=1
@@ -954,20 +1153,22 @@ gtk-icon-theme-name=Adwaita
 """)
         elif mode == 'gaming':
             # Gaming-optimized theme
-            gtk_settings = self.rootfs_dir / "etc" / "gtk-3.0" / "settings.ini"
             gtk_settings.parent.mkdir(parents=True, exist_ok=True)
             gtk_settings.write_text("""[Settings]
 gtk-theme-name=Adwaita-dark
 gtk-icon-theme-name=Adwaita
 gtk-enable-animations=0
 """)
+        if mode in ('dark', 'gaming'):
+            written.append(str(gtk_settings.relative_to(self.rootfs_dir)))
         
         print("✓ Theme applied")
+        return written
     
     def configure_amd_am5_support(self, progress_callback=None):
         """Configure AMD AM5 platform with 3D V-Cache support"""
         if progress_callback:
-            progress_callback(33, "Configuring AMD AM5 3D V-Cache support...")
+            progress_callback(0, "Configuring AMD AM5 3D V-Cache support...")
         
         print("[*] Configuring AMD AM5 platform with 3D V-Cache support...")
         
@@ -1095,47 +1296,102 @@ https://www.kernel.org/doc/html/latest/admin-guide/pm/amd-pstate.html
             return
         
         if progress_callback:
-            progress_callback(40, f"Installing {len(packages)} custom packages...")
+            progress_callback(0, f"Installing {len(packages)} custom packages...")
         
         print(f"[*] Installing custom packages: {', '.join(packages[:5])}...")
         
-        # Update package cache
-        self._run_in_chroot(['apt-get', 'update'])
+        cache_config = self.config.get('apt_cache', {})
+        cache = None
+        
+        with ExitStack() as stack:
+            apt_get = ['apt-get']
+            binds = []
+            
+            # Source ISOs first, so their pools win over the network mirrors
+            repos = self.iso_repositories()
+            if repos:
+                stack.enter_context(repos)
+                binds += repos.binds()
+                apt_get += repos.apt_options()
+            
+            if cache_config.get('enabled', True):
+                cache = AptArchiveCache(cache_config.get('dir'))
+                stack.enter_context(cache.using())
+                cache.seed_lists(self.rootfs_dir)
+                binds += cache.binds()
+            
+            chroot = stack.enter_context(self.chroot_session(fast_install=True, binds=binds))
+            # apt reports machine-readable download and dpkg progress on this fd
+            apt_status = ['-o', 'APT::Status-Fd=1']
+            if cache:
+                # Downloads go into the shared archive, one build at a time
+                with cache.downloading():
+                    chroot.run(apt_get + ['update'])
+                    chroot.run(apt_get + apt_status + ['install', '-y', '--download-only'] + packages,
+                               parser=AptStatusParser(download_share=100),
+                               progress_callback=scaled(progress_callback, 5, 35))
+                cache.save_lists(self.rootfs_dir)
+                
+                # Everything is cached now; other builds may read the archive concurrently
+                chroot.run(apt_get + apt_status + ['-o', 'Debug::NoLocking=true', 'install', '-y'] + packages,
+                           parser=AptStatusParser(download_share=0),
+                           progress_callback=scaled(progress_callback, 35, 100))
+            else:
+                chroot.run(apt_get + ['update'])
+                chroot.run(apt_get + apt_status + ['install', '-y'] + packages,
+                           parser=AptStatusParser(),
+                           progress_callback=scaled(progress_callback, 5, 100))
         
-        # Install packages
-        self._run_in_chroot(['apt-get', 'install', '-y'] + packages)
+        if cache:
+            max_gb = cache_config.get('max_size_gb')
+            cache.prune(cache_config.get('max_age_days'),
+                        int(max_gb * 1024 ** 3) if max_gb is not None else None,
+                        blocking=False)
         
         print("✓ Custom packages installed")
     
     def add_custom_files(self, custom_files: list, progress_callback=None):
-        """Add custom files to the system"""
+        """
+        Add custom files to the system
+        
+        Returns:
+            Rootfs-relative paths written
+        """
         if not custom_files:
-            return
+            return []
         
         if progress_callback:
-            progress_callback(50, f"Adding {len(custom_files)} custom files...")
+            progress_callback(0, f"Adding {len(custom_files)} custom files...")
         
         print(f"[*] Adding {len(custom_files)} custom files...")
         
         custom_dir = self.rootfs_dir / "opt" / "custom"
         custom_dir.mkdir(parents=True, exist_ok=True)
         
+        written = []
         for file_info in custom_files:
             src = Path(file_info['path'])
             if src.exists():
                 dest = custom_dir / src.name
                 shutil.copy2(src, dest)
+                written.append(str(dest.relative_to(self.rootfs_dir)))
                 print(f"  + {src.name}")
         
         print("✓ Custom files added")
+        return written
     
     def install_heckcheckos_builder(self, self_install_config: dict, progress_callback=None):
-        """Install Heck-CheckOS Builder to the ISO"""
+        """
+        Install Heck-CheckOS Builder to the ISO
+        
+        Returns:
+            Rootfs-relative paths written
+        """
         if not self_install_config.get('enabled', False):
-            return
+            return []
         
         if progress_callback:
-            progress_callback(60, "Installing Heck-CheckOS Builder...")
+            progress_callback(0, "Installing Heck-CheckOS Builder...")
         
         print("[*] Installing Heck-CheckOS Builder to ISO...")
         
@@ -1146,6 +1402,7 @@ https://www.kernel.org/doc/html/latest/admin-guide/pm/amd-pstate.html
         # Copy GUI builder files
         gui_src = Path(__file__).parent
         shutil.copytree(gui_src, builder_dir / "gui", dirs_exist_ok=True)
+        written = [str(builder_dir.relative_to(self.rootfs_dir))]
         
         # Create desktop entry
         if self_install_config.get('desktop_entry', True):
@@ -1160,6 +1417,7 @@ Icon=applications-system
 Terminal=false
 Categories=System;Settings;
 """)
+            written.append(str(desktop_file.relative_to(self.rootfs_dir)))
         
         # Create CLI launcher
         if self_install_config.get('cli_launcher', True):
@@ -1170,8 +1428,10 @@ cd /opt/heckcheckos-builder/gui
 python3 main.py "$@"
 """)
             launcher.chmod(0o755)
+            written.append(str(launcher.relative_to(self.rootfs_dir)))
         
         print("✓ Heck-CheckOS Builder installed")
+        return written
     
     def create_grub_config(self, version: str):
         """Create GRUB bootloader configuration with TPM and AMD AM5 3D V-Cache support"""
@@ -1229,9 +1489,15 @@ menuentry "👻 Heck-CheckOS {version} - No TPM Mode" {{
         print("✓ GRUB configuration created with TPM and AMD AM5 support")
     
     def create_squashfs(self, progress_callback=None):
-        """Create squashfs filesystem"""
+        """
+        Create squashfs filesystem
+        
+        Compression follows 'squashfs': {'profile': 'max-ratio', 'processors': None,
+        'mem': None}; see squashfs_profiles.py for the profiles. With 'layered': True
+        the rootfs is split into stacked images (see squashfs_layers.py).
+        """
         if progress_callback:
-            progress_callback(70, "Creating compressed filesystem...")
+            progress_callback(0, "Creating compressed filesystem...")
         
         print("[*] Creating squashfs filesystem...")
         
@@ -1244,19 +1510,40 @@ menuentry "👻 Heck-CheckOS {version} - No TPM Mode" {{
         if initrd:
             shutil.copy2(initrd[0], self.iso_dir / "live" / "initrd.img")
         
-        # Create squashfs
-        squashfs_file = self.iso_dir / "live" / "filesystem.squashfs"
-        cmd = [
-            'mksquashfs',
-            str(self.rootfs_dir),
-            str(squashfs_file),
-            '-comp', 'xz',
-            '-b', '1M',
-            '-Xbcj', 'x86',
-            '-e', 'boot'
-        ]
+        squashfs_config = self.config.get('squashfs', {})
+        profile = get_profile(squashfs_config.get('profile'))
+        print(f"  [*] Compression profile: {profile.name}")
+        
+        live_dir = self.iso_dir / "live"
+        squashfs_file = live_dir / "filesystem.squashfs"
+        if self._squashfs_layers:
+            # Images from a previous single-image build would be stacked too
+            squashfs_file.unlink(missing_ok=True)
+            images = self._squashfs_layers.build(
+                self.rootfs_dir, live_dir, profile,
+                processors=squashfs_config.get('processors'),
+                memory=squashfs_config.get('mem'),
+                progress_callback=progress_callback,
+                mkfs_time=self._source_date_epoch
+            )
+            print(f"✓ Squashfs created ({len(images)} layers)")
+            return
         
-        subprocess.run(cmd, check=True)
+        for stale in live_dir.glob("[0-9][0-9]-*.squashfs"):
+            stale.unlink()
+        (live_dir / SquashfsLayers.MODULE_FILE).unlink(missing_ok=True)
+        cmd = mksquashfs_command(
+            self.rootfs_dir,
+            squashfs_file,
+            profile,
+            processors=squashfs_config.get('processors'),
+            memory=squashfs_config.get('mem'),
+            excludes=['boot'],
+            percentage=True,
+            mkfs_time=self._source_date_epoch
+        )
+        
+        run_tool(cmd, MksquashfsParser(), progress_callback)
         print("✓ Squashfs created")
     
     def create_bootloader(self):
@@ -1264,9 +1551,12 @@ menuentry "👻 Heck-CheckOS {version} - No TPM Mode" {{
         print("[*] Creating bootloader...")
         
         grub_cfg = self.iso_dir / "boot" / "grub" / "grub.cfg"
+        if self._source_date_epoch is not None:
+            # grub-mkstandalone stores grub.cfg with its mtime in the embedded memdisk
+            clamp_mtimes(grub_cfg, self._source_date_epoch)
         
         # EFI bootloader
-        subprocess.run([
+        run_command([
             'grub-mkstandalone',
             '--format=x86_64-efi',
             f'--output={self.iso_dir}/EFI/BOOT/BOOTX64.EFI',
@@ -1277,7 +1567,7 @@ menuentry "👻 Heck-CheckOS {version} - No TPM Mode" {{
         
         # BIOS bootloader
         core_img = self.iso_dir / "boot" / "grub" / "core.img"
-        subprocess.run([
+        run_command([
             'grub-mkstandalone',
             '--format=i386-pc',
             f'--output={core_img}',
@@ -1301,7 +1591,7 @@ menuentry "👻 Heck-CheckOS {version} - No TPM Mode" {{
     def build_iso(self, output_filename: str, progress_callback=None):
         """Build the final ISO file"""
         if progress_callback:
-            progress_callback(90, "Building ISO image...")
+            progress_callback(0, "Building ISO image...")
         
         print("[*] Building ISO image...")
         
@@ -1326,125 +1616,492 @@ menuentry "👻 Heck-CheckOS {version} - No TPM Mode" {{
             '-e', 'EFI/BOOT/BOOTX64.EFI',
             '-no-emul-boot',
             '-isohybrid-gpt-basdat',
-            '-output', str(output_path),
-            str(self.iso_dir)
         ]
+        if self._source_date_epoch is not None:
+            # Fixed volume dates and UUIDs; file dates come from the clamped tree
+            clamp_mtimes(self.iso_dir, self._source_date_epoch)
+            cmd += xorriso_options(self._source_date_epoch)
+        cmd += ['-output', str(output_path), str(self.iso_dir)]
         
-        subprocess.run(cmd, check=True)
+        run_tool(cmd, XorrisoParser(), scaled(progress_callback, 0, 50), echo=True)
         
-        # Make hybrid ISO
-        subprocess.run(['isohybrid', '--uefi', str(output_path)], check=True)
+        if progress_callback:
+            progress_callback(50, "Computing checksums...")
         
-        # Create checksums
-        subprocess.run(['md5sum', output_filename], 
-                      cwd=self.output_dir,
-                      stdout=open(output_path.with_suffix('.iso.md5'), 'w'))
+        # Hybrid boot records (if xorriso didn't write them) and every checksum in one read
+        self._iso_digests = finalize_image(output_path, self.config.get('checksums'))
         
-        subprocess.run(['sha256sum', output_filename],
-                      cwd=self.output_dir,
-                      stdout=open(output_path.with_suffix('.iso.sha256'), 'w'))
+        if self.config.get('delta', {}).get('enabled', False):
+            self.write_delta(output_path, scaled(progress_callback, 60, 100))
         
         print(f"✓ ISO created: {output_path}")
         return output_path
     
+    def write_delta(self, output_path: Path, progress_callback=None):
+        """
+        Write the chunk index of a new ISO and its delta against a previous build
+        
+        Controlled by 'delta': {'enabled': False, 'base': None}; without a base
+        the newest earlier ISO of the same series (kind and variant) in the
+        output directory is used. See iso_delta.py for applying the delta.
+        """
+        base = self.config['delta'].get('base')
+        base = Path(base) if base else find_base(self.output_dir, output_path)
+        if base is None or not base.exists():
+            print("  ⚠ No previous ISO to write a delta against, skipping delta")
+            return None
+        if progress_callback:
+            progress_callback(0, f"Writing delta against {base.name}...")
+        print(f"  [*] Writing delta against {base.name}...")
+        summary = create_delta(base, output_path, progress_callback=progress_callback)
+        print(f"  ✓ Delta {summary['path'].name}: {summary['delta_size'] / 1024 ** 2:.1f} MB "
+              f"({summary['copied'] * 100 // max(summary['target_size'], 1)}% of the image reused)")
+        return summary['path']
+    
+    def _rootfs_cache(self):
+        """Snapshot cache per 'rootfs_cache': {'enabled', 'max_size_gb', 'dir'}, or None"""
+        cache_config = self.config.get('rootfs_cache', {})
+        if not cache_config.get('enabled', True):
+            return None
+        max_gb = cache_config.get('max_size_gb')
+        return RootfsSnapshotCache(
+            cache_config.get('dir'),
+            int(max_gb * 1024 ** 3) if max_gb is not None else None
+        )
+    
+    def _release_tree(self):
+        if self._tree_hold:
+            self._tree_hold.close()
+            self._tree_hold = None
+    
+    def normalize_rootfs(self, progress_callback=None):
+        """Drop per-build state from the rootfs and clamp its mtimes to SOURCE_DATE_EPOCH"""
+        if progress_callback:
+            progress_callback(0, "Normalizing rootfs for a reproducible build...")
+        
+        print("[*] Normalizing rootfs for a reproducible build...")
+        scrubbed = scrub_rootfs(self.rootfs_dir)
+        changed = clamp_mtimes(self.rootfs_dir, self._source_date_epoch)
+        print(f"✓ Rootfs normalized ({len(scrubbed)} paths scrubbed, {changed} mtimes clamped "
+              f"to {build_timestamp(self._source_date_epoch)})")
+    
     def cleanup(self):
         """Clean up temporary files"""
+        # Unmount before anything could delete through the merged view
+        if self._overlay:
+            self._overlay.unmount()
+        self._release_tree()
+        if self.persistent_workspace:
+            if self.work_dir:
+                print(f"✓ Workspace kept for resume: {self.work_dir}")
+            return
         if self.work_dir and self.work_dir.exists():
-            print("[*] Cleaning up temporary files...")
-            shutil.rmtree(self.work_dir)
+            # Deleting GBs of rootfs must not hold up reporting the finished ISO
+            print("[*] Cleaning up temporary files in the background...")
+            self._workspace_manager.teardown(self.work_dir)
+    
+    def chroot_session(self, fast_install: bool = False, binds: list = None) -> ChrootSession:
+        """
+        Open a chroot session on the rootfs
+        
+        Mounts happen once for the whole session. fast_install is honoured
+        unless the build config turns it off via 'chroot': {'fast_install': False}.
+        """
+        chroot_config = self.config.get('chroot', {})
+        return ChrootSession(
+            self.rootfs_dir,
+            fast_install=fast_install and chroot_config.get('fast_install', True),
+            trigger_policy=chroot_config.get('trigger_policy', 'defer'),
+            binds=binds
+        )
+    
+    def iso_repositories(self):
+        """
+        Source ISOs as local apt repositories, or None if disabled
+        
+        Controlled by 'iso_repository': {'enabled': True, 'offline': False};
+        offline builds install from the ISOs only.
+        """
+        repo_config = self.config.get('iso_repository', {})
+        iso_sources = self.config.get('iso_sources', [])
+        if not iso_sources or not repo_config.get('enabled', True):
+            return None
+        return IsoRepositories(
+            iso_sources,
+            self.work_dir / "iso-mounts",
+            self.rootfs_dir,
+            offline=repo_config.get('offline', False)
+        )
     
     def _run_in_chroot(self, cmd: list):
-        """Run command in chroot environment"""
-        # Mount required filesystems
-        for mount in ['dev', 'dev/pts', 'proc', 'sys']:
-            target = self.rootfs_dir / mount
-            if not target.exists():
-                target.mkdir(parents=True, exist_ok=True)
-            subprocess.run(['mount', '--bind', f'/{mount}', str(target)], check=False)
+        """Run a single command in the chroot environment"""
+        with self.chroot_session() as chroot:
+            chroot.run(cmd)
+    
+    def _is_merge_build(self) -> bool:
+        return 'iso_sources' in self.config and len(self.config['iso_sources']) > 1
+    
+    def _install_packages_stage(self, progress_callback):
+        """Install configured packages plus whatever the merge stage selected"""
+        merged_packages = self._stage_results.get('merge') or []
+        if unpacked_packages(self.rootfs_dir):
+            # Packages copied from the source live systems still need their maintainer scripts
+            with self.chroot_session() as chroot:
+                # Config stages' edits to conffiles win over the packages' versions
+                if chroot.run(['dpkg', '--force-confdef', '--force-confold', '--configure', '-a'],
+                              check=False).returncode != 0:
+                    print("  ⚠ dpkg could not configure every copied package; apt will retry")
+        all_packages = self.config.get('packages', []) + merged_packages
+        if all_packages:
+            self.install_custom_packages(all_packages, progress_callback)
+        return all_packages
+    
+    def _remove_rootfs_paths(self, paths):
+        """Undo a stage that wrote the given rootfs-relative paths"""
+        for rel in paths or []:
+            path = self.rootfs_dir / rel
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+    
+    def _remove_packages(self, packages, keep=()):
+        """Undo a stage that installed packages, except the ones still wanted"""
+        stale = [name for name in packages or [] if name not in set(keep)]
+        if not stale:
+            return
+        print(f"[*] Removing packages from the last build: {', '.join(stale[:5])}...")
+        # Remove, not purge: conffiles the config stages pre-seeded stay in place
+        with self.chroot_session() as chroot:
+            if chroot.run(['apt-get', 'remove', '-y', '--autoremove'] + stale,
+                          check=False).returncode != 0:
+                print("  ⚠ Some packages from the last build could not be removed")
+    
+    def _merge_stage(self, progress_callback):
+        return self.merge_iso_components(
+            self.config['iso_sources'],
+            self.config.get('selected_components', {}),
+            progress_callback
+        )
+    
+    def _iso_stage(self, filename: str, progress_callback):
+        return str(self.build_iso(filename, progress_callback))
+    
+    def _build_stages(self, filename: str) -> list:
+        """
+        Describe the build as a stage graph
         
-        try:
-            # Run command in chroot
-            subprocess.run(['chroot', str(self.rootfs_dir)] + cmd, check=True)
-        finally:
-            # Unmount
-            for mount in ['sys', 'proc', 'dev/pts', 'dev']:
-                subprocess.run(['umount', str(self.rootfs_dir / mount)], check=False)
+        Resources named 'rootfs:*' are parts of the root filesystem and 'iso:*'
+        parts of the ISO tree. A stage runs once every producer of its inputs
+        has finished, so independent stages share the worker pool. The
+        fingerprint/input_files/tools of a stage decide whether a resumed
+        build can reuse its previous run.
+        """
+        config = self.config
+        layered = config.get('squashfs', {}).get('layered', False)
+        stages = [
+            BuildStage('bootstrap', self.bootstrap_base_system,
+                       outputs=['rootfs:base'], weight=30,
+                       fingerprint=[self.BOOTSTRAP_SUITE, self.BOOTSTRAP_ARCH,
+                                    self.BOOTSTRAP_MIRROR, sorted(self.BOOTSTRAP_INCLUDE)],
+                       tools=['debootstrap'],
+                       description="Bootstrapping Debian 12 (Bookworm)..."),
+            BuildStage('repositories', lambda progress: self.configure_repositories(),
+                       inputs=['rootfs:base'], outputs=['rootfs:apt-sources'],
+                       description="Configuring Debian repositories..."),
+            # Disable telemetry and location verification (ALWAYS applied for privacy)
+            BuildStage('telemetry', self.disable_telemetry_and_tracking,
+                       inputs=['rootfs:base'], outputs=['rootfs:telemetry'],
+                       description="Disabling telemetry and tracking..."),
+            # Enact Privacy Over Privilege (restricts convenient features for privacy)
+            BuildStage('privacy', self.enact_privacy_over_privilege,
+                       inputs=['rootfs:base'], outputs=['rootfs:privacy'],
+                       description="Enacting Privacy Over Privilege..."),
+            # Program Autonomy amends the Privacy Over Privilege manifest
+            BuildStage('autonomy', self.configure_program_autonomy,
+                       inputs=['rootfs:base', 'rootfs:privacy'], outputs=['rootfs:autonomy'],
+                       description="Configuring program autonomy..."),
+            BuildStage('amd-am5', self.configure_amd_am5_support,
+                       inputs=['rootfs:base'], outputs=['rootfs:amd-am5'],
+                       description="Configuring AMD AM5 3D V-Cache support..."),
+        ]
+        
+        # Stages that become their own squashfs layer in a layered build. They
+        # also run after packages in a variant build, where they are what the
+        # variants usually differ in, so the packages stage stays shared
+        upper_stages = []
+        after_packages = layered or bool(config.get('variant'))
+        
+        if 'theme' in config:
+            theme_stage = BuildStage(
+                'theme', lambda progress: self.apply_theme(config['theme'], progress),
+                inputs=['rootfs:base'], outputs=['rootfs:theme'],
+                fingerprint=config['theme'], undo=self._remove_rootfs_paths,
+                description="Applying theme customizations...")
+            (upper_stages if after_packages else stages).append(theme_stage)
+        
+        if self._is_merge_build():
+            # Merged packages unpack into the same rootfs, so they go in after
+            # every config stage; existing conffiles are kept (see squashfs_merge.py)
+            stages.append(BuildStage(
+                'merge', self._merge_stage,
+                inputs=[output for stage in stages for output in stage.outputs
+                        if output != 'rootfs:base'],
+                outputs=['rootfs:merge-info', 'packages:merged'],
+                fingerprint=[config['iso_sources'], config.get('selected_components', {}),
+                             config.get('squashfs_merge', {})],
+                input_files=config['iso_sources'],
+                # Extraction only adds files; packages no longer selected must go
+                undo=lambda previous: self._remove_packages(previous, keep=config.get('packages', [])),
+                description=f"Merging {len(config['iso_sources'])} ISO sources..."))
+        
+        # Packages go in after every config stage so dpkg sees the final
+        # apt pins and pre-seeded conffiles, exactly as in a sequential build
+        stages.append(BuildStage(
+            'packages', self._install_packages_stage,
+            inputs=[output for stage in stages for output in stage.outputs
+                    if output != 'rootfs:base'],
+            outputs=['rootfs:packages'], weight=25,
+            fingerprint=[config.get('packages', []), config.get('iso_repository', {})],
+            input_files=config.get('iso_sources', []),
+            undo=lambda previous: self._remove_packages(
+                previous, keep=config.get('packages', []) + (self._stage_results.get('merge') or [])),
+            description="Installing custom packages..."))
+        
+        if 'custom_files' in config:
+            upper_stages.append(BuildStage(
+                'custom-files', lambda progress: self.add_custom_files(config['custom_files'], progress),
+                inputs=['rootfs:base'], outputs=['rootfs:custom-files'],
+                fingerprint=config['custom_files'],
+                input_files=[f['path'] for f in config['custom_files']],
+                undo=self._remove_rootfs_paths,
+                description="Adding custom files..."))
+        
+        if 'self_install' in config:
+            upper_stages.append(BuildStage(
+                'self-install',
+                lambda progress: self.install_heckcheckos_builder(config['self_install'], progress),
+                inputs=['rootfs:base'], outputs=['rootfs:builder'], weight=2,
+                fingerprint=config['self_install'],
+                input_files=[Path(__file__).parent] if config['self_install'].get('enabled') else [],
+                undo=self._remove_rootfs_paths,
+                description="Installing Heck-CheckOS Builder..."))
+        
+        self._squashfs_layers = None
+        if layered:
+            # Upper layers run one after another on top of the finished base,
+            # so each one's rootfs changes can be told apart
+            self._squashfs_layers = SquashfsLayers(
+                self.work_dir / ".layers",
+                ['base'] + [stage.name for stage in upper_stages],
+                excludes=['boot']
+            )
+            previous = 'rootfs:packages'
+            for stage in upper_stages:
+                stage.func = self._squashfs_layers.capture(stage.name, self.rootfs_dir, stage.func)
+                stage.inputs = [previous]
+                previous = stage.outputs[0]
+        elif after_packages:
+            for stage in upper_stages:
+                stage.inputs = ['rootfs:packages']
+        stages += upper_stages
+        
+        # Bootloader generation only needs the ISO tree, not the rootfs
+        version = config.get('version', 'custom')
+        stages += [
+            BuildStage('grub-config', lambda progress: self.create_grub_config(version),
+                       outputs=['iso:grub-cfg'], fingerprint=version,
+                       description="Creating GRUB configuration..."),
+            BuildStage('bootloader', lambda progress: self.create_bootloader(),
+                       inputs=['iso:grub-cfg'], outputs=['iso:bootloader'], weight=3,
+                       fingerprint=self._source_date_epoch,
+                       input_files=['/usr/lib/grub/i386-pc/cdboot.img'],
+                       tools=['grub-mkstandalone'],
+                       description="Creating bootloader..."),
+        ]
+        
+        rootfs_outputs = [output for stage in stages for output in stage.outputs
+                          if output.startswith('rootfs:')]
+        if self._source_date_epoch is not None:
+            # Reproducible mode: runs after every rootfs change, right before compression
+            stages.append(BuildStage(
+                'normalize', self.normalize_rootfs,
+                inputs=rootfs_outputs, outputs=['rootfs:normalized'],
+                fingerprint=self._source_date_epoch,
+                description="Normalizing rootfs for a reproducible build..."))
+            rootfs_outputs = rootfs_outputs + ['rootfs:normalized']
+        stages += [
+            BuildStage('squashfs', self.create_squashfs,
+                       inputs=rootfs_outputs, outputs=['iso:live'], weight=25,
+                       fingerprint=[get_profile(config.get('squashfs', {}).get('profile')).name,
+                                    layered],
+                       tools=['mksquashfs'],
+                       description="Creating compressed filesystem..."),
+            BuildStage('iso', lambda progress: self._iso_stage(filename, progress),
+                       inputs=['iso:live', 'iso:bootloader'], outputs=['iso:image'], weight=8,
+                       # Always written fresh under a new timestamped name
+                       checkpoint=False,
+                       description="Building ISO image..."),
+        ]
+        return stages
+    
+    def output_filename(self) -> str:
+        """Name of the ISO this build will produce"""
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        # Include merge indicator in filename if multiple ISOs
+        kind = "merged" if self._is_merge_build() else "custom"
+        # Variants of one fan-out build are told apart by name (see variant_builds.py)
+        if self.config.get('variant'):
+            return f"Heck-CheckOS-{kind}-{self.config['variant']}-{timestamp}.iso"
+        return f"Heck-CheckOS-{kind}-{timestamp}.iso"
+    
+    def stage_fingerprints(self, work_dir: Path) -> dict:
+        """
+        Checkpoint fingerprint of every build stage, for a workspace at work_dir
+        
+        Stages with equal fingerprints produce the same rootfs and ISO tree
+        changes, whichever config they were described by. Stages that are never
+        checkpointed (the ISO image itself) are left out.
+        """
+        self.work_dir = Path(work_dir)
+        self.iso_dir = self.work_dir / "iso"
+        self.rootfs_dir = self.work_dir / "rootfs"
+        scheduler = StageScheduler(self._build_stages(self.output_filename()))
+        fingerprints = stage_fingerprints(scheduler.stages, scheduler.dependencies,
+                                          scheduler.order, StageCheckpoints.FORMAT_VERSION)
+        return {name: value for name, value in fingerprints.items()
+                if scheduler.stages[name].checkpoint}
+    
+    def _artifact_fingerprints(self) -> dict:
+        """
+        Stage fingerprints for the artifact store key, without a workspace
+        
+        Fingerprints do not depend on where the workspace is, so a placeholder
+        location is described and forgotten again.
+        """
+        fingerprints = self.stage_fingerprints(
+            self.workspace_path if self.persistent_workspace else self.output_dir / ".workspace")
+        self.work_dir = self.iso_dir = self.rootfs_dir = None
+        return fingerprints
     
-    def build(self, progress_callback=None):
-        """Execute full build process"""
+    def _artifact_store(self):
+        """
+        Store of finished ISOs, or None if disabled
+        
+        Controlled by 'artifact_store': {'enabled': False, 'dir': None,
+        'keep_per_config': 3, 'max_size_gb': None}; the default directory is
+        <output dir>/.artifacts so stored ISOs are hardlinks, not copies. Off by
+        default: the key does not see the mirrors, so a hit can carry package
+        versions the mirrors have since replaced.
+        """
+        store_config = self.config.get('artifact_store', {})
+        if not store_config.get('enabled', False):
+            return None
+        max_gb = store_config.get('max_size_gb')
+        return ArtifactStore(
+            store_config.get('dir') or self.output_dir / ".artifacts",
+            int(max_gb * 1024 ** 3) if max_gb is not None else None,
+            store_config.get('keep_per_config')
+        )
+    
+    def _telemetry(self, filename: str):
+        """
+        Per-stage telemetry written next to the ISO, or None if disabled
+        
+        Controlled by 'telemetry': {'enabled': True, 'measure_disk': True}.
+        """
+        telemetry_config = self.config.get('telemetry', {})
+        if not telemetry_config.get('enabled', True):
+            return None
+        return BuildTelemetry(
+            self.output_dir / f"{filename}.telemetry.jsonl",
+            watch_dirs={'rootfs': self.rootfs_dir, 'iso': self.iso_dir},
+            measure_disk=telemetry_config.get('measure_disk', True)
+        )
+    
+    def build(self, progress_callback=None, stage_names=None):
+        """
+        Execute full build process
+        
+        Args:
+            progress_callback: Called with (percent, message)
+            stage_names: Run only these stages, which must include everything they
+                         depend on; used to prepare a workspace that is built on
+                         later. Without the 'iso' stage no image is written and
+                         None is returned.
+        """
         try:
+            filename = self.output_filename()
+            
+            # An identical build (same stage fingerprints) resolves to the stored
+            # ISO, before any tool check or workspace setup; a build asked to
+            # start fresh is built (and stored) anew
+            store = self._artifact_store() if stage_names is None else None
+            if store:
+                artifact_key = ArtifactStore.make_key(self._artifact_fingerprints(),
+                                                      self.config.get('checksums'))
+                fresh = self.config.get('workspace', {}).get('fresh', False)
+                output_path = None if fresh else store.checkout(
+                    artifact_key, self.output_dir / filename, self.config.get('checksums'))
+                if output_path:
+                    print(f"✓ Identical build found in the artifact store ({artifact_key[:12]}): {output_path}")
+                    telemetry = self._telemetry(filename)
+                    if telemetry:
+                        telemetry.emit('artifact_reused', key=artifact_key, path=str(output_path))
+                    # Clients updating from the previous build still need their delta
+                    if self.config.get('delta', {}).get('enabled', False):
+                        self.write_delta(output_path, progress_callback)
+                    if progress_callback:
+                        progress_callback(100, "Build complete (identical ISO reused)!")
+                    return output_path
+            
             # Check dependencies
             self.check_dependencies()
             
             # Create working directories
             self.create_work_dirs()
             
-            # Bootstrap base system
-            self.bootstrap_base_system(progress_callback)
-            
-            # Configure repositories
-            self.configure_repositories()
+            stages = self._build_stages(filename)
+            if stage_names is not None:
+                stages = [stage for stage in stages if stage.name in stage_names]
+            telemetry = self._telemetry(filename)
+            if telemetry:
+                for stage in stages:
+                    stage.func = telemetry.wrap(stage.name, stage.func)
             
-            # Disable telemetry and location verification (ALWAYS applied for privacy)
-            self.disable_telemetry_and_tracking(progress_callback)
-            
-            # Enact Privacy Over Privilege (restricts convenient features for privacy)
-            self.enact_privacy_over_privilege(progress_callback)
-            
-            # Configure Program Autonomy (allow programs to operate naturally)
-            self.configure_program_autonomy(progress_callback)
-            
-            # Configure AMD AM5 3D V-Cache support
-            self.configure_amd_am5_support(progress_callback)
-            
-            # Merge ISO components if multiple sources provided
-            merged_packages = []
-            if 'iso_sources' in self.config and len(self.config['iso_sources']) > 1:
-                if progress_callback:
-                    iso_count = len(self.config['iso_sources'])
-                    progress_callback(15, f"Merging {iso_count} ISO sources...")
-                
-                merged_packages = self.merge_iso_components(
-                    self.config['iso_sources'],
-                    self.config.get('selected_components', {}),
-                    progress_callback
-                )
-            
-            # Apply theme
-            if 'theme' in self.config:
-                self.apply_theme(self.config['theme'], progress_callback)
-            
-            # Install custom packages (including merged packages)
-            all_packages = self.config.get('packages', []) + merged_packages
-            if all_packages:
-                self.install_custom_packages(all_packages, progress_callback)
-            
-            # Add custom files
-            if 'custom_files' in self.config:
-                self.add_custom_files(self.config['custom_files'], progress_callback)
-            
-            # Install Heck-CheckOS Builder if enabled
-            if 'self_install' in self.config:
-                self.install_heckcheckos_builder(self.config['self_install'], progress_callback)
-            
-            # Create GRUB config
-            version = self.config.get('version', 'custom')
-            self.create_grub_config(version)
+            scheduler = StageScheduler(
+                stages,
+                max_workers=self.config.get('build_workers'),
+                progress_callback=progress_callback
+            )
+            self._stage_results = scheduler.results
             
-            # Create squashfs
-            self.create_squashfs(progress_callback)
+            # Resume: reuse stages whose inputs are unchanged since the last run
+            checkpoints = None
+            if self.persistent_workspace:
+                checkpoints = StageCheckpoints(self.work_dir / ".checkpoints")
+                checkpoints.compute(scheduler.stages, scheduler.dependencies, scheduler.order)
             
-            # Create bootloader
-            self.create_bootloader()
+            if telemetry:
+                telemetry.build_start(version=self.config.get('version', 'custom'),
+                                      workers=scheduler.max_workers,
+                                      stages=scheduler.order)
+            status = 'failed'
+            try:
+                # Reproducible mode: every tool sees SOURCE_DATE_EPOCH
+                with reproducible_environment(self._source_date_epoch):
+                    scheduler.run(checkpoints)
+                status = 'ok'
+            finally:
+                if telemetry:
+                    telemetry.build_end(status, reused=[name for name in scheduler.order
+                                                        if name in scheduler.results
+                                                        and name not in scheduler.executed])
             
-            # Build ISO
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            # Include merge indicator in filename if multiple ISOs
-            if 'iso_sources' in self.config and len(self.config['iso_sources']) > 1:
-                filename = f"Heck-CheckOS-merged-{timestamp}.iso"
-            else:
-                filename = f"Heck-CheckOS-custom-{timestamp}.iso"
-            output_path = self.build_iso(filename, progress_callback)
+            output_path = Path(scheduler.results['iso']) if 'iso' in scheduler.results else None
+            if store and output_path:
+                store.publish(artifact_key, output_path, self._iso_digests, self.config)
+                print(f"✓ Stored as artifact {artifact_key[:12]}")
             
             if progress_callback:
                 progress_callback(100, "Build complete!")
@@ -1455,7 +2112,6 @@ menuentry "👻 Heck-CheckOS {version} - No TPM Mode" {{
             # Always cleanup
             self.cleanup()
 
-
 if __name__ == "__main__":
     # Test build
     config = {
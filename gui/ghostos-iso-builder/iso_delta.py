@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS ISO Deltas
+Chunk indexes and binary deltas between successive ISO builds, so updates
+only transfer the parts of an image that changed
+"""
+
+import os
+import re
+import sys
+import mmap
+import json
+import struct
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from iso_finalizer import BUFFER_SIZE, write_checksum_files
+from tool_runner import scaled
+
+# Written next to an ISO: its chunk index, and the delta that rebuilds it from a base
+INDEX_SUFFIX = '.chunks'
+DELTA_SUFFIX = '.delta'
+
+DELTA_MAGIC = b'HCKDELT1'
+
+# Chunk boundaries sit at an anchor byte pair, so they move with the content:
+# an insertion only changes the chunks around it. In compressed data (squashfs,
+# kernel, initrd) the pair occurs every 64 KiB on average.
+ANCHOR = b'\xa5\x5a'
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+INDEX_VERSION = 1
+
+_COPY = struct.Struct('>cQQ')
+_DATA = struct.Struct('>cQ')
+
+
+def chunk_boundaries(data) -> Iterator[Tuple[int, int]]:
+    """Yield (offset, length) of the content-defined chunks of a buffer"""
+    size = len(data)
+    start = 0
+    while start < size:
+        end = data.find(ANCHOR, start + MIN_CHUNK, start + MAX_CHUNK)
+        if end < 0:
+            end = start + MAX_CHUNK
+        end = min(end, size)
+        yield start, end - start
+        start = end
+
+
+def _chunk_hash(view) -> str:
+    return hashlib.blake2b(view, digest_size=16).hexdigest()
+
+
+def _params() -> Dict:
+    return {'version': INDEX_VERSION, 'anchor': ANCHOR.hex(),
+            'min_chunk': MIN_CHUNK, 'max_chunk': MAX_CHUNK}
+
+
+def chunk_index(image_path, progress_callback: Callable = None) -> Dict:
+    """
+    Chunk an image and hash every chunk, plus the whole image, in one read pass
+
+    Returns:
+        Index dict: image size, mtime and sha256, and [offset, length, hash] per chunk
+    """
+    image_path = Path(image_path)
+    st = image_path.stat()
+    whole = hashlib.sha256()
+    chunks = []
+    with open(image_path, 'rb') as f:
+        if st.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                view = memoryview(data)
+                try:
+                    for offset, length in chunk_boundaries(data):
+                        piece = view[offset:offset + length]
+                        whole.update(piece)
+                        chunks.append([offset, length, _chunk_hash(piece)])
+                        piece.release()
+                        if progress_callback and len(chunks) % 256 == 0:
+                            progress_callback((offset + length) * 100 // st.st_size,
+                                              "Indexing image chunks...")
+                finally:
+                    view.release()
+    return dict(_params(), size=st.st_size, mtime_ns=st.st_mtime_ns,
+                sha256=whole.hexdigest(), chunks=chunks)
+
+
+def index_path(image_path) -> Path:
+    image_path = Path(image_path)
+    return image_path.with_name(image_path.name + INDEX_SUFFIX)
+
+
+def write_index(image_path, index: Dict) -> Path:
+    """Write the index next to the image, atomically"""
+    target = index_path(image_path)
+    tmp = target.with_name(target.name + '.tmp')
+    tmp.write_text(json.dumps(dict(index, image=Path(image_path).name), separators=(',', ':')))
+    os.replace(tmp, target)
+    return target
+
+
+def load_index(image_path) -> Optional[Dict]:
+    """The image's stored index, or None if missing or no longer matching the image"""
+    try:
+        index = json.loads(index_path(image_path).read_text())
+        st = Path(image_path).stat()
+    except (OSError, ValueError):
+        return None
+    if any(index.get(key) != value for key, value in _params().items()):
+        return None
+    if index.get('size') != st.st_size or index.get('mtime_ns') != st.st_mtime_ns:
+        return None
+    return index
+
+
+def ensure_index(image_path, progress_callback: Callable = None) -> Dict:
+    """Load the image's index, or build and store it"""
+    index = load_index(image_path)
+    if index is None:
+        index = chunk_index(image_path, progress_callback)
+        try:
+            write_index(image_path, index)
+        except OSError:
+            pass
+    return index
+
+
+def diff_indexes(base: Dict, target: Dict) -> List[Tuple[str, int, int]]:
+    """
+    Express target as copies from base and literal ranges of target
+
+    Returns:
+        ('copy', base_offset, length) and ('data', target_offset, length)
+        operations, adjacent ones merged
+    """
+    known = {}
+    for offset, length, digest in base['chunks']:
+        known.setdefault((digest, length), offset)
+    ops = []
+    for offset, length, digest in target['chunks']:
+        source = known.get((digest, length))
+        if source is not None:
+            if ops and ops[-1][0] == 'copy' and ops[-1][1] + ops[-1][2] == source:
+                ops[-1] = ('copy', ops[-1][1], ops[-1][2] + length)
+            else:
+                ops.append(('copy', source, length))
+        elif ops and ops[-1][0] == 'data' and ops[-1][1] + ops[-1][2] == offset:
+            ops[-1] = ('data', ops[-1][1], ops[-1][2] + length)
+        else:
+            ops.append(('data', offset, length))
+    return ops
+
+
+def create_delta(base_path, target_path, delta_path=None,
+                 progress_callback: Callable = None) -> Dict:
+    """
+    Write the delta that rebuilds target_path from base_path
+
+    Both images get a chunk index sidecar; a base built earlier normally has
+    one already, so only the new image is read in full.
+
+    Returns:
+        Delta summary: path, sizes and bytes copied from the base
+    """
+    base_path, target_path = Path(base_path), Path(target_path)
+    delta_path = Path(delta_path or target_path.with_name(target_path.name + DELTA_SUFFIX))
+    target_index = ensure_index(target_path, scaled(progress_callback, 0, 50))
+    base_index = ensure_index(base_path, scaled(progress_callback, 50, 80))
+    ops = diff_indexes(base_index, target_index)
+
+    header = {
+        'version': INDEX_VERSION,
+        'base': {'name': base_path.name, 'size': base_index['size'], 'sha256': base_index['sha256']},
+        'target': {'name': target_path.name, 'size': target_index['size'],
+                   'sha256': target_index['sha256']},
+    }
+    copied = sum(length for op, _, length in ops if op == 'copy')
+    tmp = delta_path.with_name(f".{delta_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(target_path, 'rb') as source, open(tmp, 'wb') as out:
+            encoded = json.dumps(header).encode()
+            out.write(DELTA_MAGIC + struct.pack('>I', len(encoded)) + encoded)
+            for op, offset, length in ops:
+                if op == 'copy':
+                    out.write(_COPY.pack(b'C', offset, length))
+                    continue
+                out.write(_DATA.pack(b'D', length))
+                source.seek(offset)
+                remaining = length
+                while remaining:
+                    block = source.read(min(remaining, BUFFER_SIZE))
+                    if not block:
+                        raise RuntimeError(f"{target_path} changed while the delta was written")
+                    out.write(block)
+                    remaining -= len(block)
+            out.write(b'E')
+        os.replace(tmp, delta_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    if progress_callback:
+        progress_callback(100, "Delta written")
+
+    return {
+        'path': delta_path,
+        'base': base_path.name,
+        'target_size': target_index['size'],
+        'delta_size': delta_path.stat().st_size,
+        'copied': copied,
+    }
+
+
+def read_header(delta_file) -> Dict:
+    """Header of an open delta file, leaving it positioned at the first operation"""
+    if delta_file.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+        raise ValueError("Not a Heck-CheckOS ISO delta")
+    (length,) = struct.unpack('>I', delta_file.read(4))
+    return json.loads(delta_file.read(length))
+
+
+def apply_delta(base_path, delta_path, output_path=None,
+                progress_callback: Callable = None) -> Path:
+    """
+    Rebuild an image from its base and a delta
+
+    The result is only put in place once its sha256 matches the image the
+    delta was made from; a sha256 checksum file is written next to it.
+
+    Returns:
+        Path of the rebuilt image
+
+    Raises:
+        ValueError if base_path is not the delta's base
+        RuntimeError if the rebuilt image does not match
+    """
+    base_path, delta_path = Path(base_path), Path(delta_path)
+    with open(delta_path, 'rb') as delta:
+        header = read_header(delta)
+        target = header['target']
+        output_path = Path(output_path or base_path.with_name(target['name']))
+        if base_path.stat().st_size != header['base']['size']:
+            raise ValueError(f"{base_path.name} is not the base of this delta "
+                             f"(expected {header['base']['name']})")
+
+        digest = hashlib.sha256()
+        written = 0
+        tmp = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(base_path, 'rb') as base, open(tmp, 'wb') as out:
+                while True:
+                    op = delta.read(1)
+                    if op == b'E':
+                        break
+                    if op == b'C':
+                        offset, length = struct.unpack('>QQ', delta.read(16))
+                        base.seek(offset)
+                        source = base
+                    elif op == b'D':
+                        (length,) = struct.unpack('>Q', delta.read(8))
+                        source = delta
+                    else:
+                        raise RuntimeError(f"Corrupt delta {delta_path.name}")
+                    while length:
+                        block = source.read(min(length, BUFFER_SIZE))
+                        if not block:
+                            raise RuntimeError(f"Delta {delta_path.name} or its base is truncated")
+                        digest.update(block)
+                        out.write(block)
+                        length -= len(block)
+                        written += len(block)
+                    if progress_callback and target['size']:
+                        progress_callback(written * 100 // target['size'], "Applying delta...")
+
+            if written != target['size'] or digest.hexdigest() != target['sha256']:
+                raise RuntimeError(f"Rebuilt image does not match {target['name']} (sha256 mismatch)")
+            os.replace(tmp, output_path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    write_checksum_files(output_path, {'sha256': target['sha256']})
+    return output_path
+
+
+def image_series(name: str) -> str:
+    """Build name without its timestamp: images of one series delta well against each other"""
+    return re.sub(r'-\d{8}-\d{6}\.iso$', '', name)
+
+
+def find_base(output_dir, image_path) -> Optional[Path]:
+    """Newest earlier ISO of the same series in output_dir, or None"""
+    image_path = Path(image_path)
+    candidates = []
+    for other in Path(output_dir).glob("*.iso"):
+        if other.name == image_path.name or image_series(other.name) != image_series(image_path.name):
+            continue
+        try:
+            if os.path.samefile(other, image_path):
+                continue
+            candidates.append((other.stat().st_mtime, other))
+        except OSError:
+            continue
+    return max(candidates)[1] if candidates else None
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS ISO Deltas - Create and apply binary deltas between ISO builds'
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+    create = sub.add_parser('create', help='Write the delta from a base ISO to a new ISO')
+    create.add_argument('base')
+    create.add_argument('image')
+    create.add_argument('-o', '--output', help='Delta file (default: <image>.delta)')
+    apply = sub.add_parser('apply', help='Rebuild an ISO from its base and a delta')
+    apply.add_argument('base')
+    apply.add_argument('delta')
+    apply.add_argument('-o', '--output', help='Rebuilt ISO (default: next to the base, original name)')
+    index = sub.add_parser('index', help='Write the chunk index of an ISO')
+    index.add_argument('image')
+    info = sub.add_parser('info', help='Show what a delta rebuilds')
+    info.add_argument('delta')
+
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        summary = create_delta(args.base, args.image, args.output)
+        print(f"✓ {summary['path']}: {summary['delta_size'] / 1024 ** 2:.1f} MB for a "
+              f"{summary['target_size'] / 1024 ** 2:.1f} MB image "
+              f"({summary['copied'] / 1024 ** 2:.1f} MB reused from {summary['base']})")
+    elif args.command == 'apply':
+        try:
+            output = apply_delta(args.base, args.delta, args.output)
+        except (ValueError, RuntimeError) as e:
+            print(f"✗ {e}")
+            return 1
+        print(f"✓ Rebuilt and verified: {output}")
+    elif args.command == 'index':
+        print(f"✓ {write_index(args.image, chunk_index(args.image))}")
+    else:
+        with open(args.delta, 'rb') as f:
+            header = read_header(f)
+        print(f"Base:   {header['base']['name']} ({header['base']['size']} bytes)")
+        print(f"Target: {header['target']['name']} ({header['target']['size']} bytes)")
+        print(f"sha256: {header['target']['sha256']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS ISO Finalizer
+Hybrid-boot check and single-pass checksums for finished ISO images
+"""
+
+import os
+import sys
+import mmap
+import hashlib
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from build_telemetry import run_command
+
+# Checksum file suffix per algorithm, matching the coreutils *sum tools
+CHECKSUM_SUFFIXES = {
+    'md5': '.md5',
+    'sha1': '.sha1',
+    'sha256': '.sha256',
+    'sha512': '.sha512',
+    'blake2b': '.b2',
+}
+
+DEFAULT_ALGORITHMS = ['md5', 'sha256']
+
+# Large reads keep the disk streaming; the buffer is reused for the whole pass
+BUFFER_SIZE = 16 * 1024 * 1024
+
+
+def is_hybrid(image_path) -> bool:
+    """
+    True if the image already boots from USB in both BIOS and UEFI mode
+
+    xorriso's --grub2-mbr with -isohybrid-gpt-basdat writes an MBR boot
+    signature and a GPT header; that is everything isohybrid --uefi adds.
+    """
+    with open(image_path, 'rb') as f:
+        head = f.read(1024)
+    if len(head) < 1024:
+        return False
+    return head[510:512] == b'\x55\xaa' and head[512:520] == b'EFI PART'
+
+
+def make_hybrid(image_path):
+    """Add hybrid MBR/GPT boot records unless xorriso already wrote them"""
+    if is_hybrid(image_path):
+        print("  ✓ Image is already hybrid, skipping isohybrid")
+        return
+    if shutil.which('isohybrid') is None:
+        raise RuntimeError("Image is not hybrid and isohybrid is not installed "
+                           "(sudo apt-get install syslinux-utils)")
+    run_command(['isohybrid', '--uefi', str(image_path)], check=True)
+
+
+def compute_digests(image_path, algorithms: List[str] = None,
+                    progress_callback: Callable = None) -> Dict[str, str]:
+    """
+    Hash a file with several algorithms in one read pass
+
+    Each buffer is fed to all hashers in parallel; hashlib releases the GIL
+    for large updates, so the pass is bound by the slowest digest, not their sum.
+
+    Returns:
+        Dict of algorithm name to hex digest
+    """
+    algorithms = algorithms or DEFAULT_ALGORITHMS
+    for name in algorithms:
+        if name not in CHECKSUM_SUFFIXES:
+            raise ValueError(f"Unsupported checksum algorithm: {name}")
+    hashers = {name: hashlib.new(name) for name in algorithms}
+
+    total = os.path.getsize(image_path)
+    done = 0
+    # Anonymous mmap gives a page-aligned buffer we can read into repeatedly
+    buffer = mmap.mmap(-1, BUFFER_SIZE)
+    view = memoryview(buffer)
+    fd = os.open(image_path, os.O_RDONLY)
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        with ThreadPoolExecutor(max_workers=len(hashers)) as pool:
+            while True:
+                count = os.readv(fd, [view])
+                if not count:
+                    break
+                chunk = view[:count]
+                list(pool.map(lambda h: h.update(chunk), hashers.values()))
+                chunk.release()
+                done += count
+                if progress_callback and total:
+                    progress_callback(done * 100 // total, "Computing checksums...")
+    finally:
+        os.close(fd)
+        view.release()
+        buffer.close()
+    return {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+
+def write_checksum_files(image_path, digests: Dict[str, str]) -> List[Path]:
+    """Write one '<digest>  <name>' file per algorithm next to the image, atomically"""
+    image_path = Path(image_path)
+    written = []
+    for name, digest in digests.items():
+        target = image_path.with_name(image_path.name + CHECKSUM_SUFFIXES[name])
+        tmp = target.with_name(target.name + '.tmp')
+        tmp.write_text(f"{digest}  {image_path.name}\n")
+        os.replace(tmp, target)
+        written.append(target)
+    return written
+
+
+def finalize_image(image_path, algorithms: List[str] = None,
+                   progress_callback: Callable = None) -> Dict[str, str]:
+    """Make the image hybrid if needed, then checksum it in a single pass"""
+    make_hybrid(image_path)
+    digests = compute_digests(image_path, algorithms, progress_callback)
+    write_checksum_files(image_path, digests)
+    return digests
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS ISO Finalizer - Checksum an ISO in one pass'
+    )
+    parser.add_argument('image', help='ISO image')
+    parser.add_argument('--algorithms', default=','.join(DEFAULT_ALGORITHMS),
+                        help=f"Comma-separated list from: {', '.join(CHECKSUM_SUFFIXES)}")
+    parser.add_argument('--hybrid', action='store_true', help='Also run isohybrid if needed')
+
+    args = parser.parse_args()
+    if args.hybrid:
+        make_hybrid(args.image)
+    digests = compute_digests(args.image, args.algorithms.split(','))
+    for path in write_checksum_files(args.image, digests):
+        print(f"✓ {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
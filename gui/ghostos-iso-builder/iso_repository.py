@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS ISO Repository
+Exposes the package pool of source ISOs as local apt repositories
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+from build_telemetry import run_command
+
+
+def parse_release(release_file: Path) -> Dict[str, str]:
+    """Read the top-level fields of a Debian Release file"""
+    fields = {}
+    for line in Path(release_file).read_text(errors='replace').splitlines():
+        # Continuation lines belong to the checksum lists, which we don't need
+        if not line or line[0].isspace() or ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        fields[key.strip()] = value.strip()
+    return fields
+
+
+def find_distributions(root: Path) -> List[Dict]:
+    """
+    Find apt distributions in an ISO tree
+
+    Returns:
+        List of dicts with 'dist' (directory under dists/) and 'components'
+    """
+    dists_dir = Path(root) / "dists"
+    if not dists_dir.is_dir() or not (Path(root) / "pool").is_dir():
+        return []
+
+    found = []
+    for dist in sorted(dists_dir.iterdir()):
+        # dists/stable -> bookworm style aliases would list the same packages twice
+        if dist.is_symlink() or not (dist / "Release").is_file():
+            continue
+        release = parse_release(dist / "Release")
+        components = [c for c in release.get('Components', '').split()
+                      if (dist / c).is_dir()]
+        if components:
+            found.append({'dist': dist.name, 'components': components})
+    return found
+
+
+class IsoRepositories:
+    """
+    Context manager that loop-mounts source ISOs and registers them as apt sources
+
+    The ISOs are mounted read-only on the host and bind-mounted into the chroot
+    (see binds()), where a sources.list.d entry and an apt pin prefer them
+    over network mirrors. Everything is removed again on exit, so the finished
+    image never references the build host's mounts.
+    """
+
+    CHROOT_MOUNT_ROOT = "/media/heckcheckos-iso"
+    SOURCES_FILE = "etc/apt/sources.list.d/heckcheckos-iso.list"
+    PREFERENCES_FILE = "etc/apt/preferences.d/heckcheckos-iso"
+    PIN_PRIORITY = 990
+
+    def __init__(self, iso_paths: List[str], mount_dir: Path, rootfs_dir: Path,
+                 offline: bool = False):
+        """
+        Initialize ISO repositories
+
+        Args:
+            iso_paths: Source ISO files
+            mount_dir: Host directory for the loop mounts
+            rootfs_dir: Root of the chroot the sources are registered in
+            offline: Use only the ISO repositories, never the network mirrors
+        """
+        self.iso_paths = [Path(p) for p in iso_paths]
+        self.mount_dir = Path(mount_dir)
+        self.rootfs_dir = Path(rootfs_dir)
+        self.offline = offline
+        self.repositories: List[Dict] = []
+        self._mounted: List[Path] = []
+
+    def __enter__(self):
+        try:
+            self.mount()
+            self._write_apt_config()
+        except Exception:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            (self.rootfs_dir / self.SOURCES_FILE).unlink(missing_ok=True)
+            (self.rootfs_dir / self.PREFERENCES_FILE).unlink(missing_ok=True)
+        finally:
+            self.unmount()
+        return False
+
+    def mount(self):
+        """Loop-mount every ISO that carries an apt repository"""
+        for index, iso in enumerate(self.iso_paths):
+            target = self.mount_dir / str(index)
+            target.mkdir(parents=True, exist_ok=True)
+            result = run_command(['mount', '-o', 'loop,ro', str(iso), str(target)],
+                                 capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"  ⚠ Could not mount {iso.name}: {result.stderr.strip()}")
+                continue
+            self._mounted.append(target)
+
+            distributions = find_distributions(target)
+            if not distributions:
+                print(f"  ⚠ {iso.name} has no package repository, skipping")
+                continue
+            self.repositories.append({
+                'iso': str(iso),
+                'host_path': target,
+                'chroot_path': f"{self.CHROOT_MOUNT_ROOT}/{index}",
+                'distributions': distributions,
+            })
+            print(f"  ✓ Using {iso.name} as a local package repository")
+
+    def unmount(self):
+        """Release the loop mounts"""
+        while self._mounted:
+            target = self._mounted.pop()
+            if run_command(['umount', str(target)]).returncode != 0:
+                run_command(['umount', '--lazy', str(target)], check=False)
+
+    def binds(self) -> list:
+        """Bind mounts for a ChrootSession"""
+        return [(str(repo['host_path']), repo['chroot_path']) for repo in self.repositories]
+
+    def sources_list(self) -> str:
+        """apt source entries for the mounted ISOs"""
+        lines = ["# Source ISOs mounted by the Heck-CheckOS builder"]
+        for repo in self.repositories:
+            for dist in repo['distributions']:
+                lines.append(f"deb [trusted=yes] file:{repo['chroot_path']} "
+                             f"{dist['dist']} {' '.join(dist['components'])}")
+        return '\n'.join(lines) + '\n'
+
+    def _write_apt_config(self):
+        if not self.repositories:
+            return
+        sources = self.rootfs_dir / self.SOURCES_FILE
+        sources.parent.mkdir(parents=True, exist_ok=True)
+        sources.write_text(self.sources_list())
+
+        # file: repositories have an empty origin
+        preferences = self.rootfs_dir / self.PREFERENCES_FILE
+        preferences.parent.mkdir(parents=True, exist_ok=True)
+        preferences.write_text(f"""Package: *
+Pin: origin ""
+Pin-Priority: {self.PIN_PRIORITY}
+""")
+
+    def apt_options(self) -> List[str]:
+        """Extra apt-get arguments; in offline mode they hide the network sources"""
+        if not (self.offline and self.repositories):
+            return []
+        return [
+            '-o', f'Dir::Etc::SourceList={self.SOURCES_FILE[len("etc/apt/"):]}',
+            '-o', 'Dir::Etc::SourceParts=-',
+            # Keep the mirror lists so a later online build can reuse them
+            '-o', 'APT::Get::List-Cleanup=0',
+        ]
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS ISO Repository - Show the apt repositories inside ISOs'
+    )
+    parser.add_argument('paths', nargs='+', help='Mounted or extracted ISO trees')
+
+    args = parser.parse_args()
+    status = 0
+    for path in args.paths:
+        distributions = find_distributions(Path(path))
+        if not distributions:
+            print(f"⚠ {path}: no package repository")
+            status = 1
+            continue
+        for dist in distributions:
+            print(f"✓ {path}: {dist['dist']} {' '.join(dist['components'])}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -37,7 +37,9 @@ from ui.keyboard_designer import KeyboardLayoutDesigner
 from ui.driver_manager import DriverManagerWidget
 
 # Import ISO builder backend
-from iso_builder_backend import ISOBuilder
+from variant_builds import run_build
+from mount_namespace import available as mount_namespace_available, run_isolated
+from build_queue import BuildQueueClient
 
 
 class BuildThread(QThread):
@@ -53,18 +55,58 @@ class BuildThread(QThread):
     def run(self):
         """Run the build process"""
         try:
-            builder = ISOBuilder(self.config)
-            
             def progress_callback(percent, message):
-                self.progress_update.emit(percent, message)
+                self.progress_update.emit(int(percent), message)
+            
+            # A child process in its own mount namespace: a crash can't leak mounts
+            if mount_namespace_available():
+                output = run_isolated(self.config, progress_callback=progress_callback)
+            else:
+                output = run_build(self.config, progress_callback=progress_callback)
             
-            output_path = builder.build(progress_callback=progress_callback)
-            self.build_complete.emit(str(output_path))
+            # A config with variants yields one ISO per variant
+            if isinstance(output, dict):
+                self.build_complete.emit('\n'.join(str(path) for path in output.values()))
+            else:
+                self.build_complete.emit(str(output))
             
         except Exception as e:
             self.build_error.emit(str(e))
 
 
+class QueuedBuildThread(QThread):
+    """Submits a build to the local build queue server and follows its progress"""
+    progress_update = pyqtSignal(int, str)
+    build_complete = pyqtSignal(str)
+    build_error = pyqtSignal(str)
+    
+    def __init__(self, config, client: BuildQueueClient):
+        super().__init__()
+        self.config = config
+        self.client = client
+    
+    def run(self):
+        """Queue the build and stream its progress"""
+        try:
+            job_id = self.client.submit(self.config, name="gui")
+            self.progress_update.emit(0, f"Queued as build job {job_id}")
+            job = None
+            for job in self.client.watch(job_id):
+                self.progress_update.emit(int(job['progress']),
+                                          job['message'] or f"Job {job_id} {job['status']}")
+            
+            if job and job['status'] == 'done':
+                output = json.loads(job['output'])
+                if isinstance(output, dict):
+                    output = '\n'.join(output.values())
+                self.build_complete.emit(output)
+            else:
+                self.build_error.emit((job or {}).get('error') or f"Build job {job_id} was cancelled")
+                
+        except Exception as e:
+            self.build_error.emit(str(e))
+
+
 class HeckCheckOSBuilderGUI(QMainWindow):
     """Main application window for Heck-CheckOS ISO Builder"""
     
@@ -379,8 +421,13 @@ class HeckCheckOSBuilderGUI(QMainWindow):
         build_log.append("\n🚀 Starting actual ISO build process...")
         build_log.append("All changes will be pre-applied to the ISO!\n")
         
-        # Create build thread
-        self.build_thread = BuildThread(build_config)
+        # Create build thread; a running build queue server takes the build if present
+        queue_client = BuildQueueClient()
+        if queue_client.available():
+            build_log.append("Submitting to the local build queue...\n")
+            self.build_thread = QueuedBuildThread(build_config, queue_client)
+        else:
+            self.build_thread = BuildThread(build_config)
         
         # Connect signals
         def on_progress(percent, message):
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Mount Namespaces
+Runs each build in its own private mount namespace, so its chroot, overlay and
+loop mounts never reach the host mount table and vanish when the build exits
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+from cgroup_governor import enter_governed_build, governed_build
+from tool_runner import OutputParser, run_tool
+
+# unshare(1) forks the command into a new mount namespace in which every
+# mount is private: nothing propagates to or from the host
+UNSHARE_COMMAND = ['unshare', '--mount', '--propagation', 'private']
+
+# Prefix of the progress lines a build child prints for its parent
+PROGRESS_MARKER = "@@heckcheckos-progress "
+
+# Set when this module re-executes itself under unshare
+NAMESPACE_ENV = "HECKCHECKOS_MOUNT_NAMESPACE"
+
+
+def available() -> bool:
+    """True if builds can be put in their own mount namespace here"""
+    return hasattr(os, 'geteuid') and os.geteuid() == 0 and shutil.which('unshare') is not None
+
+
+def in_private_namespace() -> bool:
+    """True if this process does not share its mount namespace with init"""
+    try:
+        return os.readlink('/proc/self/ns/mnt') != os.readlink('/proc/1/ns/mnt')
+    except OSError:
+        return False
+
+
+def namespace_command(cmd: list) -> list:
+    """cmd wrapped to run in a fresh private mount namespace, when possible"""
+    if not available():
+        print("  ⚠ unshare unavailable, build mounts go to the host mount table")
+        return list(cmd)
+    return UNSHARE_COMMAND + ['--'] + list(cmd)
+
+
+class _ProgressParser(OutputParser):
+    """Progress lines of a build child; everything else is its build log"""
+
+    def feed(self, line: str):
+        if not line.startswith(PROGRESS_MARKER):
+            return None
+        percent, message = json.loads(line[len(PROGRESS_MARKER):])
+        return percent, message
+
+
+def run_isolated(config: dict, output_dir: str = None, progress_callback: Callable = None):
+    """
+    Build a config in a child process with its own mount namespace
+
+    The child's build log is echoed and its progress relayed to
+    progress_callback. Even if the child is killed between a mount and its
+    umount, the kernel drops its mounts together with the namespace.
+
+    Returns:
+        ISO path, or dict of variant name to ISO path (see variant_builds.run_build)
+    """
+    with tempfile.TemporaryDirectory(prefix="heckcheckos-isolated-") as tmp:
+        config_file = Path(tmp) / "config.json"
+        result_file = Path(tmp) / "result.json"
+        config_file.write_text(json.dumps(config))
+        cmd = [sys.executable, '-u', str(Path(__file__).resolve()), 'build', str(config_file),
+               '--result', str(result_file)]
+        if output_dir:
+            cmd += ['--output-dir', str(output_dir)]
+
+        # Resource limits per the config's 'resources' section (see cgroup_governor.py)
+        with governed_build(config, f"gui-{os.getpid()}-{int(time.time())}") as env:
+            run_tool(namespace_command(cmd), _ProgressParser(), progress_callback,
+                     check=False, echo=True, env=dict(os.environ, **env))
+        try:
+            result = json.loads(result_file.read_text())
+        except (OSError, ValueError):
+            raise RuntimeError("Build process exited without a result; see the build log")
+
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    output = result['output']
+    if isinstance(output, dict):
+        return {name: Path(path) for name, path in output.items()}
+    return Path(output)
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Mount Namespaces - Build a config in a private mount namespace'
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Build a config (JSON file)')
+    build.add_argument('config')
+    build.add_argument('--output-dir', help='Output directory for the ISO')
+    build.add_argument('--result', help='Write the outcome as JSON here (used by run_isolated)')
+
+    args = parser.parse_args()
+    with open(args.config) as f:
+        config = json.load(f)
+
+    # Started directly: put ourselves in a namespace first (once)
+    if not in_private_namespace() and available() and not os.environ.get(NAMESPACE_ENV):
+        os.execvpe(UNSHARE_COMMAND[0], namespace_command([sys.executable] + sys.argv),
+                   dict(os.environ, **{NAMESPACE_ENV: '1'}))
+
+    from variant_builds import run_build
+
+    def progress_callback(percent, message=None):
+        print(PROGRESS_MARKER + json.dumps([percent, message]), flush=True)
+
+    try:
+        with enter_governed_build():
+            output = run_build(config, args.output_dir, progress_callback)
+        if isinstance(output, dict):
+            result = {'output': {name: str(path) for name, path in output.items()}}
+        else:
+            result = {'output': str(output)}
+    except Exception as e:
+        print(f"✗ Build failed: {e}")
+        result = {'error': str(e)}
+
+    if args.result:
+        Path(args.result).write_text(json.dumps(result))
+    elif 'output' in result:
+        print(f"✓ {result['output']}")
+    return 1 if 'error' in result else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Package Index
+Compact, memory-mapped index of the apt repositories inside source ISOs, with
+dependency closure and installed sizes for component selection
+"""
+
+import os
+import io
+import re
+import sys
+import mmap
+import gzip
+import lzma
+import struct
+import hashlib
+from array import array
+from collections import namedtuple
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from platform_utils import PlatformHelper
+from iso9660 import ISOImage
+
+# Component display names (see ui/iso_loader.py) to the packages they install
+COMPONENT_PACKAGES = {
+    'Linux Kernel': ['linux-image-amd64'],
+    'System Libraries': ['libc6', 'libstdc++6', 'libssl3'],
+    'Init System': ['systemd', 'systemd-sysv'],
+    'MATE Desktop': ['mate-desktop-environment'],
+    'XFCE Desktop': ['xfce4'],
+    'KDE Plasma': ['kde-plasma-desktop'],
+    'GNOME Desktop': ['gnome'],
+    'Debian Security Suite': ['lynis', 'rkhunter', 'chkrootkit', 'aide', 'fail2ban'],
+    'Network Analysis': ['wireshark', 'nmap'],
+    'Forensics Tools': ['sleuthkit', 'testdisk'],
+    'Password Cracking': ['john', 'hashcat'],
+    'GCC/G++ Compilers': ['build-essential'],
+    'Python Development': ['python3-dev', 'python3-pip'],
+    'Node.js & NPM': ['nodejs', 'npm'],
+    'Git & Version Control': ['git'],
+    'Steam': ['steam-installer'],
+    'Lutris': ['lutris'],
+    'Wine/Proton': ['wine', 'wine64'],
+    'GPU Drivers': ['firmware-amd-graphics', 'mesa-vulkan-drivers'],
+    'LibreOffice Suite': ['libreoffice'],
+    'GIMP': ['gimp'],
+    'Inkscape': ['inkscape'],
+    'Blender': ['blender'],
+}
+
+PRIORITIES = ['', 'required', 'important', 'standard', 'optional', 'extra']
+
+# Priorities debootstrap installs: every build has them already
+BASE_PRIORITIES = ('required', 'important')
+
+Package = namedtuple('Package', ['name', 'version', 'installed_size', 'size', 'essential',
+                                 'priority', 'depends', 'recommends'])
+Closure = namedtuple('Closure', ['packages', 'missing'])
+
+
+def _order(c: str) -> int:
+    if c == '~':
+        return -1
+    if c.isalpha():
+        return ord(c)
+    return ord(c) + 256
+
+
+def _compare_part(a: str, b: str) -> int:
+    """dpkg's comparison of one upstream version or revision"""
+    i = j = 0
+    while i < len(a) or j < len(b):
+        while (i < len(a) and not a[i].isdigit()) or (j < len(b) and not b[j].isdigit()):
+            ac = _order(a[i]) if i < len(a) and not a[i].isdigit() else 0
+            bc = _order(b[j]) if j < len(b) and not b[j].isdigit() else 0
+            if ac != bc:
+                return ac - bc
+            i += 1
+            j += 1
+        start_i, start_j = i, j
+        while i < len(a) and a[i].isdigit():
+            i += 1
+        while j < len(b) and b[j].isdigit():
+            j += 1
+        na, nb = int(a[start_i:i] or 0), int(b[start_j:j] or 0)
+        if na != nb:
+            return na - nb
+    return 0
+
+
+def version_compare(a: str, b: str) -> int:
+    """Compare two Debian versions: negative, zero or positive like cmp"""
+    def split(version):
+        epoch, _, rest = version.partition(':') if ':' in version else ('0', '', version)
+        upstream, _, revision = rest.rpartition('-') if '-' in rest else (rest, '', '')
+        return int(epoch or 0), upstream, revision
+    ea, ua, ra = split(a)
+    eb, ub, rb = split(b)
+    if ea != eb:
+        return ea - eb
+    return _compare_part(ua, ub) or _compare_part(ra, rb)
+
+
+def parse_relations(value: str) -> List[List[str]]:
+    """'a (>= 1), b | c:any [amd64]' -> [['a'], ['b', 'c']]; version and arch qualifiers dropped"""
+    groups = []
+    for group in value.split(','):
+        alternatives = []
+        for alternative in group.split('|'):
+            name = alternative.strip().split(' ', 1)[0].split('(', 1)[0].split('[', 1)[0]
+            name = name.split(':', 1)[0]
+            if name:
+                alternatives.append(name)
+        if alternatives:
+            groups.append(alternatives)
+    return groups
+
+
+# name[:arch] [(op version)]
+RELATION = re.compile(r'^\s*([^\s(\[:<]+)(?::[^\s(\[<]+)?\s*(?:\(\s*([<>=]+)\s*([^)\s]+)\s*\))?')
+
+
+def parse_versioned_relations(value: str) -> List[List[Tuple[str, Optional[str], Optional[str]]]]:
+    """'a (>= 1), b | c:any [amd64]' -> [[('a', '>=', '1')], [('b', None, None), ('c', None, None)]]"""
+    groups = []
+    for group in value.split(','):
+        alternatives = []
+        for alternative in group.split('|'):
+            match = RELATION.match(alternative)
+            if match:
+                alternatives.append(match.groups())
+        if alternatives:
+            groups.append(alternatives)
+    return groups
+
+
+def version_satisfies(version: str, op: str, required: str) -> bool:
+    """Whether version meets a relation such as '>= required' ('<' and '>' are dpkg's old <= and >=)"""
+    result = version_compare(version, required)
+    return {'>=': result >= 0, '>': result >= 0, '<=': result <= 0, '<': result <= 0,
+            '>>': result > 0, '<<': result < 0, '=': result == 0}.get(op, False)
+
+
+def _open_packages(source):
+    # A path, or a binary stream named like one (such as a file inside an ISO)
+    name = str(getattr(source, 'name', source))
+    if name.endswith('.gz'):
+        return gzip.open(source, 'rt', encoding='utf-8', errors='replace')
+    if name.endswith('.xz'):
+        return lzma.open(source, 'rt', encoding='utf-8', errors='replace')
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, encoding='utf-8', errors='replace')
+    return io.TextIOWrapper(source, encoding='utf-8', errors='replace')
+
+
+def parse_packages(source) -> Iterator[Dict[str, str]]:
+    """Stanzas of an apt Packages file (plain, .gz or .xz), single-line fields only"""
+    fields = {}
+    with _open_packages(source) as f:
+        for line in f:
+            if line == '\n':
+                if fields:
+                    yield fields
+                    fields = {}
+                continue
+            if line[0] in ' \t' or ':' not in line:
+                continue
+            key, value = line.split(':', 1)
+            fields[key] = value.strip()
+    if fields:
+        yield fields
+
+
+def find_packages_files(root) -> List[Path]:
+    """Packages files of every distribution and component under root/dists"""
+    files = []
+    for binary_dir in sorted(Path(root).glob("dists/*/*/binary-*")):
+        # dists/stable -> bookworm style aliases would list the same packages twice
+        if binary_dir.parent.parent.is_symlink():
+            continue
+        for name in ('Packages.xz', 'Packages.gz', 'Packages'):
+            if (binary_dir / name).is_file():
+                files.append(binary_dir / name)
+                break
+    return files
+
+
+def iso_packages_files(image: ISOImage) -> List[str]:
+    """Paths of the Packages files of every distribution and component inside an ISO"""
+    files = []
+    if not image.exists('/dists'):
+        return files
+    for dist in image.listdir('/dists'):
+        # Rock Ridge symlinks (stable -> bookworm) are aliases, not more packages
+        if not dist.is_dir or dist.symlink:
+            continue
+        for component in image.listdir(dist.path):
+            if not component.is_dir or component.symlink:
+                continue
+            for binary in image.listdir(component.path):
+                if not binary.is_dir or not binary.name.lower().startswith('binary-'):
+                    continue
+                for name in ('Packages.xz', 'Packages.gz', 'Packages'):
+                    entry = image.entry(f"{binary.path}/{name}")
+                    if entry is not None and not entry.is_dir:
+                        files.append(entry.path)
+                        break
+    return files
+
+
+class PackageIndex:
+    """
+    Read-only package index in one memory-mapped file
+
+    Packages are fixed-size records sorted by name, so a lookup is a binary
+    search that only touches the pages it compares; names, versions and
+    dependency lists live in a shared string table. Loading an index costs an
+    mmap, not a parse.
+    """
+
+    MAGIC = b'HCKPKGI1'
+    # Bump when the layout changes so cached indexes are rebuilt
+    FORMAT_VERSION = 1
+
+    _HEADER = struct.Struct('<8sIIIIII')
+    # name, version (offset and length into the strings), installed KiB,
+    # download bytes, first dependency word, essential | priority << 1
+    _ENTRY = struct.Struct('<8I')
+    # name (offset, length), first provider word
+    _VIRTUAL = struct.Struct('<3I')
+
+    def __init__(self, path: Path):
+        """
+        Open index
+
+        Args:
+            path: Index file written by PackageIndex.write
+        """
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        if len(self._map) < self._HEADER.size:
+            raise ValueError(f"{self.path} is not a package index")
+        (magic, self._count, self._virtual_count, self._entries, self._virtuals,
+         self._words, self._strings) = self._HEADER.unpack_from(self._map)
+        if magic != self.MAGIC:
+            raise ValueError(f"{self.path} is not a package index")
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, name: str):
+        return self._find(name.encode(), self._entries, self._ENTRY, self._count) is not None
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._map[start:start + length].decode('utf-8', errors='replace')
+
+    def _word(self, index: int) -> int:
+        return struct.unpack_from('<I', self._map, self._words + 4 * index)[0]
+
+    def _find(self, key: bytes, table: int, record: struct.Struct, count: int) -> Optional[int]:
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset, length = struct.unpack_from('<2I', self._map, table + mid * record.size)
+            start = self._strings + offset
+            name = self._map[start:start + length]
+            if name == key:
+                return mid
+            if name < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def _groups(self, position: int):
+        """Relation groups starting at a dependency word; returns (groups, next position)"""
+        groups = []
+        count = self._word(position)
+        position += 1
+        for _ in range(count):
+            alternatives = []
+            for _ in range(self._word(position)):
+                alternatives.append(self._string(self._word(position + 1), self._word(position + 2)))
+                position += 2
+            position += 1
+            groups.append(alternatives)
+        return groups, position
+
+    def _package(self, index: int) -> Package:
+        (name_off, name_len, version_off, version_len, installed, size,
+         deps, flags) = self._ENTRY.unpack_from(self._map, self._entries + index * self._ENTRY.size)
+        depends, position = self._groups(deps)
+        recommends, _ = self._groups(position)
+        return Package(self._string(name_off, name_len), self._string(version_off, version_len),
+                       installed, size, bool(flags & 1), PRIORITIES[flags >> 1],
+                       depends, recommends)
+
+    def get(self, name: str) -> Optional[Package]:
+        index = self._find(name.encode(), self._entries, self._ENTRY, self._count)
+        return None if index is None else self._package(index)
+
+    def providers(self, name: str) -> List[str]:
+        """Real packages that provide a virtual package"""
+        index = self._find(name.encode(), self._virtuals, self._VIRTUAL, self._virtual_count)
+        if index is None:
+            return []
+        position = self._VIRTUAL.unpack_from(self._map, self._virtuals + index * self._VIRTUAL.size)[2]
+        return [self._string(self._word(position + 1 + 2 * i), self._word(position + 2 + 2 * i))
+                for i in range(self._word(position))]
+
+    def packages(self) -> Iterator[Package]:
+        for index in range(self._count):
+            yield self._package(index)
+
+    @classmethod
+    def write(cls, path: Path, packages_files: List[Path]) -> 'PackageIndex':
+        """Parse Packages files into an index at path (the newest version of each package wins)"""
+        stanzas = {}
+        for packages_file in packages_files:
+            for fields in parse_packages(packages_file):
+                name = fields.get('Package')
+                if not name or 'Version' not in fields:
+                    continue
+                current = stanzas.get(name)
+                if current is None or version_compare(fields['Version'], current['Version']) > 0:
+                    stanzas[name] = fields
+
+        strings = bytearray()
+        string_refs = {}
+
+        def ref(text: str):
+            if text not in string_refs:
+                data = text.encode()
+                string_refs[text] = (len(strings), len(data))
+                strings.extend(data)
+            return string_refs[text]
+
+        words = array('I')
+
+        def add_groups(groups):
+            words.append(len(groups))
+            for alternatives in groups:
+                words.append(len(alternatives))
+                for name in alternatives:
+                    words.extend(ref(name))
+
+        entries = bytearray()
+        provided: Dict[str, List[str]] = {}
+        # Sorted by encoded name, the order the binary search compares in
+        for name in sorted(stanzas, key=str.encode):
+            fields = stanzas[name]
+            deps = len(words)
+            add_groups(parse_relations(fields.get('Pre-Depends', '')) +
+                       parse_relations(fields.get('Depends', '')))
+            add_groups(parse_relations(fields.get('Recommends', '')))
+            priority = fields.get('Priority', '')
+            flags = (fields.get('Essential') == 'yes') | (
+                (PRIORITIES.index(priority) if priority in PRIORITIES else 0) << 1)
+            entries += cls._ENTRY.pack(*ref(name), *ref(fields['Version']),
+                                       int(fields.get('Installed-Size') or 0),
+                                       min(int(fields.get('Size') or 0), 0xFFFFFFFF),
+                                       deps, flags)
+            for group in parse_relations(fields.get('Provides', '')):
+                provided.setdefault(group[0], []).append(name)
+
+        virtuals = bytearray()
+        for name in sorted(provided, key=str.encode):
+            start = len(words)
+            words.append(len(provided[name]))
+            for provider in provided[name]:
+                words.extend(ref(provider))
+            virtuals += cls._VIRTUAL.pack(*ref(name), start)
+
+        if sys.byteorder != 'little':
+            words.byteswap()
+        entries_off = cls._HEADER.size
+        virtuals_off = entries_off + len(entries)
+        words_off = virtuals_off + len(virtuals)
+        strings_off = words_off + 4 * len(words)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(cls._HEADER.pack(cls.MAGIC, len(stanzas), len(provided), entries_off,
+                                     virtuals_off, words_off, strings_off))
+            f.write(entries)
+            f.write(virtuals)
+            f.write(words.tobytes())
+            f.write(strings)
+        os.replace(tmp, path)
+        return cls(path)
+
+    @classmethod
+    def for_source(cls, source, cache_dir: Path = None) -> 'PackageIndex':
+        """
+        Index of a source ISO (or extracted ISO tree), built once and cached
+
+        The cache entry is keyed by the ISO's path, size and mtime. A source
+        without apt repositories gets an empty index.
+        """
+        source = Path(source)
+        st = source.stat()
+        key = hashlib.sha256(
+            f"{source.resolve()}:{st.st_size}:{st.st_mtime_ns}:{cls.FORMAT_VERSION}".encode()
+        ).hexdigest()[:24]
+        cache_dir = Path(cache_dir or PlatformHelper.get_data_directory() / "package-index")
+        index_file = cache_dir / f"{key}.idx"
+        if index_file.exists():
+            try:
+                return cls(index_file)
+            except ValueError:
+                pass
+
+        if source.is_dir():
+            return cls.write(index_file, find_packages_files(source))
+        try:
+            with ISOImage(source) as image:
+                paths = iso_packages_files(image)
+                if not paths:
+                    print(f"  ⚠ {source.name} has no package repository to index")
+                # Packages files are streamed straight out of the image
+                return cls.write(index_file, [image.open(path) for path in paths])
+        except ValueError as e:
+            print(f"  ⚠ Cannot index {source.name}: {e}")
+            return cls.write(index_file, [])
+
+
+def _lookup(indexes: List[PackageIndex], name: str) -> Optional[Package]:
+    for index in indexes:
+        package = index.get(name)
+        if package:
+            return package
+    return None
+
+
+def _providers(indexes: List[PackageIndex], name: str) -> List[str]:
+    return [provider for index in indexes for provider in index.providers(name)]
+
+
+def dependency_closure(indexes: List[PackageIndex], roots: List[str],
+                       recommends: bool = True, exclude=()) -> Closure:
+    """
+    Everything apt would install for roots, as far as the indexes can tell
+
+    Alternatives and virtual packages resolve to a package already in the
+    closure when there is one, otherwise to the first that exists, as apt
+    does. Versions are not checked: each index holds one version per package.
+
+    Args:
+        indexes: Indexes to resolve in, in order of preference
+        roots: Packages to install
+        recommends: Follow Recommends like apt-get's default
+        exclude: Packages already installed (their dependencies are too)
+
+    Returns:
+        Closure of packages (name -> Package) and the unresolvable relations
+    """
+    exclude = set(exclude)
+    packages: Dict[str, Package] = {}
+    missing = []
+    queue = [[root] for root in roots]
+    optional = [False] * len(queue)
+
+    def resolve(alternatives):
+        for name in alternatives:
+            if name in packages or name in exclude:
+                return name
+            for provider in _providers(indexes, name):
+                if provider in packages or provider in exclude:
+                    return provider
+        for name in alternatives:
+            if _lookup(indexes, name):
+                return name
+            providers = [p for p in _providers(indexes, name) if _lookup(indexes, p)]
+            if providers:
+                return providers[0]
+        return None
+
+    while queue:
+        alternatives, is_optional = queue.pop(), optional.pop()
+        name = resolve(alternatives)
+        if name is None:
+            if not is_optional:
+                missing.append(' | '.join(alternatives))
+            continue
+        if name in packages or name in exclude:
+            continue
+        package = _lookup(indexes, name)
+        packages[name] = package
+        queue += package.depends
+        optional += [False] * len(package.depends)
+        if recommends:
+            queue += package.recommends
+            optional += [True] * len(package.recommends)
+    return Closure(packages, sorted(set(missing)))
+
+
+def base_packages(indexes: List[PackageIndex]) -> set:
+    """Packages every build already has: Essential, or of required/important priority"""
+    return {package.name for index in indexes for package in index.packages()
+            if package.essential or package.priority in BASE_PRIORITIES}
+
+
+def installed_size(closure: Closure) -> int:
+    """Installed size of a closure in bytes"""
+    return sum(package.installed_size for package in closure.packages.values()) * 1024
+
+
+def component_closure(indexes: List[PackageIndex], components: List[str], base=None) -> Closure:
+    """Closure of the packages of several components, beyond the base system"""
+    roots = [name for component in components for name in COMPONENT_PACKAGES.get(component, [])]
+    if base is None:
+        base = base_packages(indexes)
+    return dependency_closure(indexes, roots, exclude=base)
+
+
+def format_size(size: int) -> str:
+    """Bytes in the MB/GB notation of the component list"""
+    if size >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.1f}GB"
+    return f"{size / 1024 ** 2:.0f}MB"
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Package Index - Index the packages of source ISOs'
+    )
+    parser.add_argument('sources', nargs='+', help='ISO files or extracted ISO trees')
+    parser.add_argument('--component', action='append', default=[],
+                        help='Show the closure and size of a component (repeatable)')
+    parser.add_argument('--package', action='append', default=[],
+                        help='Show the closure and size of a package (repeatable)')
+
+    args = parser.parse_args()
+    indexes = [PackageIndex.for_source(source) for source in args.sources]
+    for source, index in zip(args.sources, indexes):
+        print(f"✓ {source}: {len(index)} packages ({index.path})")
+
+    if args.component or args.package:
+        base = base_packages(indexes)
+        roots = args.package + [name for component in args.component
+                                for name in COMPONENT_PACKAGES.get(component, [])]
+        closure = dependency_closure(indexes, roots, exclude=base)
+        print(f"Closure: {len(closure.packages)} packages, "
+              f"{format_size(installed_size(closure))} installed")
+        for relation in closure.missing:
+            print(f"  ⚠ Unresolved: {relation}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Reproducible Builds
+SOURCE_DATE_EPOCH handling, so an unchanged config gives a byte-identical ISO
+"""
+
+import os
+import sys
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+# Used when reproducible mode is on but no epoch is given: Debian 12 release day
+DEFAULT_EPOCH = 1686355200
+
+# Files whose content depends on when or on which machine the rootfs was built.
+# machine-id is emptied rather than removed so systemd generates one on first boot.
+EMPTIED_FILES = ['etc/machine-id']
+REMOVED_PATHS = [
+    'var/lib/dbus/machine-id',
+    'var/cache/ldconfig/aux-cache',
+    'var/cache/debconf/config.dat-old',
+    'var/cache/debconf/templates.dat-old',
+    'var/lib/dpkg/status-old',
+    'var/lib/dpkg/diversions-old',
+    'var/cache/apt/pkgcache.bin',
+    'var/cache/apt/srcpkgcache.bin',
+]
+# Directories whose contents are dropped (the directories themselves stay)
+EMPTIED_DIRS = ['var/lib/apt/lists', 'var/log', 'tmp', 'var/tmp']
+
+
+def source_date_epoch(config: dict) -> Optional[int]:
+    """
+    Build timestamp of a reproducible build, or None for a normal build
+
+    Controlled by 'reproducible': {'enabled': False, 'source_date_epoch': None}.
+    A SOURCE_DATE_EPOCH environment variable turns the mode on by itself and
+    takes precedence over the configured epoch.
+    """
+    settings = config.get('reproducible', {})
+    env_epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if env_epoch:
+        return int(env_epoch)
+    if not settings.get('enabled', False):
+        return None
+    epoch = settings.get('source_date_epoch')
+    return int(epoch) if epoch is not None else DEFAULT_EPOCH
+
+
+def build_timestamp(epoch: int = None) -> str:
+    """ISO 8601 timestamp for manifests: the epoch if given, otherwise now"""
+    if epoch is None:
+        return datetime.now().isoformat()
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+@contextmanager
+def reproducible_environment(epoch: int = None):
+    """
+    Export SOURCE_DATE_EPOCH (and TZ=UTC) to every tool the block starts
+
+    dpkg, update-initramfs, shadow, mksquashfs and xorriso all take their
+    timestamps from it. Does nothing when epoch is None.
+    """
+    if epoch is None:
+        yield
+        return
+    saved = {name: os.environ.get(name) for name in ('SOURCE_DATE_EPOCH', 'TZ')}
+    os.environ['SOURCE_DATE_EPOCH'] = str(epoch)
+    os.environ['TZ'] = 'UTC'
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def clamp_mtimes(root, epoch: int) -> int:
+    """
+    Set every mtime under root that is newer than epoch to epoch
+
+    Older files (as unpacked by dpkg) keep their times. Symlinks are changed
+    themselves, not their targets.
+
+    Returns:
+        Number of entries changed
+    """
+    changed = 0
+    root = str(root)
+    # Children first: touching an entry never changes its parent's mtime, but
+    # walking top-down would still visit the parent before its entries are done
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        for name in filenames + dirnames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.lstat(path)
+                if st.st_mtime > epoch:
+                    os.utime(path, (epoch, epoch), follow_symlinks=False)
+                    changed += 1
+            except OSError:
+                pass
+    try:
+        if os.lstat(root).st_mtime > epoch:
+            os.utime(root, (epoch, epoch), follow_symlinks=False)
+            changed += 1
+    except OSError:
+        pass
+    return changed
+
+
+def scrub_rootfs(rootfs_dir: Path) -> List[str]:
+    """
+    Remove build-time state that differs between otherwise identical builds
+
+    Returns:
+        Relative paths that were emptied or removed
+    """
+    rootfs_dir = Path(rootfs_dir)
+    scrubbed = []
+    for rel in EMPTIED_FILES:
+        path = rootfs_dir / rel
+        if path.is_file() and not path.is_symlink() and path.stat().st_size:
+            path.write_text('')
+            scrubbed.append(rel)
+    for rel in REMOVED_PATHS:
+        path = rootfs_dir / rel
+        if path.is_file() or path.is_symlink():
+            path.unlink()
+            scrubbed.append(rel)
+    for rel in EMPTIED_DIRS:
+        directory = rootfs_dir / rel
+        if not directory.is_dir() or directory.is_symlink():
+            continue
+        for entry in directory.iterdir():
+            if entry.is_dir() and not entry.is_symlink():
+                if rel == 'var/log':
+                    # Packages expect their log directories to exist
+                    _empty_logs(entry)
+                    continue
+                shutil.rmtree(entry, ignore_errors=True)
+            elif rel == 'var/lib/apt/lists' and entry.name == 'lock':
+                continue
+            else:
+                entry.unlink()
+            scrubbed.append(f"{rel}/{entry.name}")
+    return scrubbed
+
+
+def _empty_logs(directory: Path):
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            path = Path(root) / name
+            if not path.is_symlink():
+                path.unlink()
+
+
+def iso_date(epoch: int) -> str:
+    """Epoch in the YYYYMMDDhhmmsscc form xorriso takes for volume dates"""
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y%m%d%H%M%S00")
+
+
+def xorriso_options(epoch: int) -> List[str]:
+    """
+    xorriso -as mkisofs options that pin the volume dates and UUIDs to epoch
+
+    The modification date doubles as the volume UUID GRUB searches for, and
+    with SOURCE_DATE_EPOCH exported xorriso derives the GPT GUIDs from it too.
+    File dates in the image are taken from the (clamped) ISO tree.
+    """
+    return [
+        f'--modification-date={iso_date(epoch)}',
+        '--set_all_file_dates', 'set_to_mtime',
+    ]
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Reproducible Builds - Normalize a rootfs for a reproducible build'
+    )
+    parser.add_argument('rootfs', help='Root filesystem directory')
+    parser.add_argument('--epoch', type=int,
+                        help='SOURCE_DATE_EPOCH (default: $SOURCE_DATE_EPOCH or the Debian 12 release)')
+
+    args = parser.parse_args()
+    epoch = args.epoch if args.epoch is not None else source_date_epoch({'reproducible': {'enabled': True}})
+    scrubbed = scrub_rootfs(args.rootfs)
+    changed = clamp_mtimes(args.rootfs, epoch)
+    print(f"✓ Scrubbed {len(scrubbed)} path(s), clamped {changed} mtime(s) to {build_timestamp(epoch)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
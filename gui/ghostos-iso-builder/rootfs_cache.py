@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Rootfs Snapshot Cache
+Content-addressed cache of debootstrapped base systems
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from platform_utils import PlatformHelper
+from build_telemetry import run_command
+
+
+class RootfsSnapshotCache:
+    """Stores bootstrapped root filesystems as tarballs keyed by their inputs"""
+
+    # Bump when the snapshot layout changes so old entries stop matching
+    FORMAT_VERSION = 1
+    DEFAULT_MAX_BYTES = 8 * 1024 ** 3
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        """
+        Initialize snapshot cache
+
+        Args:
+            cache_dir: Cache location (default: <data dir>/rootfs-cache)
+            max_bytes: Total size limit before old snapshots are evicted
+        """
+        self.cache_dir = Path(cache_dir or PlatformHelper.get_data_directory() / "rootfs-cache")
+        self.max_bytes = max_bytes if max_bytes is not None else self.DEFAULT_MAX_BYTES
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Extracted snapshots, used read-only as overlayfs lower dirs
+        self.trees_dir = self.cache_dir / "trees"
+
+    @classmethod
+    def make_key(cls, suite: str, arch: str, mirror: str, include: List[str]) -> str:
+        """Compute the cache key for a debootstrap invocation"""
+        identity = {
+            'format': cls.FORMAT_VERSION,
+            'suite': suite,
+            'arch': arch,
+            'mirror': mirror.rstrip('/'),
+            'include': sorted(set(include)),
+        }
+        encoded = json.dumps(identity, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _compressor(self) -> List[str]:
+        """Pick the fastest available tar compression program"""
+        if shutil.which('zstd'):
+            return ['-I', 'zstd -T0']
+        return ['-z']
+
+    def _decompressor(self, meta: Dict) -> List[str]:
+        if meta.get('compression') == 'zstd':
+            return ['-I', 'zstd']
+        return ['-z']
+
+    def _paths(self, key: str):
+        archive = self.cache_dir / f"{key}.tar"
+        return archive, archive.with_suffix('.json')
+
+    def _read_meta(self, meta_file: Path) -> Optional[Dict]:
+        try:
+            return json.loads(meta_file.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """Return snapshot metadata for key, or None on a miss"""
+        archive, meta_file = self._paths(key)
+        if not archive.exists():
+            return None
+        return self._read_meta(meta_file)
+
+    def restore(self, key: str, target_dir: Path) -> bool:
+        """
+        Extract a cached snapshot into target_dir
+
+        Returns:
+            True on a cache hit, False if no snapshot exists
+        """
+        meta = self.lookup(key)
+        if meta is None:
+            return False
+
+        archive, meta_file = self._paths(key)
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        cmd = ['tar', '--numeric-owner', '--xattrs', '--xattrs-include=*',
+               *self._decompressor(meta), '-xpf', str(archive), '-C', str(target_dir)]
+        result = run_command(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            # A corrupt snapshot is worse than a miss - drop it and rebuild
+            print(f"  ⚠ Snapshot {key[:12]} unusable, discarding: {result.stderr.strip()}")
+            self.invalidate(key)
+            shutil.rmtree(target_dir, ignore_errors=True)
+            target_dir.mkdir(parents=True, exist_ok=True)
+            return False
+
+        meta['last_used'] = time.time()
+        meta['hits'] = meta.get('hits', 0) + 1
+        meta_file.write_text(json.dumps(meta, indent=2))
+        return True
+
+    def materialize(self, key: str) -> Optional[Path]:
+        """
+        Return an extracted, shared copy of a snapshot, extracting it on first use
+
+        Callers must not modify the tree; mount it as an overlay lower dir and
+        hold hold_tree() while it is mounted.
+
+        Returns:
+            Tree path, or None if no usable snapshot exists
+        """
+        tree = self.trees_dir / key
+        if tree.is_dir():
+            self._touch(key)
+            return tree
+
+        self.trees_dir.mkdir(parents=True, exist_ok=True)
+        tmp_tree = self.trees_dir / f".{key}.{os.getpid()}.tmp"
+        if not self.restore(key, tmp_tree):
+            shutil.rmtree(tmp_tree, ignore_errors=True)
+            return None
+        try:
+            os.rename(tmp_tree, tree)
+        except OSError:
+            # Another build published the same tree first
+            shutil.rmtree(tmp_tree, ignore_errors=True)
+            return tree if tree.is_dir() else None
+
+        archive, meta_file = self._paths(key)
+        meta = self._read_meta(meta_file)
+        if meta:
+            meta['tree_size'] = sum(f.stat().st_size for f in tree.rglob('*')
+                                    if f.is_file() and not f.is_symlink())
+            meta_file.write_text(json.dumps(meta, indent=2))
+        self.evict()
+        return tree
+
+    def hold_tree(self, key: str):
+        """
+        Take a shared lock that keeps eviction away from a materialized tree
+
+        Returns:
+            Open lock file; closing it releases the hold
+        """
+        self.trees_dir.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.trees_dir / f"{key}.lock", 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_SH)
+        return lock_file
+
+    def _remove_tree(self, key: str) -> bool:
+        """Delete a materialized tree unless a build still has it mounted"""
+        tree = self.trees_dir / key
+        if not tree.exists():
+            return True
+        with open(self.trees_dir / f"{key}.lock", 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print(f"  ⚠ Snapshot tree {key[:12]} is in use, keeping it")
+                return False
+            shutil.rmtree(tree)
+        return True
+
+    def _touch(self, key: str):
+        meta_file = self._paths(key)[1]
+        meta = self._read_meta(meta_file)
+        if meta:
+            meta['last_used'] = time.time()
+            meta_file.write_text(json.dumps(meta, indent=2))
+
+    def store(self, key: str, source_dir: Path, description: Dict = None):
+        """Archive source_dir as the snapshot for key, then enforce the size limit"""
+        archive, meta_file = self._paths(key)
+        tmp_archive = archive.with_name(f".{archive.name}.{os.getpid()}.tmp")
+
+        compressor = self._compressor()
+        cmd = ['tar', '--numeric-owner', '--xattrs', '--xattrs-include=*',
+               *compressor, '-cpf', str(tmp_archive), '-C', str(source_dir), '.']
+        result = run_command(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            tmp_archive.unlink(missing_ok=True)
+            print(f"  ⚠ Could not store rootfs snapshot: {result.stderr.strip()}")
+            return
+
+        now = time.time()
+        meta = {
+            'key': key,
+            'size': tmp_archive.stat().st_size,
+            'compression': 'zstd' if compressor[0] == '-I' else 'gzip',
+            'created': now,
+            'last_used': now,
+            'hits': 0,
+            'inputs': description or {},
+        }
+        # Publish archive before metadata; lookup() treats the archive as authoritative
+        os.replace(tmp_archive, archive)
+        meta_file.write_text(json.dumps(meta, indent=2))
+
+        self.evict()
+
+    def entries(self) -> List[Dict]:
+        """List cached snapshots, most recently used first"""
+        result = []
+        for meta_file in self.cache_dir.glob("*.json"):
+            meta = self._read_meta(meta_file)
+            if meta and self._paths(meta['key'])[0].exists():
+                result.append(meta)
+        return sorted(result, key=lambda m: m.get('last_used', 0), reverse=True)
+
+    def total_size(self) -> int:
+        return sum(entry['size'] + entry.get('tree_size', 0) for entry in self.entries())
+
+    def evict(self, max_bytes: int = None) -> List[str]:
+        """Remove least recently used snapshots until the cache fits max_bytes"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        removed = []
+        total = 0
+        for entry in self.entries():
+            total += entry['size'] + entry.get('tree_size', 0)
+            if total > limit:
+                self.invalidate(entry['key'])
+                removed.append(entry['key'])
+        return removed
+
+    def invalidate(self, key: str = None) -> int:
+        """
+        Drop one snapshot, or every snapshot when key is None
+
+        Returns:
+            Number of snapshots removed
+        """
+        keys = [key] if key else [entry['key'] for entry in self.entries()]
+        removed = 0
+        for k in keys:
+            archive, meta_file = self._paths(k)
+            if archive.exists():
+                removed += 1
+            archive.unlink(missing_ok=True)
+            meta_file.unlink(missing_ok=True)
+            self._remove_tree(k)
+        # Leftovers from interrupted store() and materialize() calls
+        if key is None:
+            for tmp in self.cache_dir.glob(".*.tmp"):
+                tmp.unlink(missing_ok=True)
+            for tmp in self.trees_dir.glob(".*.tmp"):
+                shutil.rmtree(tmp, ignore_errors=True)
+            # Trees that were in use when their snapshot was dropped
+            for tree in self.trees_dir.glob("[!.]*"):
+                if tree.is_dir() and not self._paths(tree.name)[0].exists():
+                    self._remove_tree(tree.name)
+        return removed
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Rootfs Snapshot Cache - Manage cached base systems'
+    )
+    parser.add_argument('--cache-dir', help='Cache directory (default: user data dir)')
+    parser.add_argument('--list', action='store_true', help='List cached snapshots')
+    parser.add_argument(
+        '--invalidate',
+        metavar='KEY',
+        nargs='?',
+        const='all',
+        help='Remove one snapshot by key (prefix allowed) or all snapshots'
+    )
+    parser.add_argument(
+        '--prune',
+        metavar='GB',
+        type=float,
+        help='Evict least recently used snapshots down to the given size'
+    )
+
+    args = parser.parse_args()
+    cache = RootfsSnapshotCache(args.cache_dir)
+
+    if args.invalidate:
+        if args.invalidate == 'all':
+            count = cache.invalidate()
+        else:
+            matches = [e['key'] for e in cache.entries() if e['key'].startswith(args.invalidate)]
+            if len(matches) != 1:
+                print(f"✗ Key prefix matches {len(matches)} snapshots")
+                return 1
+            count = cache.invalidate(matches[0])
+        print(f"✓ Removed {count} snapshot(s)")
+        return 0
+
+    if args.prune is not None:
+        removed = cache.evict(int(args.prune * 1024 ** 3))
+        print(f"✓ Evicted {len(removed)} snapshot(s)")
+        return 0
+
+    entries = cache.entries()
+    print(f"Rootfs snapshots in {cache.cache_dir}:")
+    for entry in entries:
+        inputs = entry.get('inputs', {})
+        last_used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used']))
+        print(f"  {entry['key'][:12]}  {entry['size'] / 1024 ** 2:8.1f} MB  "
+              f"{inputs.get('suite', '?')}/{inputs.get('arch', '?')}  "
+              f"hits={entry.get('hits', 0)}  last used {last_used}")
+    print(f"Total: {cache.total_size() / 1024 ** 3:.2f} GB in {len(entries)} snapshot(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
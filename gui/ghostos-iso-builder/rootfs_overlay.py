@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Rootfs Overlay
+Copy-on-write build rootfs: a shared read-only base tree plus a per-build upper dir
+"""
+
+import os
+import json
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from build_telemetry import run_command
+
+
+class OverlayRootfs:
+    """overlayfs mount of a prepared base system at a build's rootfs_dir"""
+
+    STATE_FILE = "overlay.json"
+
+    def __init__(self, work_dir: Path, rootfs_dir: Path):
+        """
+        Initialize overlay rootfs
+
+        Args:
+            work_dir: Build working directory holding the upper and work dirs
+            rootfs_dir: Mount point; the merged view every stage writes to
+        """
+        self.work_dir = Path(work_dir)
+        self.rootfs_dir = Path(rootfs_dir)
+        self.upper_dir = self.work_dir / "overlay" / "upper"
+        self.overlay_work_dir = self.work_dir / "overlay" / "work"
+        self.state_file = self.work_dir / "overlay" / self.STATE_FILE
+
+    def is_mounted(self) -> bool:
+        return os.path.ismount(self.rootfs_dir)
+
+    def lower_dir(self) -> Optional[Path]:
+        """Base tree recorded for this workspace"""
+        try:
+            return Path(json.loads(self.state_file.read_text())['lower'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def mount(self, lower_dir: Path):
+        """Mount lower_dir + a fresh or existing upper dir at rootfs_dir"""
+        self.upper_dir.mkdir(parents=True, exist_ok=True)
+        self.overlay_work_dir.mkdir(parents=True, exist_ok=True)
+        self.rootfs_dir.mkdir(parents=True, exist_ok=True)
+        options = (f"lowerdir={lower_dir},upperdir={self.upper_dir},"
+                   f"workdir={self.overlay_work_dir}")
+        result = run_command(['mount', '-t', 'overlay', 'overlay', '-o', options,
+                              str(self.rootfs_dir)], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Could not mount overlay rootfs: {result.stderr.strip()}")
+        self.state_file.write_text(json.dumps({'lower': str(lower_dir)}))
+
+    def remount(self) -> bool:
+        """
+        Mount a persistent workspace's overlay again after a previous build
+
+        Returns:
+            True if the rootfs is mounted, False if the base tree is gone
+        """
+        if self.is_mounted():
+            return True
+        lower = self.lower_dir()
+        if lower is None or not lower.is_dir():
+            return False
+        self.mount(lower)
+        return True
+
+    def unmount(self):
+        if not self.is_mounted():
+            return
+        if run_command(['umount', str(self.rootfs_dir)]).returncode != 0:
+            run_command(['umount', '--lazy', str(self.rootfs_dir)], check=False)
+
+    def reset(self):
+        """Unmount and throw away this build's changes"""
+        self.unmount()
+        shutil.rmtree(self.work_dir / "overlay", ignore_errors=True)
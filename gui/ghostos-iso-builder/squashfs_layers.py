@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Layered Squashfs
+Splits the live filesystem into stacked squashfs images so a rebuild
+recompresses only the layers whose files changed
+"""
+
+import os
+import json
+import stat
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from squashfs_profiles import SquashfsProfile, mksquashfs_command
+from tool_runner import MksquashfsParser, run_tool, scaled
+
+
+def file_digest(path) -> str:
+    """sha256 of one file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def rootfs_manifest(root, excludes=(), hashes: Dict[str, list] = None) -> Dict[str, tuple]:
+    """
+    Map every path under root to a content signature
+
+    Directories only carry mode and ownership: their mtime changes whenever an
+    entry is added, which would make every parent of a new file look modified.
+    Files carry their size and content hash rather than mtime or inode, so a
+    rootfs rebuilt with the same contents keeps the same signatures.
+
+    Args:
+        root: Directory to walk
+        excludes: Top-level entries to leave out
+        hashes: Content hashes by path, as [inode, mtime_ns, size, digest];
+                reused while a file's stat is unchanged and updated in place
+    """
+    root = str(root)
+    top_excludes = set(excludes)
+    if hashes is None:
+        hashes = {}
+    manifest = {}
+    for current, dirs, files in os.walk(root):
+        rel_dir = os.path.relpath(current, root)
+        if rel_dir == '.':
+            dirs[:] = [d for d in dirs if d not in top_excludes]
+            files = [f for f in files if f not in top_excludes]
+        for name in dirs + files:
+            full = os.path.join(current, name)
+            try:
+                st = os.lstat(full)
+            except OSError:
+                continue
+            rel = os.path.relpath(full, root)
+            owner = (st.st_mode, st.st_uid, st.st_gid)
+            if stat.S_ISDIR(st.st_mode):
+                manifest[rel] = owner
+            elif stat.S_ISLNK(st.st_mode):
+                manifest[rel] = owner + (os.readlink(full),)
+            elif stat.S_ISREG(st.st_mode):
+                key = [st.st_ino, st.st_mtime_ns, st.st_size]
+                cached = hashes.get(rel)
+                if cached is None or cached[:3] != key:
+                    try:
+                        cached = hashes[rel] = key + [file_digest(full)]
+                    except OSError:
+                        continue
+                manifest[rel] = owner + (st.st_size, cached[3])
+            else:
+                manifest[rel] = owner + (st.st_rdev,)
+    return manifest
+
+
+def changed_paths(before: Dict[str, tuple], after: Dict[str, tuple]) -> List[str]:
+    """Paths that are new in, or differ in, the after manifest"""
+    return sorted(path for path, sig in after.items() if before.get(path) != sig)
+
+
+class SquashfsLayers:
+    """
+    Tracks which build stages own which rootfs paths and builds one image per layer
+
+    The first layer is the base and owns everything no upper layer claimed. Upper
+    layer stages must run one at a time, after the base is complete, so the
+    difference between rootfs manifests before and after each stage is exactly
+    what it wrote. Every path belongs to the topmost layer that touched it, so the
+    layers partition the final rootfs and no overlay whiteouts are needed.
+    """
+
+    MODULE_FILE = "filesystem.module"
+
+    def __init__(self, state_dir: Path, layers: List[str], excludes: List[str] = ()):
+        """
+        Initialize layer tracking
+
+        Args:
+            state_dir: Persistent directory for path ownership and layer digests
+            layers: Layer names, bottom first; the first one is the base
+            excludes: Top-level rootfs entries kept out of every layer
+        """
+        # Created on first write: describing a build must not touch the disk
+        self.state_dir = Path(state_dir)
+        self.layers = list(layers)
+        self.excludes = list(excludes)
+        self._manifest: Optional[Dict[str, tuple]] = None
+        self._hashes: Optional[Dict[str, list]] = None
+
+    def image_name(self, layer: str) -> str:
+        return f"{self.layers.index(layer):02d}-{layer}.squashfs"
+
+    def _state_file(self, layer: str, kind: str) -> Path:
+        return self.state_dir / f"{layer}.{kind}.json"
+
+    def _write_state(self, layer: str, kind: str, value):
+        target = self._state_file(layer, kind)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix('.tmp')
+        tmp.write_text(json.dumps(value))
+        os.replace(tmp, target)
+
+    def _read_state(self, layer: str, kind: str):
+        try:
+            return json.loads(self._state_file(layer, kind).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _rootfs_manifest(self, rootfs_dir: Path) -> Dict[str, tuple]:
+        """rootfs_manifest, hashing only files changed since the last build"""
+        if self._hashes is None:
+            self._hashes = self._read_state('rootfs', 'hashes') or {}
+        manifest = rootfs_manifest(rootfs_dir, self.excludes, self._hashes)
+        # Forget removed files
+        for path in set(self._hashes) - set(manifest):
+            del self._hashes[path]
+        self._write_state('rootfs', 'hashes', self._hashes)
+        return manifest
+
+    def capture(self, layer: str, rootfs_dir: Path, func: Callable) -> Callable:
+        """Wrap a stage function so the paths it writes are owned by layer"""
+        def run(progress):
+            before = self._manifest or self._rootfs_manifest(rootfs_dir)
+            result = func(progress)
+            after = self._rootfs_manifest(rootfs_dir)
+            # Files an earlier run wrote but this one left alone still belong here
+            owned = set(changed_paths(before, after))
+            owned.update(p for p in self._read_state(layer, 'paths') or [] if p in after)
+            self._write_state(layer, 'paths', sorted(owned))
+            # Upper stages are serialized, so this is the next stage's "before"
+            self._manifest = after
+            return result
+        return run
+
+    def assign(self, manifest: Dict[str, tuple]) -> Dict[str, List[str]]:
+        """Partition manifest paths between layers, topmost claim wins"""
+        owner = {}
+        for layer in self.layers[1:]:
+            for path in self._read_state(layer, 'paths') or []:
+                if path in manifest:
+                    owner[path] = layer
+        assignment = {layer: [] for layer in self.layers}
+        for path in manifest:
+            assignment[owner.get(path, self.layers[0])].append(path)
+        for paths in assignment.values():
+            paths.sort()
+        return assignment
+
+    @staticmethod
+    def digest(paths: List[str], manifest: Dict[str, tuple], profile: SquashfsProfile,
+               mkfs_time: int = None) -> str:
+        h = hashlib.sha256(profile.name.encode())
+        if mkfs_time is not None:
+            h.update(f"mkfs-time:{mkfs_time}".encode())
+        for path in paths:
+            h.update(json.dumps([path, manifest[path]]).encode())
+        return h.hexdigest()
+
+    def _stage_upper(self, rootfs_dir: Path, paths: List[str], staging: Path):
+        """Hardlink one upper layer's paths, plus their parent directories, into staging"""
+        if staging.exists():
+            shutil.rmtree(staging)
+        staging.mkdir(parents=True)
+        created = ['.']
+
+        def make_dir(rel: str):
+            target = staging / rel
+            if target.is_dir():
+                return
+            if os.path.dirname(rel):
+                make_dir(os.path.dirname(rel))
+            source = rootfs_dir / rel
+            target.mkdir()
+            st = os.lstat(source)
+            os.lchown(target, st.st_uid, st.st_gid)
+            created.append(rel)
+
+        for rel in paths:
+            source = rootfs_dir / rel
+            parent = os.path.dirname(rel)
+            if parent:
+                make_dir(parent)
+            if source.is_dir() and not source.is_symlink():
+                make_dir(rel)
+            else:
+                os.link(source, staging / rel, follow_symlinks=False)
+
+        # Directory times last: adding entries would bump them again
+        for rel in reversed(created):
+            shutil.copystat(rootfs_dir / rel, staging / rel)
+
+    def build(self, rootfs_dir: Path, live_dir: Path, profile: SquashfsProfile,
+              processors: int = None, memory: str = None,
+              progress_callback: Callable = None, mkfs_time: int = None) -> List[str]:
+        """
+        Build or reuse one squashfs image per non-empty layer
+
+        mkfs_time pins the image timestamps for a reproducible build.
+
+        Returns:
+            Image file names, bottom first (also written to filesystem.module)
+        """
+        rootfs_dir = Path(rootfs_dir)
+        live_dir = Path(live_dir)
+        manifest = self._rootfs_manifest(rootfs_dir)
+        assignment = self.assign(manifest)
+        images = []
+
+        for index, layer in enumerate(self.layers):
+            paths = assignment[layer]
+            image = live_dir / self.image_name(layer)
+            layer_progress = scaled(progress_callback, index * 100 / len(self.layers),
+                                    (index + 1) * 100 / len(self.layers))
+            if layer_progress:
+                layer_progress(0, f"Compressing {layer} layer...")
+
+            if not paths and index > 0:
+                image.unlink(missing_ok=True)
+                self._state_file(layer, 'digest').unlink(missing_ok=True)
+                continue
+            images.append(image.name)
+
+            digest = self.digest(paths, manifest, profile, mkfs_time)
+            if image.exists() and self._read_state(layer, 'digest') == digest:
+                print(f"  ✓ Layer {layer} unchanged, reusing {image.name}")
+                continue
+
+            # Forget the digest first so an interrupted build can't trust a partial image
+            self._state_file(layer, 'digest').unlink(missing_ok=True)
+            print(f"  [*] Compressing layer {layer} ({len(paths)} paths)...")
+            if index == 0:
+                # The base is most of the rootfs: exclude the upper paths instead of copying it
+                self.state_dir.mkdir(parents=True, exist_ok=True)
+                exclude_file = self.state_dir / "base.exclude"
+                upper = [p for layer_paths in list(assignment.values())[1:] for p in layer_paths]
+                exclude_file.write_text(''.join(f"{p}\n" for p in upper))
+                run_tool(mksquashfs_command(rootfs_dir, image, profile, processors, memory,
+                                            excludes=self.excludes, exclude_file=exclude_file,
+                                            percentage=True, mkfs_time=mkfs_time),
+                         MksquashfsParser(), layer_progress)
+            else:
+                staging = self.state_dir / f"stage-{layer}"
+                self._stage_upper(rootfs_dir, paths, staging)
+                try:
+                    run_tool(mksquashfs_command(staging, image, profile, processors, memory,
+                                                percentage=True, mkfs_time=mkfs_time),
+                             MksquashfsParser(), layer_progress)
+                finally:
+                    shutil.rmtree(staging, ignore_errors=True)
+            self._write_state(layer, 'digest', digest)
+
+        (live_dir / self.MODULE_FILE).write_text(''.join(f"{name}\n" for name in images))
+        return images
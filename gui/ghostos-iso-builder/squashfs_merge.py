@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Squashfs Merge
+Copies merged components out of the source ISOs' live squashfs images straight
+into the rootfs, so packages already on disk are not downloaded and unpacked again
+"""
+
+import os
+import re
+import sys
+import shutil
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from build_telemetry import in_stage, run_command
+from tool_runner import UnsquashfsParser, run_tool
+from iso9660 import ISOImage
+from package_index import (PackageIndex, dependency_closure, parse_versioned_relations,
+                           version_satisfies)
+
+# Live system images, as Debian live and Ubuntu casper place them
+LIVE_SQUASHFS = ['live/filesystem.squashfs', 'casper/filesystem.squashfs']
+DPKG_STATUS = 'var/lib/dpkg/status'
+DPKG_INFO = 'var/lib/dpkg/info'
+
+# unsquashfs -lls: mode, owner, size (or major, minor), date, time, squashfs-root/path
+LISTING_LINE = re.compile(r'^([-dlcbps])\S{9}\s+\S+\s+.*?\d{4}-\d{2}-\d{2} \d{2}:\d{2} (.*)$')
+
+SourceImage = namedtuple('SourceImage', ['iso', 'path', 'offset', 'size'])
+SourceImage.__doc__ = "A live squashfs inside an ISO, readable at a byte offset of the ISO file"
+
+Listing = namedtuple('Listing', ['dirs', 'symlinks', 'paths'])
+Listing.__doc__ = "Directories, symlinks (path to target) and every non-directory path of an image"
+
+MergeResult = namedtuple('MergeResult', ['extracted', 'left', 'files'])
+MergeResult.__doc__ = "Packages copied (name to source ISO), roots left to apt and files written"
+
+
+def locate_squashfs(iso_path) -> Optional[SourceImage]:
+    """
+    Find an ISO's live squashfs
+
+    Raises:
+        ValueError if the image is not contiguous in the ISO (unsquashfs reads
+        it by offset) or the file is not an ISO
+    """
+    with ISOImage(iso_path) as image:
+        for path in LIVE_SQUASHFS:
+            entry = image.entry(path)
+            if entry is None or entry.is_dir:
+                continue
+            start = position = entry.extents[0][0]
+            for offset, length in entry.extents:
+                if offset != position:
+                    raise ValueError(f"{path} in {iso_path} is fragmented")
+                position += length
+            return SourceImage(str(iso_path), path, start, entry.size)
+    return None
+
+
+def parse_listing(lines: Iterator[str]) -> Listing:
+    """Parse unsquashfs -lls output"""
+    dirs, symlinks, paths = set(), {}, set()
+    for line in lines:
+        match = LISTING_LINE.match(line)
+        if not match:
+            continue
+        kind, name = match.groups()
+        if kind == 'l':
+            name, _, target = name.partition(' -> ')
+        path = name.split('/', 1)[1] if '/' in name else ''
+        if not path:
+            continue
+        if kind == 'd':
+            dirs.add(path)
+            continue
+        if kind == 'l':
+            symlinks[path] = target
+        paths.add(path)
+    return Listing(dirs, symlinks, paths)
+
+
+def canonical_path(path: str, symlinks: Dict[str, str], resolve_last: bool = False,
+                   _depth: int = 0) -> str:
+    """
+    Path with symlinked directories resolved, relative to the image root
+
+    dpkg lists files under the path the package shipped them (/bin/bash), which
+    on a merged-/usr system lives behind a directory symlink (usr/bin/bash).
+    Unless resolve_last, the last component is kept: a symlink is extracted as
+    itself.
+    """
+    parts = [part for part in path.split('/') if part and part != '.']
+    resolved = []
+    for i, part in enumerate(parts):
+        if part == '..':
+            if resolved:
+                resolved.pop()
+            continue
+        resolved.append(part)
+        target = symlinks.get('/'.join(resolved))
+        if target is not None and (resolve_last or i < len(parts) - 1) and _depth < 40:
+            base = '' if target.startswith('/') else '/'.join(resolved[:-1])
+            resolved = canonical_path(f"{base}/{target}", symlinks, True, _depth + 1).split('/')
+    return '/'.join(resolved)
+
+
+def status_stanzas(text: str) -> Iterator[Tuple[Dict[str, str], str]]:
+    """(fields, raw stanza) of each entry of a dpkg status file"""
+    for raw in re.split(r'\n\s*\n', text):
+        raw = raw.strip('\n')
+        if not raw:
+            continue
+        fields = {}
+        for line in raw.splitlines():
+            if line[:1] not in (' ', '\t') and ':' in line:
+                key, value = line.split(':', 1)
+                fields.setdefault(key, value.strip())
+        if 'Package' in fields:
+            yield fields, raw
+
+
+def installed_stanzas(text: str, arch: str) -> Dict[str, str]:
+    """Raw status stanzas of the packages installed for arch (or all), by name"""
+    stanzas = {}
+    for fields, raw in status_stanzas(text):
+        if fields.get('Status', '').endswith(' installed') and \
+                fields.get('Architecture') in (arch, 'all'):
+            stanzas[fields['Package']] = raw
+    return stanzas
+
+
+def conffiles(raw: str) -> List[str]:
+    """Conffile paths listed in a raw status stanza"""
+    paths, inside = [], False
+    for line in raw.splitlines():
+        if line[:1] not in (' ', '\t'):
+            inside = line.startswith('Conffiles:')
+            continue
+        if inside and line.split():
+            paths.append(line.split()[0])
+    return paths
+
+
+def unpacked_packages(rootfs_dir) -> List[str]:
+    """Packages registered in a rootfs whose maintainer scripts have not run yet"""
+    status = Path(rootfs_dir) / DPKG_STATUS
+    if not status.exists():
+        return []
+    return [fields['Package'] for fields, _ in status_stanzas(status.read_text(errors='replace'))
+            if fields.get('Status') == 'install ok unpacked']
+
+
+def register_packages(rootfs_dir, stanzas: List[str]):
+    """
+    Add copied packages to the rootfs dpkg database as unpacked
+
+    Their files and info lists are in place; 'dpkg --configure -a' runs the
+    maintainer scripts (alternatives, triggers, users) as for a normal install.
+    """
+    status = Path(rootfs_dir) / DPKG_STATUS
+    text = status.read_text(errors='replace').rstrip('\n') if status.exists() else ''
+    # Without Config-Version, dpkg --configure treats the conffiles as a first install
+    added = [re.sub(r'^Config-Version: .*\n?', '',
+                    re.sub(r'^Status: .*$', 'Status: install ok unpacked', raw, count=1, flags=re.M),
+                    flags=re.M).rstrip('\n')
+             for raw in stanzas]
+    status.parent.mkdir(parents=True, exist_ok=True)
+    tmp = status.with_name('status.heckcheckos-tmp')
+    tmp.write_text('\n\n'.join(([text] if text else []) + added) + '\n')
+    if status.exists():
+        shutil.copy2(status, status.with_name('status-old'))
+    os.replace(tmp, status)
+
+
+def _fields(raw: str) -> Dict[str, str]:
+    return next(status_stanzas(raw), ({}, raw))[0]
+
+
+def _unmet_relations(fields: Dict[str, str], versions: Dict[str, str],
+                     provided: Dict[str, List[Optional[str]]]) -> List[str]:
+    """Pre-Depends/Depends groups of a package that the given versions do not satisfy"""
+    unmet = []
+    for field in ('Pre-Depends', 'Depends'):
+        for group in parse_versioned_relations(fields.get(field, '')):
+            for name, op, required in group:
+                if name in versions and (op is None or
+                                         version_satisfies(versions[name], op, required)):
+                    break
+                if any(op is None or (version is not None and
+                                      version_satisfies(version, op, required))
+                       for version in provided.get(name, [])):
+                    break
+            else:
+                unmet.append(' | '.join(f"{name} ({op} {required})" if op else name
+                                        for name, op, required in group))
+    return unmet
+
+
+def _add_versions(stanzas: Dict[str, str], versions: Dict[str, str],
+                  provided: Dict[str, List[Optional[str]]]):
+    for name, raw in stanzas.items():
+        fields = _fields(raw)
+        versions[name] = fields.get('Version', '')
+        for group in parse_versioned_relations(fields.get('Provides', '')):
+            virtual, op, version = group[0]
+            provided.setdefault(virtual, []).append(version if op == '=' else None)
+
+
+def select_packages(sources: List[Dict[str, str]], roots: List[str], installed: Dict[str, str],
+                    index_dir: Path) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Choose what to copy from which source
+
+    A root is copied only when its whole dependency closure beyond what the
+    rootfs already has is installed in some source's live system, and the
+    versioned Pre-Depends/Depends of every package in it are met by the
+    rootfs and the copied versions; anything else (including a rootfs
+    package too old for a copied one) is left for apt, so the dpkg database
+    never has a hole in it.
+
+    Args:
+        sources: Installed status stanzas of each source, by package name
+        roots: Packages asked for
+        installed: Installed status stanzas of the rootfs, by package name
+        index_dir: Scratch directory for the sources' package indexes
+
+    Returns:
+        (package name to source number, roots left for apt)
+    """
+    index_dir.mkdir(parents=True, exist_ok=True)
+    indexes = []
+    for i, stanzas in enumerate(sources):
+        # A status file is a Packages file with a Status field
+        packages_file = index_dir / f"status-{i}"
+        packages_file.write_text('\n\n'.join(stanzas.values()) + '\n')
+        indexes.append(PackageIndex.write(index_dir / f"status-{i}.idx", [packages_file]))
+
+    rootfs_versions, rootfs_provided = {}, {}
+    _add_versions(installed, rootfs_versions, rootfs_provided)
+
+    # Virtual packages the rootfs provides count as installed too
+    present = set(installed) | set(rootfs_provided)
+    chosen, left = {}, []
+    try:
+        for root in roots:
+            if root in installed:
+                continue
+            closure = dependency_closure(indexes, [root], exclude=present)
+            if closure.missing or not closure.packages:
+                left.append(root)
+                continue
+            picks = {name: chosen[name] if name in chosen else
+                     next(i for i, stanzas in enumerate(sources) if name in stanzas)
+                     for name in closure.packages}
+            versions, provided = dict(rootfs_versions), {
+                name: list(values) for name, values in rootfs_provided.items()}
+            for name, i in {**chosen, **picks}.items():
+                _add_versions({name: sources[i][name]}, versions, provided)
+            if any(_unmet_relations(_fields(sources[i][name]), versions, provided)
+                   for name, i in picks.items()):
+                left.append(root)
+                continue
+            chosen.update(picks)
+    finally:
+        for index in indexes:
+            index.close()
+    return chosen, left
+
+
+def payload_paths(list_text: str, listing: Listing, keep: set = frozenset()) -> List[str]:
+    """
+    Files of a package's dpkg .list that exist in the image, directories left out
+
+    Args:
+        keep: Image paths not to extract (conffiles the rootfs already has)
+    """
+    paths = []
+    for line in list_text.splitlines():
+        path = canonical_path(line, listing.symlinks)
+        if path and path not in listing.dirs and path in listing.paths and path not in keep:
+            paths.append(path)
+    return paths
+
+
+class SquashfsMerge:
+    """Extract packages from source ISOs' live systems into a rootfs"""
+
+    def __init__(self, rootfs_dir: Path, iso_sources: List, work_dir: Path,
+                 arch: str = 'amd64', processors: int = None):
+        """
+        Initialize squashfs merge
+
+        Args:
+            rootfs_dir: Root filesystem to extract into
+            iso_sources: Source ISO paths, earlier ones preferred
+            work_dir: Scratch directory for listings and status files
+            arch: Architecture of the rootfs; other architectures are not copied
+            processors: unsquashfs decompression threads in total (default: CPU count)
+        """
+        self.rootfs_dir = Path(rootfs_dir)
+        self.iso_sources = [str(iso) for iso in iso_sources]
+        self.work_dir = Path(work_dir)
+        self.arch = arch
+        self.processors = processors or os.cpu_count() or 1
+
+    @staticmethod
+    def available() -> bool:
+        return shutil.which('unsquashfs') is not None
+
+    def _unsquashfs(self, source: SourceImage, *args) -> list:
+        return ['unsquashfs', '-o', str(source.offset), *args, source.iso]
+
+    def _read_source(self, i: int, source: SourceImage) -> Tuple[Listing, Dict[str, str]]:
+        """Listing and installed packages of one source"""
+        listing = run_command(self._unsquashfs(source, '-no-progress', '-lls'),
+                              capture_output=True, text=True, errors='replace', check=True)
+        staging = self.work_dir / f"source-{i}"
+        run_command(self._unsquashfs(source, '-no-progress', '-f', '-d', str(staging)) + [DPKG_STATUS],
+                    capture_output=True, check=True)
+        status = staging / DPKG_STATUS
+        text = status.read_text(errors='replace') if status.exists() else ''
+        return parse_listing(listing.stdout.splitlines()), installed_stanzas(text, self.arch)
+
+    def _extract(self, source: SourceImage, paths: List[str], name: str,
+                 processors: int, progress_callback: Callable = None):
+        """Extract exact paths (no wildcards) from a source into the rootfs"""
+        extract_file = self.work_dir / f"{name}.extract"
+        extract_file.write_text('\n'.join(paths) + '\n')
+        run_tool(self._unsquashfs(source, '-f', '-no-wildcards', '-processors', str(processors),
+                                  '-d', str(self.rootfs_dir), '-ef', str(extract_file)),
+                 UnsquashfsParser(), progress_callback)
+
+    def merge(self, roots: List[str], progress_callback: Callable = None) -> MergeResult:
+        """
+        Copy roots and their dependencies from the sources' live systems
+
+        Sources are read and extracted in parallel, each unsquashfs with its
+        share of the decompression threads. Copied packages are registered as
+        unpacked (see register_packages).
+
+        Returns:
+            MergeResult; roots not copied are for apt to install
+        """
+        def progress(percent, message):
+            if progress_callback:
+                progress_callback(percent, message)
+
+        sources = []
+        for iso in self.iso_sources:
+            try:
+                source = locate_squashfs(iso)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠ {Path(iso).name}: {e}")
+                continue
+            if source is None:
+                print(f"  ⚠ {Path(iso).name} has no live system to copy packages from")
+                continue
+            sources.append(source)
+        if not sources or not roots:
+            return MergeResult({}, list(roots), 0)
+
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        progress(0, f"Reading {len(sources)} live system(s)...")
+        with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+            read = list(pool.map(in_stage(lambda item: self._read_source(*item)),
+                                 enumerate(sources)))
+        listings = [listing for listing, _ in read]
+        available = [stanzas for _, stanzas in read]
+
+        status = self.rootfs_dir / DPKG_STATUS
+        installed = installed_stanzas(status.read_text(errors='replace'), self.arch) \
+            if status.exists() else {}
+        chosen, left = select_packages(available, roots, installed, self.work_dir / "index")
+        if not chosen:
+            return MergeResult({}, left, 0)
+
+        per_source = {i: sorted(name for name, j in chosen.items() if j == i)
+                      for i in range(len(sources))}
+        processors = max(1, self.processors // sum(1 for names in per_source.values() if names))
+
+        # dpkg info files first: their .list files say which payload to take
+        progress(10, f"Copying {len(chosen)} packages' dpkg records...")
+
+        def info_files(i):
+            stems = {}
+            prefix = DPKG_INFO + '/'
+            for path in listings[i].paths:
+                if path.startswith(prefix):
+                    stems.setdefault(path[len(prefix):].rsplit('.', 1)[0], []).append(path)
+            return [path for name in per_source[i]
+                    for path in stems.get(name, []) + stems.get(f"{name}:{self.arch}", [])]
+
+        def copy_info(i):
+            if per_source[i]:
+                self._extract(sources[i], info_files(i), f"info-{i}", processors)
+
+        with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+            list(pool.map(in_stage(copy_info), range(len(sources))))
+
+        def payload(i):
+            paths = []
+            for name in per_source[i]:
+                # A conffile already on disk was written by a config stage (or
+                # the base system); unsquashfs -f would overwrite it
+                conffile_paths = (canonical_path(path, listings[i].symlinks)
+                                  for path in conffiles(available[i][name]))
+                keep = {path for path in conffile_paths
+                        if os.path.lexists(self.rootfs_dir / path)}
+                for stem in (name, f"{name}:{self.arch}"):
+                    list_file = self.rootfs_dir / DPKG_INFO / f"{stem}.list"
+                    if list_file.exists():
+                        paths += payload_paths(list_file.read_text(errors='replace'),
+                                               listings[i], keep)
+            return sorted(set(paths))
+
+        payloads = {i: payload(i) for i in per_source if per_source[i]}
+        lock = threading.Lock()
+        percents = {i: 0.0 for i in payloads}
+
+        def source_progress(i):
+            def report(percent, message=None):
+                with lock:
+                    percents[i] = percent
+                    overall = sum(percents.values()) / len(percents)
+                progress(15 + 0.8 * overall, f"Extracting files from {len(payloads)} source(s)...")
+            return report
+
+        with ThreadPoolExecutor(max_workers=len(payloads)) as pool:
+            list(pool.map(in_stage(lambda i: self._extract(sources[i], payloads[i], f"payload-{i}",
+                                                           processors, source_progress(i))),
+                          payloads))
+
+        progress(95, "Registering packages...")
+        register_packages(self.rootfs_dir, [available[i][name] for name, i in sorted(chosen.items())])
+        extracted = {name: sources[i].iso for name, i in chosen.items()}
+        progress(100, f"Copied {len(extracted)} packages")
+        return MergeResult(extracted, left, sum(len(paths) for paths in payloads.values()))
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Squashfs Merge - Copy packages from source ISOs into a rootfs'
+    )
+    parser.add_argument('rootfs', help='Root filesystem to extract into')
+    parser.add_argument('packages', nargs='+', help='Packages to copy (with their dependencies)')
+    parser.add_argument('--iso', action='append', required=True, help='Source ISO (repeatable)')
+    parser.add_argument('--arch', default='amd64', help='Architecture of the rootfs')
+    parser.add_argument('--processors', type=int, help='Decompression threads in total')
+    parser.add_argument('--work-dir', help='Scratch directory (default: <rootfs>/../.merge)')
+
+    args = parser.parse_args()
+    if not SquashfsMerge.available():
+        print("✗ unsquashfs not found (install squashfs-tools)")
+        return 1
+    rootfs = Path(args.rootfs)
+    merge = SquashfsMerge(rootfs, args.iso, Path(args.work_dir or rootfs.parent / ".merge"),
+                          args.arch, args.processors)
+    result = merge.merge(args.packages)
+    print(f"✓ Copied {len(result.extracted)} packages ({result.files} files)")
+    if result.left:
+        print(f"  ⚠ Left for apt: {', '.join(result.left)}")
+    if result.extracted:
+        print("[*] Run 'dpkg --configure -a' in the rootfs to finish the install")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
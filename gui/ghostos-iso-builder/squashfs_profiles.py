@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Squashfs Profiles
+Named mksquashfs compression profiles and a size/speed benchmark
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+
+class SquashfsProfile:
+    """A named set of mksquashfs compression options"""
+
+    def __init__(self, name: str, description: str, compression: List[str], block_size: str):
+        """
+        Initialize profile
+
+        Args:
+            name: Profile name used in build configs
+            description: One-line summary shown by --list
+            compression: -comp and compressor specific -X options
+            block_size: mksquashfs -b value
+        """
+        self.name = name
+        self.description = description
+        self.compression = list(compression)
+        self.block_size = block_size
+
+    def __repr__(self):
+        return f"SquashfsProfile({self.name!r})"
+
+
+PROFILES = {
+    profile.name: profile for profile in [
+        SquashfsProfile('max-ratio', "Smallest image, slowest build (xz with x86 BCJ filter)",
+                        ['-comp', 'xz', '-Xbcj', 'x86'], '1M'),
+        SquashfsProfile('balanced', "Near-xz size, much faster to build and boot (zstd 15)",
+                        ['-comp', 'zstd', '-Xcompression-level', '15'], '1M'),
+        SquashfsProfile('fast-build', "Quick CI and test builds (zstd 3)",
+                        ['-comp', 'zstd', '-Xcompression-level', '3'], '1M'),
+        SquashfsProfile('fast-boot', "Fastest decompression for live boot (lz4 high compression)",
+                        ['-comp', 'lz4', '-Xhc'], '256K'),
+    ]
+}
+
+DEFAULT_PROFILE = 'max-ratio'
+
+
+def get_profile(name: str = None) -> SquashfsProfile:
+    """Look up a profile by name"""
+    name = name or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown squashfs profile '{name}' (choose from: {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def default_processors() -> int:
+    """CPUs this process may actually run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_memory() -> str:
+    """
+    mksquashfs -mem value: a quarter of available RAM, between 256M and 8G
+
+    mksquashfs otherwise sizes its caches from total RAM, which overcommits
+    when several builds share a machine.
+    """
+    available_kb = None
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    available_kb = int(line.split()[1])
+                    break
+    except (OSError, ValueError):
+        pass
+    if available_kb is None:
+        return '1G'
+    megabytes = max(256, min(8192, available_kb // 1024 // 4))
+    return f"{megabytes}M"
+
+
+def mksquashfs_command(source, target, profile: SquashfsProfile, processors: int = None,
+                       memory: str = None, excludes: List[str] = (),
+                       exclude_file=None, progress: bool = True,
+                       percentage: bool = False, mkfs_time: int = None) -> List[str]:
+    """
+    Build the mksquashfs command line for a profile
+
+    With mkfs_time (a reproducible build's SOURCE_DATE_EPOCH) the image
+    timestamp is fixed and the output no longer depends on the order in which
+    the parallel compressors finish.
+    """
+    cmd = ['mksquashfs', str(source), str(target), '-noappend']
+    cmd += profile.compression
+    cmd += ['-b', profile.block_size]
+    cmd += ['-processors', str(processors or default_processors())]
+    cmd += ['-mem', memory or default_memory()]
+    if mkfs_time is not None:
+        cmd += ['-reproducible', '-mkfs-time', str(mkfs_time)]
+    if not progress:
+        cmd.append('-no-progress')
+    elif percentage:
+        # One percentage per line instead of a redrawn bar (squashfs-tools 4.5+)
+        cmd.append('-percentage')
+    if exclude_file:
+        cmd += ['-ef', str(exclude_file)]
+    # -e consumes the rest of the command line, so it must come last
+    if excludes:
+        cmd += ['-e'] + list(excludes)
+    return cmd
+
+
+def tree_size(path) -> int:
+    """Apparent size of a directory tree in bytes"""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class SquashfsBenchmark:
+    """Builds one rootfs with several profiles and measures the trade-offs"""
+
+    def __init__(self, rootfs_dir, work_dir=None, processors: int = None, memory: str = None):
+        """
+        Initialize benchmark
+
+        Args:
+            rootfs_dir: Root filesystem to compress
+            work_dir: Scratch space for images and extraction (default: temp dir)
+            processors: mksquashfs/unsquashfs thread count
+            memory: mksquashfs -mem value
+        """
+        self.rootfs_dir = Path(rootfs_dir)
+        self.work_dir = Path(work_dir) if work_dir else None
+        self.processors = processors or default_processors()
+        self.memory = memory or default_memory()
+
+    def run(self, profile_names: List[str] = None) -> List[Dict]:
+        """
+        Benchmark the given profiles (default: all)
+
+        Returns:
+            One dict per profile with build_seconds, image_bytes, ratio and
+            decompress_mb_s (full extraction throughput)
+        """
+        uncompressed = tree_size(self.rootfs_dir)
+        results = []
+        with tempfile.TemporaryDirectory(prefix="squashfs-bench-", dir=self.work_dir) as scratch:
+            scratch = Path(scratch)
+            for name in profile_names or list(PROFILES):
+                profile = get_profile(name)
+                image = scratch / f"{name}.squashfs"
+                print(f"[*] Benchmarking {name}...")
+
+                start = time.monotonic()
+                subprocess.run(mksquashfs_command(self.rootfs_dir, image, profile,
+                                                  self.processors, self.memory, progress=False),
+                               check=True, stdout=subprocess.DEVNULL)
+                build_seconds = time.monotonic() - start
+
+                extract_dir = scratch / "extract"
+                start = time.monotonic()
+                subprocess.run(['unsquashfs', '-no-progress', '-processors', str(self.processors),
+                                '-d', str(extract_dir), str(image)],
+                               check=True, stdout=subprocess.DEVNULL)
+                extract_seconds = time.monotonic() - start
+                shutil.rmtree(extract_dir)
+
+                image_bytes = image.stat().st_size
+                image.unlink()
+                results.append({
+                    'profile': name,
+                    'build_seconds': round(build_seconds, 2),
+                    'image_bytes': image_bytes,
+                    'ratio': round(image_bytes / uncompressed, 4) if uncompressed else None,
+                    'decompress_mb_s': round(uncompressed / 1024 ** 2 / max(extract_seconds, 1e-6), 1),
+                })
+        return results
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Squashfs Profiles - List profiles or benchmark them on a rootfs'
+    )
+    parser.add_argument('--list', action='store_true', help='List compression profiles')
+    parser.add_argument('--benchmark', metavar='ROOTFS', help='Benchmark profiles on a rootfs directory')
+    parser.add_argument('--profiles', help='Comma-separated profiles to benchmark (default: all)')
+    parser.add_argument('--work-dir', help='Scratch directory (needs room for one image and one extraction)')
+    parser.add_argument('--processors', type=int, help='Thread count (default: available CPUs)')
+    parser.add_argument('--mem', help='mksquashfs memory limit, e.g. 2G')
+    parser.add_argument('--json', action='store_true', help='Print benchmark results as JSON')
+
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for tool in ('mksquashfs', 'unsquashfs'):
+            if not shutil.which(tool):
+                print(f"✗ {tool} not found (install squashfs-tools)")
+                return 1
+        profiles = args.profiles.split(',') if args.profiles else None
+        benchmark = SquashfsBenchmark(args.benchmark, args.work_dir, args.processors, args.mem)
+        results = benchmark.run(profiles)
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return 0
+        print(f"\n{'Profile':<12} {'Build (s)':>10} {'Size (MB)':>10} {'Ratio':>7} {'Unpack MB/s':>12}")
+        for r in results:
+            print(f"{r['profile']:<12} {r['build_seconds']:>10.1f} {r['image_bytes'] / 1024 ** 2:>10.1f} "
+                  f"{r['ratio'] or 0:>7.3f} {r['decompress_mb_s']:>12.1f}")
+        return 0
+
+    for profile in PROFILES.values():
+        marker = " (default)" if profile.name == DEFAULT_PROFILE else ""
+        print(f"{profile.name:<12} {profile.description}{marker}")
+        print(f"{'':<12} {' '.join(profile.compression)} -b {profile.block_size}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
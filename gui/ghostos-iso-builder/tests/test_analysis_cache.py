@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the ISO analysis cache
+"""
+
+import unittest
+import tempfile
+import shutil
+import gzip
+import sys
+import os
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import analysis_cache
+from analysis_cache import AnalysisCache, analyze_cached, image_fingerprint
+from iso_analysis import analyze_iso
+from test_iso9660 import build_iso
+
+PACKAGES = b"""Package: git
+Version: 1:2.39.2-1.1
+Installed-Size: 40000
+"""
+
+
+class TestAnalysisCache(unittest.TestCase):
+    """Test cases for AnalysisCache"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.iso = self.dir / "debian-live-12-amd64.iso"
+        build_iso(self.iso, {
+            '.disk/info': b'Debian GNU/Linux 12',
+            'live/filesystem.packages': b'bash\t5.2.15-2\n',
+            'dists/bookworm/main/binary-amd64/Packages.gz': gzip.compress(PACKAGES),
+            'live/filesystem.squashfs': os.urandom(300 * 1024),
+        })
+        self.cache = AnalysisCache(self.dir / "cache.db")
+        self.info = analyze_iso(self.iso, index_cache=self.dir / "index")
+
+    def tearDown(self):
+        self.info['package_index'].close()
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """Test a stored analysis comes back with its package index"""
+        self.assertIsNone(self.cache.get(self.iso))
+        self.cache.put(self.iso, self.info)
+        cached = self.cache.get(self.iso)
+        self.assertEqual(cached['components'], self.info['components'])
+        self.assertEqual(cached['label'], self.info['label'])
+        self.assertEqual(cached['base_packages'], self.info['base_packages'])
+        self.assertEqual(cached['package_index'].get('git').installed_size, 40000)
+        cached['package_index'].close()
+
+    def test_changed_image_is_detected(self):
+        """Test an image edited in place, even with its mtime kept, misses"""
+        self.cache.put(self.iso, self.info)
+        st = self.iso.stat()
+        with open(self.iso, 'r+b') as f:
+            f.seek(st.st_size // 2)
+            f.write(os.urandom(64 * 1024))
+        os.utime(self.iso, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertIsNone(self.cache.get(self.iso))
+
+    def test_touched_image_misses(self):
+        """Test the same path with a new mtime is analyzed again"""
+        self.cache.put(self.iso, self.info)
+        st = self.iso.stat()
+        os.utime(self.iso, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertIsNone(self.cache.get(self.iso))
+
+    def test_copied_image_hits(self):
+        """Test a copy is recognized by its fingerprint"""
+        self.cache.put(self.iso, self.info)
+        copy = self.dir / "copy.iso"
+        shutil.copy(self.iso, copy)
+        self.assertEqual(image_fingerprint(copy), image_fingerprint(self.iso))
+        cached = self.cache.get(copy)
+        self.assertEqual(cached['name'], 'copy.iso')
+        cached['package_index'].close()
+
+    def test_analyze_cached(self):
+        """Test the second analysis is answered without reading the image"""
+        with mock.patch.object(analysis_cache, 'analyze_iso', return_value=self.info) as analyze:
+            analyze_cached(self.iso, cache=self.cache)
+            analyze_cached(self.iso, cache=self.cache)['package_index'].close()
+        self.assertEqual(analyze.call_count, 1)
+
+    def test_prune(self):
+        """Test entries of deleted images are dropped"""
+        self.cache.put(self.iso, self.info)
+        copy = self.dir / "copy.iso"
+        shutil.copy(self.iso, copy)
+        self.cache.put(copy, self.info)
+        copy.unlink()
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertEqual([entry['path'] for entry in self.cache.entries()], [str(self.iso.resolve())])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel ISO analysis service
+"""
+
+import unittest
+import tempfile
+import time
+import signal
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from analysis_service import AnalysisService, analyze_many
+from test_iso9660 import build_iso
+
+
+class TestAnalysisService(unittest.TestCase):
+    """Test cases for AnalysisService"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.isos = []
+        for i in range(3):
+            iso = self.dir / f"source-{i}.iso"
+            build_iso(iso, {
+                '.disk/info': f'Source {i}'.encode(),
+                'live/filesystem.packages': b'git\t1:2.39.2-1.1\n' * (i + 1),
+            }, volume_id=f'SOURCE_{i}')
+            self.isos.append(iso)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_analyze_many(self):
+        """Test every ISO is analyzed and partial results come first"""
+        events = []
+        results = analyze_many(self.isos, 2, lambda *event: events.append(event), use_cache=False)
+        self.assertEqual(set(results), {str(iso) for iso in self.isos})
+        for i, iso in enumerate(self.isos):
+            info = results[str(iso)]
+            self.assertEqual(info['label'], f'SOURCE_{i}')
+            self.assertEqual(info['description'], f'Source {i}')
+            kinds = [kind for _, path, kind, _ in events if path == str(iso)]
+            self.assertLess(kinds.index('volume'), kinds.index('packages'))
+            self.assertEqual(kinds[-1], 'done')
+
+    def test_errors_are_reported(self):
+        """Test a file that is not an ISO fails on its own"""
+        bad = self.dir / "notes.iso"
+        bad.write_text("not an image")
+        results = analyze_many([bad, self.isos[0]], use_cache=False)
+        self.assertIsInstance(results[str(bad)], RuntimeError)
+        self.assertEqual(results[str(self.isos[0])]['label'], 'SOURCE_0')
+
+    def test_cancel(self):
+        """Test a cancelled ISO reports nothing and frees its slot"""
+        service = AnalysisService(max_workers=1, use_cache=False)
+        try:
+            service.submit(self.isos[0])
+            second = service.submit(self.isos[1])
+            self.assertTrue(service.cancel(str(self.isos[0])))
+            self.assertFalse(service.cancel(str(self.isos[0])))
+            finished = []
+            deadline = time.time() + 60
+            while service.busy and time.time() < deadline:
+                finished += [event for event in service.poll(timeout=0.5) if event[2] == 'done']
+            self.assertEqual([event[0] for event in finished], [second])
+        finally:
+            service.shutdown()
+
+    def test_killed_worker_is_reported(self):
+        """Test a worker killed from outside fails its job alone"""
+        service = AnalysisService(max_workers=2, use_cache=False)
+        try:
+            killed = service.submit(self.isos[0])
+            other = service.submit(self.isos[1])
+            os.kill(service._running[killed].pid, signal.SIGKILL)
+            finished = {}
+            deadline = time.time() + 60
+            while service.busy and time.time() < deadline:
+                for job_id, _, kind, payload in service.poll(timeout=0.5):
+                    if kind in ('done', 'error'):
+                        finished[job_id] = kind
+            self.assertEqual(finished, {killed: 'error', other: 'done'})
+        finally:
+            service.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared APT package cache and its locking protocol
+"""
+
+import unittest
+import tempfile
+import threading
+import time
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from apt_cache import AptArchiveCache
+
+
+class TestAptArchiveCache(unittest.TestCase):
+    """Test cases for AptArchiveCache"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmp.name) / "cache"
+        self.cache = AptArchiveCache(str(self.cache_dir))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _deb(self, name: str, size: int = 10, age_days: float = 0) -> Path:
+        deb = self.cache.archives_dir / name
+        deb.write_bytes(b'x' * size)
+        used = time.time() - age_days * 86400
+        os.utime(deb, (used, used))
+        return deb
+
+    def _in_thread(self, func) -> threading.Thread:
+        thread = threading.Thread(target=func, daemon=True)
+        thread.start()
+        return thread
+
+    def _download(self, order):
+        with AptArchiveCache(str(self.cache_dir)).downloading():
+            order.append('second')
+
+    def test_builds_share_the_cache(self):
+        """Test concurrent builds hold the cache open at the same time"""
+        other = AptArchiveCache(str(self.cache_dir))
+        both = threading.Barrier(2, timeout=5)
+
+        def use(cache):
+            with cache.using():
+                both.wait()
+
+        threads = [self._in_thread(lambda: use(self.cache)), self._in_thread(lambda: use(other))]
+        for thread in threads:
+            thread.join(5)
+        # A shared lock that excluded the other build would break the barrier
+        self.assertFalse(both.broken)
+
+    def test_downloads_are_serialized(self):
+        """Test a second download waits for the first to finish"""
+        order = []
+        with self.cache.downloading():
+            waiting = self._in_thread(lambda: self._download(order))
+            time.sleep(0.2)
+            order.append('first done')
+        waiting.join(5)
+        self.assertEqual(order, ['first done', 'second'])
+
+    def test_prune_skips_while_builds_use_the_cache(self):
+        """Test a non-blocking prune leaves the cache alone while it is in use"""
+        deb = self._deb("old.deb", age_days=90)
+        with self.cache.using():
+            stats = AptArchiveCache(str(self.cache_dir)).prune(blocking=False)
+        self.assertEqual(stats, {'removed': 0, 'freed': 0})
+        self.assertTrue(deb.exists())
+
+    def test_prune_waits_for_the_exclusive_lock(self):
+        """Test a blocking prune deletes nothing until every build is done"""
+        deb = self._deb("old.deb", age_days=90)
+        results = []
+        with self.cache.using():
+            pruning = self._in_thread(
+                lambda: results.append(AptArchiveCache(str(self.cache_dir)).prune()))
+            time.sleep(0.2)
+            self.assertTrue(pruning.is_alive())
+            self.assertTrue(deb.exists())
+        pruning.join(5)
+        self.assertEqual(results, [{'removed': 1, 'freed': 10}])
+        self.assertFalse(deb.exists())
+
+    def test_prune_by_age_then_size(self):
+        """Test old packages go first, then the least recently used down to the size limit"""
+        self._deb("stale.deb", age_days=40)
+        self._deb("older.deb", age_days=5)
+        self._deb("recent.deb", age_days=1)
+        self._deb("new.deb")
+        stats = self.cache.prune(max_age_days=30, max_bytes=20)
+        self.assertEqual(stats, {'removed': 2, 'freed': 20})
+        self.assertEqual(sorted(e['path'].name for e in self.cache.entries()),
+                         ['new.deb', 'recent.deb'])
+
+    def test_lists_round_trip_without_the_apt_lock(self):
+        """Test package lists are seeded into a chroot and saved back, minus apt's lock"""
+        rootfs = Path(self.tmp.name) / "rootfs"
+        (self.cache.lists_dir / "deb.debian.org_Packages").write_text("old")
+        self.cache.seed_lists(rootfs)
+        lists = rootfs / AptArchiveCache.CHROOT_LISTS
+        self.assertEqual((lists / "deb.debian.org_Packages").read_text(), "old")
+
+        (lists / "deb.debian.org_Packages").write_text("new")
+        (lists / "lock").touch()
+        self.cache.save_lists(rootfs)
+        self.assertEqual((self.cache.lists_dir / "deb.debian.org_Packages").read_text(), "new")
+        self.assertFalse((self.cache.lists_dir / "lock").exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
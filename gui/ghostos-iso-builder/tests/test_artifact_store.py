@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the ISO artifact store
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from artifact_store import ArtifactStore, config_id
+
+
+class TestArtifactStore(unittest.TestCase):
+    """Test cases for ArtifactStore"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = Path(self.tmp.name)
+        self.store = ArtifactStore(self.output / ".artifacts", keep_per_config=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _build(self, name: str, key: str, config: dict) -> Path:
+        image = self.output / name
+        image.write_bytes(key.encode() * 1024)
+        self.store.publish(key, image, {'sha256': 'feed'}, config)
+        return image
+
+    def test_identical_build_is_a_hardlink(self):
+        """Test a hit places the stored ISO under the new name without copying"""
+        first = self._build("first.iso", "k1", {'version': '1'})
+        second = self.store.checkout("k1", self.output / "second.iso")
+        self.assertTrue(os.path.samefile(first, second))
+        self.assertEqual((self.output / "second.iso.sha256").read_text(), "feed  second.iso\n")
+        self.assertIsNone(self.store.checkout("missing", self.output / "x.iso"))
+
+    def test_keep_last_per_config(self):
+        """Test only the newest builds of a config survive, with their output ISOs"""
+        oldest = self._build("a.iso", "k1", {'version': '1'})
+        self._build("b.iso", "k2", {'version': '1'})
+        self._build("c.iso", "k3", {'version': '1'})
+        other = self._build("d.iso", "k4", {'version': '2'})
+        self.assertEqual(sorted(e['key'] for e in self.store.entries()), ['k2', 'k3', 'k4'])
+        self.assertFalse(oldest.exists())
+        self.assertTrue(other.exists())
+
+    def test_size_limit_evicts_least_recently_used(self):
+        """Test the total size limit drops the least recently used artifacts"""
+        self._build("a.iso", "k1", {'version': '1'})
+        self._build("b.iso", "k2", {'version': '2'})
+        self.store.checkout("k1", self.output / "a-again.iso")
+        self.assertEqual(self.store.prune(max_bytes=2048), ['k2'])
+
+    def test_operational_settings_do_not_split_configs(self):
+        """Test workspace and telemetry settings do not count as a different config"""
+        self.assertEqual(config_id({'version': '1'}),
+                         config_id({'version': '1', 'workspace': {'tmpfs': True}}))
+
+    def test_key_covers_the_builder(self):
+        """Test a builder update does not reuse ISOs built by the previous version"""
+        key = ArtifactStore.make_key({'iso': 'f'})
+        with mock.patch('artifact_store.builder_source_hash', return_value='updated'):
+            self.assertNotEqual(ArtifactStore.make_key({'iso': 'f'}), key)
+
+    def test_hit_skips_workspace_and_writes_delta(self):
+        """Test a stored build is found before any workspace exists and still gets its delta"""
+        from iso_builder_backend import ISOBuilder
+        config = {'version': '1',
+                  'artifact_store': {'enabled': True, 'dir': str(self.output / ".artifacts")},
+                  'telemetry': {'enabled': False}, 'delta': {'enabled': True}}
+        builder = ISOBuilder(config, str(self.output))
+        key = ArtifactStore.make_key(builder._artifact_fingerprints())
+        self._build("stored.iso", key, config)
+        with mock.patch.object(ISOBuilder, 'create_work_dirs') as create_work_dirs, \
+                mock.patch.object(ISOBuilder, 'check_dependencies'), \
+                mock.patch.object(ISOBuilder, 'write_delta') as write_delta:
+            output = builder.build()
+        create_work_dirs.assert_not_called()
+        write_delta.assert_called_once()
+        self.assertTrue(os.path.samefile(output, self.output / "stored.iso"))
+
+    def test_fresh_build_ignores_the_store(self):
+        """Test the store is opt-in and a fresh build does not reuse a stored ISO"""
+        from iso_builder_backend import ISOBuilder
+        self.assertIsNone(ISOBuilder({'version': '1'}, str(self.output))._artifact_store())
+        config = {'version': '1', 'workspace': {'fresh': True},
+                  'artifact_store': {'enabled': True, 'dir': str(self.output / ".artifacts")},
+                  'telemetry': {'enabled': False}}
+        builder = ISOBuilder(config, str(self.output))
+        self._build("stored.iso", ArtifactStore.make_key(builder._artifact_fingerprints()), config)
+        with mock.patch.object(ISOBuilder, 'check_dependencies'), \
+                mock.patch.object(ISOBuilder, 'create_work_dirs',
+                                  side_effect=RuntimeError("building")), \
+                mock.patch.object(ISOBuilder, 'cleanup'):
+            with self.assertRaisesRegex(RuntimeError, "building"):
+                builder.build()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the build queue
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from build_queue import BuildQueue, BuildQueueServer
+
+
+class TestBuildQueue(unittest.TestCase):
+    """Test cases for BuildQueue"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = BuildQueue(Path(self.tmp.name) / "queue.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_claim_order_and_priority(self):
+        """Test higher priority jobs are claimed first, then oldest first"""
+        first = self.queue.submit({'version': '1'})
+        urgent = self.queue.submit({'version': '2'}, priority=5)
+        self.assertEqual(self.queue.claim(0)['id'], urgent)
+        job = self.queue.claim(1)
+        self.assertEqual(job['id'], first)
+        self.assertEqual(job['config'], {'version': '1'})
+        self.assertIsNone(self.queue.claim(2))
+
+    def test_shared_persistent_workspace_is_serialized(self):
+        """Test two jobs resuming the same workspace never run together"""
+        workspace = {'workspace': {'persistent': True, 'dir': str(Path(self.tmp.name) / "ws")}}
+        first = self.queue.submit(workspace)
+        self.queue.submit(workspace)
+        other = self.queue.submit({})
+        self.assertEqual(self.queue.claim(0)['id'], first)
+        self.assertEqual(self.queue.claim(1)['id'], other)
+        self.assertIsNone(self.queue.claim(2))
+
+    def test_cancel_and_finish(self):
+        """Test a cancelled running job is not overwritten by its outcome"""
+        job_id = self.queue.submit({})
+        self.queue.claim(0)
+        self.assertTrue(self.queue.cancel(job_id))
+        self.assertFalse(self.queue.finish(job_id, 'done', output='/tmp/x.iso'))
+        self.assertEqual(self.queue.get(job_id)['status'], 'cancelled')
+
+    def test_recover_requeues_interrupted_jobs(self):
+        """Test jobs running when the server died are queued again"""
+        job_id = self.queue.submit({})
+        self.queue.claim(0)
+        self.assertEqual(self.queue.recover(), 1)
+        self.assertEqual(self.queue.claim(0)['id'], job_id)
+
+    def test_server_requests(self):
+        """Test the socket API commands against the queue"""
+        server = BuildQueueServer(self.queue, workers=1)
+        job_id = server.handle({'cmd': 'submit', 'config': {}, 'name': 'demo'})['id']
+        self.assertEqual(server.handle({'cmd': 'status', 'id': job_id})['job']['name'], 'demo')
+        self.assertTrue(server.handle({'cmd': 'cancel', 'id': job_id})['cancelled'])
+        with self.assertRaises(ValueError):
+            server.handle({'cmd': 'bogus'})
+
+
+if __name__ == '__main__':
+    unittest.main()
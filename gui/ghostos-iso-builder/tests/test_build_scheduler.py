@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Tests for the ISO build stage scheduler
+"""
+
+import unittest
+import tempfile
+import threading
+import sys
+import os
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from build_scheduler import BuildStage, StageScheduler
+from build_checkpoints import StageCheckpoints
+
+
+class TestStageScheduler(unittest.TestCase):
+    """Test cases for StageScheduler"""
+
+    def test_dependencies_follow_resources(self):
+        """Test stages run after the producers of their inputs"""
+        log = []
+        stages = [
+            BuildStage('iso', lambda p: log.append('iso'), inputs=['live', 'boot']),
+            BuildStage('rootfs', lambda p: log.append('rootfs'), outputs=['root']),
+            BuildStage('squash', lambda p: log.append('squash'), inputs=['root'], outputs=['live']),
+            BuildStage('boot', lambda p: log.append('boot'), outputs=['boot']),
+        ]
+        StageScheduler(stages, max_workers=2).run()
+
+        self.assertEqual(len(log), 4)
+        self.assertLess(log.index('rootfs'), log.index('squash'))
+        self.assertEqual(log[-1], 'iso')
+
+    def test_independent_stages_overlap(self):
+        """Test independent stages run concurrently"""
+        barrier = threading.Barrier(2, timeout=5)
+        stages = [
+            BuildStage('a', lambda p: barrier.wait()),
+            BuildStage('b', lambda p: barrier.wait()),
+        ]
+        # Deadlocks (and times out) unless both stages run at once
+        StageScheduler(stages, max_workers=2).run()
+
+    def test_failure_stops_dependents(self):
+        """Test a failing stage raises and blocks its dependents"""
+        ran = []
+
+        def fail(progress):
+            raise RuntimeError("boom")
+
+        stages = [
+            BuildStage('first', fail, outputs=['x']),
+            BuildStage('second', lambda p: ran.append('second'), inputs=['x']),
+        ]
+        with self.assertRaises(RuntimeError):
+            StageScheduler(stages).run()
+        self.assertEqual(ran, [])
+
+    def test_invalid_graphs(self):
+        """Test unknown inputs, duplicate producers and cycles are rejected"""
+        with self.assertRaises(ValueError):
+            StageScheduler([BuildStage('a', None, inputs=['missing'])])
+        with self.assertRaises(ValueError):
+            StageScheduler([BuildStage('a', None, outputs=['x']),
+                            BuildStage('b', None, outputs=['x'])])
+        with self.assertRaises(ValueError):
+            StageScheduler([BuildStage('a', None, inputs=['y'], outputs=['x']),
+                            BuildStage('b', None, inputs=['x'], outputs=['y'])])
+
+    def test_progress_is_weighted_and_monotonic(self):
+        """Test overall progress derives from stage weights"""
+        reports = []
+        stages = [
+            BuildStage('big', lambda p: p(50, "half"), outputs=['x'], weight=3),
+            BuildStage('small', lambda p: None, inputs=['x'], weight=1),
+        ]
+        scheduler = StageScheduler(stages, max_workers=1,
+                                   progress_callback=lambda pct, msg: reports.append(pct))
+        scheduler.run()
+
+        self.assertIn(37, reports)  # 1.5 of 4 weight units
+        self.assertEqual(reports, sorted(reports))
+        self.assertEqual(scheduler.overall_percent(), 100)
+
+
+class TestStageCheckpoints(unittest.TestCase):
+    """Test cases for resuming builds from stage checkpoints"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.ran = []
+        self.undone = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _build(self, theme='dark'):
+        def stage(name, result=None):
+            def func(progress):
+                self.ran.append(name)
+                return result
+            return func
+
+        stages = [
+            BuildStage('base', stage('base'), outputs=['base']),
+            BuildStage('merge', stage('merge', ['vim']), inputs=['base'], outputs=['merged']),
+            BuildStage('theme', stage('theme', [theme]), inputs=['base'], outputs=['theme'],
+                       fingerprint={'mode': theme}, undo=self.undone.append),
+            BuildStage('squash', stage('squash'), inputs=['merged', 'theme']),
+        ]
+        scheduler = StageScheduler(stages, max_workers=2)
+        checkpoints = StageCheckpoints(self.tmp.name)
+        checkpoints.compute(scheduler.stages, scheduler.dependencies, scheduler.order)
+        scheduler.run(checkpoints)
+        return scheduler
+
+    def test_unchanged_build_is_skipped(self):
+        """Test a rerun with identical inputs reuses every stage and its result"""
+        self._build()
+        self.ran.clear()
+        scheduler = self._build()
+        self.assertEqual(self.ran, [])
+        self.assertEqual(scheduler.results['merge'], ['vim'])
+
+    def test_changed_stage_reruns_downstream_only(self):
+        """Test a changed fingerprint reruns that stage and its dependents"""
+        self._build()
+        self.ran.clear()
+        self._build(theme='gaming')
+        self.assertEqual(sorted(self.ran), ['squash', 'theme'])
+
+    def test_changed_stage_undoes_its_previous_run(self):
+        """Test a stage that ran before is handed its old result to undo first"""
+        self._build()
+        self.assertEqual(self.undone, [])
+        self._build(theme='gaming')
+        self.assertEqual(self.undone, [['dark']])
+        # An interrupted run still knows what the last completed one wrote
+        scheduler = self._build(theme='light')
+        checkpoints = StageCheckpoints(self.tmp.name)
+        checkpoints.invalidate(scheduler.stages['theme'])
+        self._build(theme='dark')
+        self.assertEqual(self.undone, [['dark'], ['gaming'], ['light']])
+
+    def test_interrupted_stage_reruns(self):
+        """Test a stage without a completion marker runs again"""
+        self._build()
+        os.remove(os.path.join(self.tmp.name, 'merge.json'))
+        self.ran.clear()
+        self._build()
+        self.assertEqual(sorted(self.ran), ['merge', 'squash'])
+
+    def test_rerun_stages_are_known_to_have_run(self):
+        """Test a changed or crashed stage is told apart from one that never ran"""
+        scheduler = self._build()
+        checkpoints = StageCheckpoints(self.tmp.name)
+        checkpoints.compute(scheduler.stages, scheduler.dependencies, scheduler.order)
+        self.assertFalse(checkpoints.ran_before(scheduler.stages['theme']))
+        checkpoints.invalidate(scheduler.stages['theme'])
+        self.assertTrue(checkpoints.ran_before(scheduler.stages['theme']))
+        self.assertFalse(checkpoints.is_current(scheduler.stages['theme']))
+
+    def test_builder_update_reruns_everything(self):
+        """Test fingerprints cover the builder's own code"""
+        self._build()
+        self.ran.clear()
+        with mock.patch('build_checkpoints.builder_source_hash', return_value='updated'):
+            self._build()
+        self.assertEqual(sorted(self.ran), ['base', 'merge', 'squash', 'theme'])
+
+
+if __name__ == '__main__':
+    unittest.main()
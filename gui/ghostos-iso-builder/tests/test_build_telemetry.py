@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for per-stage build telemetry
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from concurrent.futures import ThreadPoolExecutor
+
+from build_telemetry import BuildTelemetry, in_stage, run_command, load_events, stage_summary
+
+
+class TestBuildTelemetry(unittest.TestCase):
+    """Test cases for BuildTelemetry"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "rootfs").mkdir()
+        self.telemetry = BuildTelemetry(self.root / "build.telemetry.jsonl",
+                                        watch_dirs={'rootfs': self.root / "rootfs"})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_stage_records_commands_and_writes(self):
+        """Test a stage records its subprocesses and disk growth"""
+        def stage(progress):
+            (self.root / "rootfs" / "data").write_bytes(b'x' * 65536)
+            run_command(['true'])
+            run_command(['false'])
+
+        self.telemetry.wrap('packages', stage)(None)
+        record = stage_summary(load_events(self.telemetry.log_path))['packages']
+
+        self.assertEqual(record['status'], 'ok')
+        self.assertEqual([c['returncode'] for c in record['commands']], [0, 1])
+        self.assertGreaterEqual(record['bytes_written']['rootfs'], 65536)
+
+    def test_pool_threads_record_in_stage(self):
+        """Test commands a stage runs on a thread pool count toward it"""
+        def stage(progress):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                list(pool.map(in_stage(lambda cmd: run_command([cmd])), ['true', 'false']))
+
+        self.telemetry.wrap('merge', stage)(None)
+        record = stage_summary(load_events(self.telemetry.log_path))['merge']
+        self.assertEqual(sorted(c['cmd'][0] for c in record['commands']), ['false', 'true'])
+
+    def test_failed_stage_is_logged(self):
+        """Test a raising stage still writes its end event"""
+        def stage(progress):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            self.telemetry.wrap('bootstrap', stage)(None)
+        self.telemetry.build_end('failed')
+        summary = stage_summary(load_events(self.telemetry.log_path))
+        self.assertEqual(summary['bootstrap']['status'], 'failed')
+        self.assertEqual(summary['(total)']['status'], 'failed')
+        # The lifetime peak RSS is reported once, for the build, not per stage
+        self.assertIn('cumulative_child_peak_rss_kb', summary['(total)'])
+        self.assertNotIn('child_maxrss_kb', summary['bootstrap'])
+
+    def test_commands_outside_stages_are_not_recorded(self):
+        """Test run_command is a plain subprocess.run outside a stage"""
+        self.assertEqual(run_command(['true']).returncode, 0)
+        self.assertFalse(self.telemetry.log_path.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
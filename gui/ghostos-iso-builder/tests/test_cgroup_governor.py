@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the cgroup v2 resource governor
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cgroup_governor import CgroupGovernor, parse_size
+
+
+class TestCgroupGovernor(unittest.TestCase):
+    """Test cases for CgroupGovernor (against a plain directory standing in for the group)"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.group = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_size(self):
+        """Test human sizes become the byte counts cgroup files take"""
+        self.assertEqual(parse_size('8G'), str(8 * 1024 ** 3))
+        self.assertEqual(parse_size('512mb'), str(512 * 1024 ** 2))
+        self.assertEqual(parse_size(4096), '4096')
+        self.assertEqual(parse_size('max'), 'max')
+
+    def test_apply_writes_limits(self):
+        """Test configured limits land in the matching interface files"""
+        governor = CgroupGovernor(self.group, {
+            'cpu_max': 2.5, 'memory_max': '4G', 'swap_max': 0,
+            'io_max': {'wbps': '100M'}, 'io_device': '8:0',
+        })
+        governor.apply()
+        self.assertEqual((self.group / 'cpu.weight').read_text(), '50')
+        self.assertEqual((self.group / 'cpu.max').read_text(), '250000 100000')
+        self.assertEqual((self.group / 'memory.max').read_text(), str(4 * 1024 ** 3))
+        self.assertEqual((self.group / 'memory.swap.max').read_text(), '0')
+        self.assertEqual((self.group / 'io.max').read_text(), f"8:0 wbps={100 * 1024 ** 2}")
+        self.assertFalse((self.group / 'memory.high').exists())
+
+    def test_events(self):
+        """Test throttling and OOM counters are read from the group"""
+        (self.group / 'memory.events').write_text("low 0\nhigh 3\nmax 1\noom 1\noom_kill 2\n")
+        (self.group / 'cpu.stat').write_text("usage_usec 900\nnr_throttled 7\nthrottled_usec 1500000\n")
+        events = CgroupGovernor(self.group).events()
+        self.assertEqual(events['oom_kill'], 2)
+        self.assertEqual(events['memory_high'], 3)
+        self.assertEqual(events['cpu_throttled'], 7)
+        self.assertEqual(events['cpu_throttled_usec'], 1500000)
+
+    def test_supervisor_leaf_is_not_nested(self):
+        """Test a build started from the supervisor leaf creates its group beside it"""
+        parent = self.group / "user.slice"
+        leaf = parent / CgroupGovernor.SUPERVISOR_GROUP
+        leaf.mkdir(parents=True)
+        (parent / 'cgroup.controllers').write_text("cpu io memory pids\n")
+        (parent / 'cgroup.subtree_control').write_text("cpu io memory\n")
+        with mock.patch('os.geteuid', return_value=0), \
+                mock.patch('cgroup_governor.cgroup2_mount', return_value=self.group), \
+                mock.patch('cgroup_governor.current_cgroup',
+                           return_value=f"/user.slice/{CgroupGovernor.SUPERVISOR_GROUP}"):
+            governor = CgroupGovernor.for_build({}, 'next', self.group)
+        self.assertEqual(governor.path,
+                         parent / f"{CgroupGovernor.GROUP_PREFIX}{os.getpid()}-next")
+        self.assertEqual(list(leaf.iterdir()), [])
+        governor.remove()
+
+    def test_sweep_spares_groups_of_live_supervisors(self):
+        """Test only groups whose creator is gone or done with them are swept"""
+        prefix = CgroupGovernor.GROUP_PREFIX
+        mine = CgroupGovernor(self.group / f"{prefix}{os.getpid()}-running")
+        mine.path.mkdir()
+        CgroupGovernor._active.add(mine.path)
+        self.addCleanup(CgroupGovernor._active.discard, mine.path)
+        for name in ('1-other', '99999999-dead', f"{os.getpid()}-done", 'legacy'):
+            (self.group / f"{prefix}{name}").mkdir()
+
+        with mock.patch.object(CgroupGovernor, '_alive', side_effect=lambda pid: pid == 1):
+            CgroupGovernor._sweep(self.group)
+        self.assertEqual(sorted(p.name[len(prefix):] for p in self.group.iterdir()),
+                         ['1-other', f"{os.getpid()}-running", 'legacy'])
+
+    def test_supervisor_reports_oom_kills(self):
+        """Test the OOM kill count is logged after the build child exits"""
+        (self.group / 'memory.events').write_text("oom 1\noom_kill 3\n")
+        with mock.patch('builtins.print') as output:
+            CgroupGovernor(self.group).report_exit()
+        self.assertIn('3 build process(es)', output.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Tests for persistent chroot sessions and their fast-install mode
+"""
+
+import unittest
+import subprocess
+import tempfile
+import sys
+import os
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chroot_session import ChrootSession
+
+
+class TestChrootSession(unittest.TestCase):
+    """Test cases for ChrootSession (mounts and chroot commands are mocked)"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rootfs = Path(self.tmp.name)
+        self.initramfs = self.rootfs / "usr" / "sbin" / "update-initramfs"
+        self.initramfs.parent.mkdir(parents=True)
+        self.initramfs.write_text("#!/bin/sh\n# real tool\n")
+        self.commands = []
+        self.failing = set()
+        patcher = mock.patch('chroot_session.run_command', side_effect=self._run_command)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _run_command(self, cmd, check=False, env=None):
+        """Record a command; dpkg-divert renames the diverted file like the real one"""
+        self.commands.append(cmd)
+        if cmd[0] == 'chroot' and cmd[2:4] == ['dpkg-divert', '--local']:
+            diverted = self.initramfs.with_name('update-initramfs.distrib')
+            if '--add' in cmd:
+                if os.path.lexists(self.initramfs):
+                    self.initramfs.rename(diverted)
+            elif diverted.exists():
+                diverted.rename(self.initramfs)
+        returncode = 1 if cmd[0] in self.failing else 0
+        return subprocess.CompletedProcess(cmd, returncode)
+
+    def _chroot_commands(self):
+        return [cmd[2:] for cmd in self.commands if cmd[0] == 'chroot']
+
+    def test_mounts_once_and_unmounts_innermost_first(self):
+        """Test the API filesystems and binds are mounted for the whole session"""
+        with ChrootSession(self.rootfs, binds=[('/var/cache/apt', '/var/cache/apt/archives')]) as chroot:
+            chroot.run(['true'])
+            chroot.run(['true'])
+        mounts = [cmd[-1] for cmd in self.commands if cmd[0] == 'mount']
+        unmounts = [cmd[-1] for cmd in self.commands if cmd[0] == 'umount']
+        self.assertEqual(mounts, [str(self.rootfs / m) for m in
+                                  ['dev', 'dev/pts', 'proc', 'sys', 'var/cache/apt/archives']])
+        self.assertEqual(unmounts, list(reversed(mounts)))
+        self.assertEqual(self._chroot_commands(), [['true'], ['true']])
+
+    def test_busy_mount_is_detached(self):
+        """Test a mount that fails to unmount is lazily detached"""
+        self.failing.add('umount')
+        with ChrootSession(self.rootfs):
+            pass
+        self.assertIn(['umount', '--lazy', str(self.rootfs / 'sys')], self.commands)
+
+    def test_fast_install_blocks_services_and_fsync(self):
+        """Test policy-rc.d and force-unsafe-io exist only while the session is open"""
+        policy = self.rootfs / ChrootSession.POLICY_RC_D
+        unsafe_io = self.rootfs / ChrootSession.DPKG_UNSAFE_IO
+        with ChrootSession(self.rootfs, fast_install=True, trigger_policy='skip'):
+            self.assertIn("exit 101", policy.read_text())
+            self.assertTrue(os.access(policy, os.X_OK))
+            self.assertEqual(unsafe_io.read_text(), "force-unsafe-io\n")
+        self.assertFalse(policy.exists())
+        self.assertFalse(unsafe_io.exists())
+
+    def test_image_policy_rc_d_is_restored(self):
+        """Test a policy-rc.d shipped by the image survives the session"""
+        policy = self.rootfs / ChrootSession.POLICY_RC_D
+        policy.write_text("#!/bin/sh\nexit 0\n")
+        with ChrootSession(self.rootfs, fast_install=True, trigger_policy='skip'):
+            self.assertIn(ChrootSession.POLICY_RC_D_MARKER, policy.read_text())
+        self.assertEqual(policy.read_text(), "#!/bin/sh\nexit 0\n")
+
+    def test_eatmydata_wraps_commands_when_present(self):
+        """Test chroot commands run under eatmydata only in fast-install mode"""
+        eatmydata = self.rootfs / "usr" / "bin" / "eatmydata"
+        eatmydata.parent.mkdir(parents=True)
+        eatmydata.touch()
+        with ChrootSession(self.rootfs, fast_install=True, trigger_policy='immediate') as chroot:
+            chroot.run(['apt-get', 'install', '-y', 'vim'])
+        with ChrootSession(self.rootfs) as chroot:
+            chroot.run(['true'])
+        self.assertEqual(self._chroot_commands(),
+                         [['eatmydata', 'apt-get', 'install', '-y', 'vim'], ['true']])
+
+    def test_initramfs_is_diverted_and_restored(self):
+        """Test update-initramfs is a no-op during the session and runs once after it"""
+        with mock.patch.object(ChrootSession, 'run_script') as run_script:
+            with ChrootSession(self.rootfs, fast_install=True):
+                self.assertTrue(self.initramfs.is_symlink())
+                self.assertEqual(os.readlink(self.initramfs), '/bin/true')
+                self.assertIn(['dpkg-divert', '--local', '--rename', '--add',
+                               ChrootSession.INITRAMFS_TOOL], self._chroot_commands())
+        self.assertFalse(self.initramfs.is_symlink())
+        self.assertIn("real tool", self.initramfs.read_text())
+        self.assertIn(['dpkg-divert', '--local', '--rename', '--remove',
+                       ChrootSession.INITRAMFS_TOOL], self._chroot_commands())
+        self.assertIn("update-initramfs -u", run_script.call_args[0][0])
+
+    def test_failed_session_undoes_without_triggers(self):
+        """Test a failing build restores the chroot but skips the deferred triggers"""
+        mandb_flag = self.rootfs / ChrootSession.MANDB_FLAG
+        mandb_flag.parent.mkdir(parents=True)
+        mandb_flag.touch()
+        with mock.patch.object(ChrootSession, 'run_script') as run_script:
+            with self.assertRaises(RuntimeError):
+                with ChrootSession(self.rootfs, fast_install=True):
+                    self.assertFalse(mandb_flag.exists())
+                    raise RuntimeError("dpkg failed")
+        run_script.assert_not_called()
+        self.assertTrue(mandb_flag.exists())
+        self.assertFalse(self.initramfs.is_symlink())
+        self.assertFalse((self.rootfs / ChrootSession.POLICY_RC_D).exists())
+
+    def test_stub_from_interrupted_session_is_replaced(self):
+        """Test a stub left by an interrupted session is not diverted as the real tool"""
+        real = self.initramfs.with_name('update-initramfs.distrib')
+        self.initramfs.rename(real)
+        self.initramfs.symlink_to('/bin/true')
+        with mock.patch.object(ChrootSession, 'run_script'):
+            with ChrootSession(self.rootfs, fast_install=True):
+                pass
+        self.assertIn("real tool", self.initramfs.read_text())
+
+    def test_immediate_policy_leaves_triggers_alone(self):
+        """Test 'immediate' neither diverts update-initramfs nor runs triggers"""
+        with ChrootSession(self.rootfs, fast_install=True, trigger_policy='immediate'):
+            self.assertFalse(self.initramfs.is_symlink())
+        self.assertEqual(self._chroot_commands(), [])
+
+    def test_unknown_trigger_policy(self):
+        """Test an unknown trigger policy is rejected"""
+        with self.assertRaises(ValueError):
+            ChrootSession(self.rootfs, trigger_policy='later')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Tests for the ISO9660 reader
+"""
+
+import unittest
+import tempfile
+import struct
+import io
+import sys
+import os
+from pathlib import Path, PurePosixPath
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from iso9660 import SECTOR_SIZE, ISOImage
+
+SP = b'SP' + bytes([7, 1]) + b'\xbe\xef\x00'
+
+
+def _both(fmt, value):
+    return struct.pack('<' + fmt, value) + struct.pack('>' + fmt, value)
+
+
+def _record(name: bytes, lba: int, size: int, is_dir: bool, su: bytes = b'', flags: int = 0):
+    pad = b'' if len(name) % 2 else b'\x00'
+    if (33 + len(name) + len(pad) + len(su)) % 2:
+        su += b'\x00'
+    length = 33 + len(name) + len(pad) + len(su)
+    return (bytes([length, 0]) + _both('I', lba) + _both('I', size) +
+            bytes([126, 1, 2, 12, 0, 0, 0, (0x02 if is_dir else 0) | flags, 0, 0]) +
+            _both('H', 1) + bytes([len(name)]) + name + pad + su)
+
+
+def _parent(name: str) -> str:
+    parent = str(PurePosixPath(name).parent)
+    return '' if parent == '.' else parent
+
+
+def build_iso(path, files, symlinks=None, rock_ridge=True, joliet=False,
+              volume_id='TEST_LIVE', split=()):
+    """
+    Write a small ISO9660 image (every directory fits one sector)
+
+    Args:
+        path: Image file to write
+        files: Image path to contents
+        symlinks: Image path to a single-component Rock Ridge link target
+        rock_ridge: Add Rock Ridge names and symlinks
+        joliet: Add a Joliet supplementary volume descriptor
+        split: Files written as two multi-extent records, second part first
+    """
+    symlinks = symlinks or {}
+    dirs = {''}
+    for name in list(files) + list(symlinks):
+        parent = _parent(name)
+        while parent:
+            dirs.add(parent)
+            parent = _parent(parent)
+    dirs = sorted(dirs)
+    trees = ['primary'] + (['joliet'] if joliet else [])
+    first = 16 + len(trees) + 1
+    dir_lba = {(tree, d): first + i * len(dirs) + j
+               for i, tree in enumerate(trees) for j, d in enumerate(dirs)}
+    next_lba = first + len(trees) * len(dirs)
+    extents = {}
+    data = {}
+    for name, content in sorted(files.items()):
+        parts = [content[:SECTOR_SIZE], content[SECTOR_SIZE:]] if name in split else [content]
+        placed = []
+        for part in reversed(parts):
+            placed.insert(0, (next_lba, len(part)))
+            data[next_lba] = part
+            next_lba += max(1, -(-len(part) // SECTOR_SIZE))
+        extents[name] = placed
+
+    def encode(name, tree, is_dir):
+        if tree == 'joliet':
+            return (name if is_dir else name + ';1').encode('utf-16-be')
+        name = name.upper().replace('-', '_')
+        return (name if is_dir else name + ';1').encode('ascii')
+
+    def rock(name, target=None):
+        if not rock_ridge:
+            return b''
+        su = b'NM' + bytes([5 + len(name), 1, 0]) + name.encode()
+        if target is not None:
+            su += b'SL' + bytes([7 + len(target), 1, 0, 0, len(target)]) + target.encode()
+        return su
+
+    image = bytearray(next_lba * SECTOR_SIZE)
+    for tree in trees:
+        for d in dirs:
+            parent = _parent(d) if d else ''
+            lba = dir_lba[(tree, d)]
+            records = [_record(b'\x00', lba, SECTOR_SIZE, True,
+                               SP if rock_ridge and tree == 'primary' and not d else b''),
+                       _record(b'\x01', dir_lba[(tree, parent)], SECTOR_SIZE, True)]
+            children = []
+            for child in dirs:
+                if child and _parent(child) == d:
+                    leaf = PurePosixPath(child).name
+                    children.append((encode(leaf, tree, True),
+                                     [_record(encode(leaf, tree, True), dir_lba[(tree, child)],
+                                              SECTOR_SIZE, True, rock(leaf) if tree == 'primary' else b'')]))
+            for name, placed in extents.items():
+                if _parent(name) == d:
+                    leaf = PurePosixPath(name).name
+                    encoded = encode(leaf, tree, False)
+                    su = rock(leaf) if tree == 'primary' else b''
+                    children.append((encoded, [
+                        _record(encoded, lba_, size, False, su, 0x80 if i < len(placed) - 1 else 0)
+                        for i, (lba_, size) in enumerate(placed)]))
+            if tree == 'primary':
+                for name, target in symlinks.items():
+                    if _parent(name) == d:
+                        leaf = PurePosixPath(name).name
+                        children.append((encode(leaf, tree, False),
+                                         [_record(encode(leaf, tree, False), 0, 0, False,
+                                                  rock(leaf, target))]))
+            for _, recs in sorted(children):
+                records.extend(recs)
+            blob = b''.join(records)
+            assert len(blob) <= SECTOR_SIZE
+            image[lba * SECTOR_SIZE:lba * SECTOR_SIZE + len(blob)] = blob
+
+    for i, tree in enumerate(trees):
+        offset = (16 + i) * SECTOR_SIZE
+        descriptor = bytearray(SECTOR_SIZE)
+        descriptor[0:7] = bytes([1 if tree == 'primary' else 2]) + b'CD001\x01'
+        descriptor[40:72] = volume_id.ljust(32).encode('ascii')
+        descriptor[80:88] = _both('I', next_lba)
+        if tree == 'joliet':
+            descriptor[88:91] = b'%/E'
+        descriptor[128:132] = _both('H', SECTOR_SIZE)
+        descriptor[156:190] = _record(b'\x00', dir_lba[(tree, '')], SECTOR_SIZE, True)
+        image[offset:offset + SECTOR_SIZE] = descriptor
+    terminator = (16 + len(trees)) * SECTOR_SIZE
+    image[terminator:terminator + 7] = b'\xffCD001\x01'
+    for lba, part in data.items():
+        image[lba * SECTOR_SIZE:lba * SECTOR_SIZE + len(part)] = part
+    Path(path).write_bytes(bytes(image))
+
+
+class TestISO9660(unittest.TestCase):
+    """Test cases for ISOImage"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.iso = Path(self.tmp.name) / "test.iso"
+        self.files = {
+            '.disk/info': b'Debian GNU/Linux 12 "Bookworm" - Official amd64 Live',
+            'live/filesystem.packages': b'bash\t5.2.15-2\nlibc6:amd64\t2.36-9\n',
+            'dists/bookworm/main/binary-amd64/Packages.gz': b'not really gzip',
+            'big.bin': bytes(range(256)) * 20,
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rock_ridge(self):
+        """Test Rock Ridge names, symlinks and lazy lookups"""
+        build_iso(self.iso, self.files, symlinks={'dists/stable': 'bookworm'})
+        with ISOImage(self.iso) as image:
+            self.assertTrue(image.rock_ridge)
+            self.assertEqual(image.volume_id, 'TEST_LIVE')
+            self.assertEqual(image.read('.disk/info'), self.files['.disk/info'])
+            self.assertEqual(image.read('/live/filesystem.packages'),
+                             self.files['live/filesystem.packages'])
+            names = {entry.name: entry for entry in image.listdir('/dists')}
+            self.assertEqual(set(names), {'bookworm', 'stable'})
+            self.assertEqual(names['stable'].symlink, 'bookworm')
+            self.assertTrue(image.exists('dists/bookworm/main/binary-amd64/Packages.gz'))
+            # Rock Ridge names are exact
+            self.assertFalse(image.exists('LIVE'))
+            self.assertIsNone(image.entry('live/missing'))
+            self.assertIsNone(image.entry('.disk/info/below-a-file'))
+
+    def test_joliet(self):
+        """Test Joliet names are used without Rock Ridge"""
+        build_iso(self.iso, self.files, rock_ridge=False, joliet=True)
+        with ISOImage(self.iso) as image:
+            self.assertFalse(image.rock_ridge)
+            self.assertTrue(image.joliet)
+            self.assertEqual(sorted(entry.name for entry in image.listdir()),
+                             ['.disk', 'big.bin', 'dists', 'live'])
+            self.assertEqual(image.read('.disk/info'), self.files['.disk/info'])
+
+    def test_plain_names_match_case_insensitively(self):
+        """Test upper case ISO9660 names are found by their usual spelling"""
+        build_iso(self.iso, self.files, rock_ridge=False)
+        with ISOImage(self.iso) as image:
+            self.assertEqual(image.read('live/filesystem.packages'),
+                             self.files['live/filesystem.packages'])
+
+    def test_multi_extent_stream(self):
+        """Test a file split over records is read and seeked as one"""
+        build_iso(self.iso, self.files, split={'big.bin'})
+        data = self.files['big.bin']
+        with ISOImage(self.iso) as image:
+            entry = image.entry('big.bin')
+            self.assertEqual(len(entry.extents), 2)
+            self.assertEqual(entry.size, len(data))
+            self.assertEqual(image.read('big.bin'), data)
+            with image.open('big.bin') as f:
+                f.seek(SECTOR_SIZE - 10)
+                self.assertEqual(f.read(20), data[SECTOR_SIZE - 10:SECTOR_SIZE + 10])
+                f.seek(-5, io.SEEK_END)
+                self.assertEqual(f.read(), data[-5:])
+            self.assertEqual([len(files) for _, _, files in image.walk()], [1, 1, 0, 0, 0, 1, 1])
+
+    def test_not_an_iso(self):
+        """Test other files are rejected"""
+        self.iso.write_bytes(b'\x00' * SECTOR_SIZE * 20)
+        with self.assertRaises(ValueError):
+            ISOImage(self.iso)
+
+
+if __name__ == '__main__':
+    unittest.main()
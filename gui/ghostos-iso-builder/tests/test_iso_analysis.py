@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for source ISO analysis
+"""
+
+import unittest
+import tempfile
+import gzip
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from iso_analysis import analyze_iso
+from test_iso9660 import build_iso
+
+PACKAGES = """Package: libc6
+Version: 2.36-9
+Priority: required
+Installed-Size: 12000
+
+Package: git
+Version: 1:2.39.2-1.1
+Installed-Size: 40000
+Depends: libc6, git-man
+
+Package: git-man
+Version: 1:2.39.2-1.1
+Installed-Size: 2000
+"""
+
+
+class TestIsoAnalysis(unittest.TestCase):
+    """Test cases for analyze_iso"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.iso = self.dir / "debian-live-12-amd64.iso"
+        build_iso(self.iso, {
+            '.disk/info': b'Debian GNU/Linux 12 "Bookworm" - Official amd64 Live\n',
+            'live/filesystem.packages': b'bash\t5.2.15-2\nnmap\t7.93\nwireshark:amd64\t4.0.6\n',
+            'dists/bookworm/main/binary-amd64/Packages.gz': gzip.compress(PACKAGES.encode()),
+        }, symlinks={'dists/stable': 'bookworm'}, volume_id='d-live 12 amd64')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_metadata(self):
+        """Test label, description and live packages come from the image"""
+        steps = []
+        info = analyze_iso(self.iso, lambda percent, message: steps.append(percent),
+                           package_sizes=False)
+        self.assertEqual(info['label'], 'd-live 12 amd64')
+        self.assertEqual(info['description'], 'Debian GNU/Linux 12 "Bookworm" - Official amd64 Live')
+        self.assertEqual(info['live_packages'], 3)
+        self.assertEqual(info['repository'], ['bookworm'])
+        self.assertEqual(steps, sorted(steps))
+        self.assertNotIn('package_index', info)
+
+    def test_components_from_packages(self):
+        """Test availability and closure sizes of components"""
+        info = analyze_iso(self.iso, index_cache=self.dir / "cache")
+        tools = info['components']['Development Tools']
+        self.assertTrue(tools['Git & Version Control']['available'])
+        self.assertEqual(tools['Git & Version Control']['size'], '41MB')
+        self.assertFalse(tools['Node.js & NPM']['available'])
+        # Installed in the live system though not in the repository
+        self.assertTrue(info['components']['Security Tools']['Network Analysis']['available'])
+        self.assertTrue(info['components']['Base System']['Linux Kernel']['available'])
+        self.assertEqual(info['base_packages'], {'libc6'})
+        info['package_index'].close()
+
+    def test_not_an_iso(self):
+        """Test other files are rejected"""
+        other = self.dir / "notes.txt"
+        other.write_text("not an image")
+        with self.assertRaises(ValueError):
+            analyze_iso(other)
+
+
+if __name__ == '__main__':
+    unittest.main()
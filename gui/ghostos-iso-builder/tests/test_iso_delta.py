@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for ISO chunk indexes and deltas
+"""
+
+import unittest
+import tempfile
+import random
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from iso_delta import (MAX_CHUNK, apply_delta, chunk_index, create_delta, find_base,
+                       index_path, load_index)
+
+
+class TestIsoDelta(unittest.TestCase):
+    """Test cases for iso_delta"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        rng = random.Random(7)
+        self.base_data = rng.randbytes(4 * 1024 * 1024)
+        # An insertion shifts everything after it; one region is rewritten
+        self.target_data = (self.base_data[:1000000] + rng.randbytes(5000) +
+                            self.base_data[1000000:3000000] + rng.randbytes(70000) +
+                            self.base_data[3070000:])
+        self.base = self.dir / "Heck-CheckOS-custom-20260101-120000.iso"
+        self.target = self.dir / "Heck-CheckOS-custom-20260102-120000.iso"
+        self.base.write_bytes(self.base_data)
+        self.target.write_bytes(self.target_data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_chunks_cover_the_image(self):
+        """Test chunks are contiguous and bounded"""
+        index = chunk_index(self.base)
+        self.assertEqual(index['size'], len(self.base_data))
+        position = 0
+        for offset, length, _ in index['chunks']:
+            self.assertEqual(offset, position)
+            self.assertLessEqual(length, MAX_CHUNK)
+            position += length
+        self.assertEqual(position, len(self.base_data))
+
+    def test_delta_round_trip(self):
+        """Test the delta is small and rebuilds the exact image"""
+        summary = create_delta(self.base, self.target)
+        self.assertLess(summary['delta_size'], len(self.target_data) // 4)
+        self.assertTrue(index_path(self.base).exists())
+
+        output = self.dir / "rebuilt.iso"
+        apply_delta(self.base, summary['path'], output)
+        self.assertEqual(output.read_bytes(), self.target_data)
+        self.assertTrue((self.dir / "rebuilt.iso.sha256").exists())
+
+    def test_wrong_base_is_rejected(self):
+        """Test a delta refuses a base it was not made from"""
+        summary = create_delta(self.base, self.target)
+        other = self.dir / "other.iso"
+        other.write_bytes(self.base_data[:-1] + b'\x00')
+        with self.assertRaises(RuntimeError):
+            apply_delta(other, summary['path'], self.dir / "rebuilt.iso")
+        self.assertFalse((self.dir / "rebuilt.iso").exists())
+        with self.assertRaises(ValueError):
+            apply_delta(self.target, summary['path'], self.dir / "rebuilt.iso")
+
+    def test_stale_index_is_ignored(self):
+        """Test an index is only reused while its image is unchanged"""
+        create_delta(self.base, self.target)
+        self.assertIsNotNone(load_index(self.base))
+        self.base.write_bytes(self.base_data + b'more')
+        self.assertIsNone(load_index(self.base))
+
+    def test_find_base(self):
+        """Test the newest earlier ISO of the same series is the base"""
+        os.utime(self.base, (1, 1))
+        (self.dir / "Heck-CheckOS-merged-20260101-130000.iso").write_bytes(b'')
+        self.assertEqual(find_base(self.dir, self.target), self.base)
+        self.assertIsNone(find_base(self.dir, self.dir / "Heck-CheckOS-custom-dark-20260103-120000.iso"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for ISO finalization
+"""
+
+import unittest
+import tempfile
+import hashlib
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import iso_finalizer
+from iso_finalizer import compute_digests, write_checksum_files, is_hybrid
+
+
+class TestIsoFinalizer(unittest.TestCase):
+    """Test cases for single-pass checksums and hybrid detection"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.image = Path(self.tmp.name) / "test.iso"
+        self.data = os.urandom(3 * 1024 * 1024 + 17)
+        self.image.write_bytes(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_digests_match_hashlib(self):
+        """Test every digest matches a plain hashlib pass across buffer boundaries"""
+        original = iso_finalizer.BUFFER_SIZE
+        iso_finalizer.BUFFER_SIZE = 1024 * 1024
+        try:
+            digests = compute_digests(self.image, ['md5', 'sha256', 'sha512', 'blake2b'])
+        finally:
+            iso_finalizer.BUFFER_SIZE = original
+        for name, digest in digests.items():
+            self.assertEqual(digest, hashlib.new(name, self.data).hexdigest())
+
+    def test_checksum_file_format(self):
+        """Test checksum files use the coreutils format"""
+        paths = write_checksum_files(self.image, {'sha256': 'abc'})
+        self.assertEqual(paths[0].name, "test.iso.sha256")
+        self.assertEqual(paths[0].read_text(), "abc  test.iso\n")
+
+    def test_hybrid_detection(self):
+        """Test an MBR signature plus GPT header counts as hybrid"""
+        self.assertFalse(is_hybrid(self.image))
+        head = bytearray(self.data[:1024])
+        head[510:512] = b'\x55\xaa'
+        head[512:520] = b'EFI PART'
+        self.image.write_bytes(bytes(head) + self.data[1024:])
+        self.assertTrue(is_hybrid(self.image))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for exposing source ISOs as apt repositories
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from iso_repository import find_distributions, IsoRepositories
+
+
+class TestIsoRepository(unittest.TestCase):
+    """Test cases for ISO repository discovery"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "pool" / "main").mkdir(parents=True)
+        dist = self.root / "dists" / "bookworm"
+        (dist / "main").mkdir(parents=True)
+        (dist / "contrib").mkdir()
+        (dist / "Release").write_text(
+            "Origin: Debian\n"
+            "Codename: bookworm\n"
+            "Components: main contrib non-free-firmware\n"
+            "SHA256:\n"
+            " 0123 456 main/binary-amd64/Packages\n"
+        )
+        (self.root / "dists" / "stable").symlink_to("bookworm")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_distributions(self):
+        """Test dists are found once, with only the components present"""
+        self.assertEqual(find_distributions(self.root),
+                         [{'dist': 'bookworm', 'components': ['main', 'contrib']}])
+
+    def test_tree_without_pool(self):
+        """Test a live ISO without a package pool is not a repository"""
+        (self.root / "pool" / "main").rmdir()
+        (self.root / "pool").rmdir()
+        self.assertEqual(find_distributions(self.root), [])
+
+    def test_offline_sources(self):
+        """Test offline mode restricts apt to the ISO sources"""
+        repos = IsoRepositories([], self.root, self.root, offline=True)
+        repos.repositories.append({
+            'host_path': self.root,
+            'chroot_path': '/media/heckcheckos-iso/0',
+            'distributions': find_distributions(self.root),
+        })
+        self.assertIn("deb [trusted=yes] file:/media/heckcheckos-iso/0 bookworm main contrib",
+                      repos.sources_list())
+        self.assertIn('Dir::Etc::SourceList=sources.list.d/heckcheckos-iso.list',
+                      repos.apt_options())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Tests for per-build mount namespaces
+"""
+
+import unittest
+import tempfile
+import subprocess
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import mount_namespace
+
+
+class TestMountNamespace(unittest.TestCase):
+    """Test cases for mount namespace isolation"""
+
+    def test_progress_lines(self):
+        """Test only marked lines from a build child count as progress"""
+        parser = mount_namespace._ProgressParser()
+        self.assertIsNone(parser.feed("[*] Creating squashfs filesystem..."))
+        self.assertEqual(parser.feed(mount_namespace.PROGRESS_MARKER + '[42.5, "Installing"]'),
+                         (42.5, "Installing"))
+
+    @unittest.skipUnless(mount_namespace.available(), "needs root and unshare")
+    def test_mounts_stay_in_the_namespace(self):
+        """Test a mount made by a namespaced command never reaches the host"""
+        with tempfile.TemporaryDirectory() as target:
+            cmd = mount_namespace.namespace_command(
+                ['sh', '-c', f'mount -t tmpfs heckcheckos-test {target} && grep -c {target} /proc/self/mounts'])
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            self.assertEqual(result.stdout.strip(), "1")
+            self.assertFalse(os.path.ismount(target))
+
+
+if __name__ == '__main__':
+    unittest.main()
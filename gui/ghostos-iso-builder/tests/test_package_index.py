@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for the source ISO package index
+"""
+
+import unittest
+import tempfile
+import gzip
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from package_index import (COMPONENT_PACKAGES, PackageIndex, base_packages, dependency_closure,
+                           installed_size, parse_relations, parse_versioned_relations,
+                           version_compare, version_satisfies)
+
+PACKAGES = """Package: libc6
+Version: 2.36-9
+Priority: required
+Installed-Size: 12000
+Size: 2800000
+
+Package: python3
+Version: 3.11.2-1
+Priority: optional
+Installed-Size: 100
+Depends: python3-minimal (= 3.11.2-1), libc6 (>= 2.34)
+Recommends: python3-doc
+
+Package: python3-minimal
+Version: 3.11.2-1
+Installed-Size: 200
+Depends: libc6
+
+Package: python3-pip
+Version: 23.0.1+dfsg-1
+Installed-Size: 8000
+Depends: python3:any, ca-certificates | ca-store
+
+Package: mozilla-certs
+Version: 1.0
+Installed-Size: 50
+Provides: ca-store
+Description: multi-line
+ description continues here
+
+Package: python3-dev
+Version: 3.11.2-1
+Installed-Size: 300
+Depends: python3 (= 3.11.2-1), libpython3-dev
+"""
+
+OLDER = """Package: python3-minimal
+Version: 3.9.2-3
+Installed-Size: 999
+"""
+
+
+class TestPackageIndex(unittest.TestCase):
+    """Test cases for PackageIndex"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name) / "iso"
+        main = self.root / "dists" / "bookworm" / "main" / "binary-amd64"
+        main.mkdir(parents=True)
+        with gzip.open(main / "Packages.gz", 'wt') as f:
+            f.write(PACKAGES)
+        contrib = self.root / "dists" / "bookworm" / "contrib" / "binary-amd64"
+        contrib.mkdir(parents=True)
+        (contrib / "Packages").write_text(OLDER)
+        # Alias directories must not be indexed twice
+        (self.root / "dists" / "stable").symlink_to("bookworm")
+        self.cache = Path(self.tmp.name) / "cache"
+        self.index = PackageIndex.for_source(self.root, self.cache)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def test_version_compare(self):
+        """Test Debian version ordering"""
+        self.assertGreater(version_compare('1.10', '1.9'), 0)
+        self.assertLess(version_compare('1.0~rc1', '1.0'), 0)
+        self.assertGreater(version_compare('1:0.1', '2.0'), 0)
+        self.assertLess(version_compare('2.36-9', '2.36-10'), 0)
+        self.assertEqual(version_compare('1.0-1', '1.0-1'), 0)
+
+    def test_parse_relations(self):
+        """Test qualifiers are dropped and alternatives kept"""
+        self.assertEqual(parse_relations('a (>= 1), b | c:any [amd64], d <!nocheck>'),
+                         [['a'], ['b', 'c'], ['d']])
+
+    def test_versioned_relations(self):
+        """Test relations keep their version constraints"""
+        self.assertEqual(parse_versioned_relations('a (>= 1:2.0), b | c:any (<< 3) [amd64]'),
+                         [[('a', '>=', '1:2.0')], [('b', None, None), ('c', '<<', '3')]])
+        self.assertTrue(version_satisfies('2.36-9', '>=', '2.34'))
+        self.assertFalse(version_satisfies('2.36-9', '>>', '2.36-9'))
+        self.assertTrue(version_satisfies('2.36-9', '<', '2.36-9'))
+        self.assertFalse(version_satisfies('1.0', '=', '1.0-1'))
+
+    def test_lookup(self):
+        """Test records, the newest version winning and virtual packages"""
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(self.index.get('python3-minimal').version, '3.11.2-1')
+        self.assertEqual(self.index.get('python3').depends, [['python3-minimal'], ['libc6']])
+        self.assertEqual(self.index.get('python3').recommends, [['python3-doc']])
+        self.assertEqual(self.index.get('libc6').priority, 'required')
+        self.assertEqual(self.index.providers('ca-store'), ['mozilla-certs'])
+        self.assertIsNone(self.index.get('nonexistent'))
+        self.assertNotIn('ca-store', self.index)
+
+    def test_closure(self):
+        """Test closure follows alternatives, providers and skips the base"""
+        base = base_packages([self.index])
+        self.assertEqual(base, {'libc6'})
+        closure = dependency_closure([self.index], ['python3-pip'], exclude=base)
+        self.assertEqual(sorted(closure.packages),
+                         ['mozilla-certs', 'python3', 'python3-minimal', 'python3-pip'])
+        # Unresolvable Recommends are not errors
+        self.assertEqual(closure.missing, [])
+        self.assertEqual(installed_size(closure), (8000 + 100 + 200 + 50) * 1024)
+
+        closure = dependency_closure([self.index], ['python3-dev', 'python3-pip'], exclude=base)
+        self.assertEqual(closure.missing, ['libpython3-dev'])
+
+    def test_index_is_cached(self):
+        """Test a second open maps the stored file instead of parsing again"""
+        again = PackageIndex.for_source(self.root, self.cache)
+        self.assertEqual(again.path, self.index.path)
+        self.assertEqual(again.get('python3').version, '3.11.2-1')
+        again.close()
+
+    def test_components_are_package_lists(self):
+        """Test no component hands apt a space-joined package string"""
+        for packages in COMPONENT_PACKAGES.values():
+            for name in packages:
+                self.assertNotIn(' ', name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for reproducible build mode
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from reproducible_build import (DEFAULT_EPOCH, build_timestamp, clamp_mtimes, iso_date,
+                                reproducible_environment, scrub_rootfs, source_date_epoch)
+from squashfs_profiles import get_profile, mksquashfs_command
+from iso_builder_backend import ISOBuilder
+
+EPOCH = 1700000000
+
+
+class TestReproducibleBuild(unittest.TestCase):
+    """Test cases for reproducible build helpers"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_source_date_epoch(self):
+        """Test the mode is off by default and the environment wins over the config"""
+        with mock.patch.dict(os.environ):
+            os.environ.pop('SOURCE_DATE_EPOCH', None)
+            self.assertIsNone(source_date_epoch({}))
+            self.assertEqual(source_date_epoch({'reproducible': {'enabled': True}}), DEFAULT_EPOCH)
+            self.assertEqual(source_date_epoch(
+                {'reproducible': {'enabled': True, 'source_date_epoch': EPOCH}}), EPOCH)
+            os.environ['SOURCE_DATE_EPOCH'] = '42'
+            self.assertEqual(source_date_epoch({}), 42)
+
+    def test_environment_is_restored(self):
+        """Test SOURCE_DATE_EPOCH is only exported inside the block"""
+        with mock.patch.dict(os.environ):
+            os.environ.pop('SOURCE_DATE_EPOCH', None)
+            with reproducible_environment(EPOCH):
+                self.assertEqual(os.environ['SOURCE_DATE_EPOCH'], str(EPOCH))
+                self.assertEqual(os.environ['TZ'], 'UTC')
+            self.assertNotIn('SOURCE_DATE_EPOCH', os.environ)
+            with reproducible_environment(None):
+                self.assertNotIn('SOURCE_DATE_EPOCH', os.environ)
+
+    def test_clamp_mtimes_only_lowers_newer_entries(self):
+        """Test files newer than the epoch are clamped and older ones kept"""
+        (self.root / "etc").mkdir()
+        new = self.root / "etc" / "new.conf"
+        old = self.root / "etc" / "old.conf"
+        new.write_text("new")
+        old.write_text("old")
+        os.utime(old, (EPOCH - 100, EPOCH - 100))
+        os.symlink("new.conf", self.root / "etc" / "link")
+
+        clamp_mtimes(self.root, EPOCH)
+        self.assertEqual(new.stat().st_mtime, EPOCH)
+        self.assertEqual(old.stat().st_mtime, EPOCH - 100)
+        self.assertEqual(os.lstat(self.root / "etc" / "link").st_mtime, EPOCH)
+        self.assertEqual((self.root / "etc").stat().st_mtime, EPOCH)
+        self.assertEqual(clamp_mtimes(self.root, EPOCH), 0)
+
+    def test_scrub_rootfs(self):
+        """Test per-build state is emptied or removed"""
+        (self.root / "etc").mkdir()
+        (self.root / "etc" / "machine-id").write_text("0123456789abcdef\n")
+        (self.root / "var" / "log" / "apt").mkdir(parents=True)
+        (self.root / "var" / "log" / "dpkg.log").write_text("log")
+        (self.root / "var" / "log" / "apt" / "history.log").write_text("log")
+        (self.root / "var" / "lib" / "apt" / "lists").mkdir(parents=True)
+        (self.root / "var" / "lib" / "apt" / "lists" / "deb.debian.org_Release").write_text("x")
+        (self.root / "var" / "lib" / "apt" / "lists" / "lock").write_text("")
+
+        scrub_rootfs(self.root)
+        self.assertEqual((self.root / "etc" / "machine-id").read_text(), "")
+        self.assertFalse((self.root / "var" / "log" / "dpkg.log").exists())
+        self.assertTrue((self.root / "var" / "log" / "apt").is_dir())
+        self.assertFalse((self.root / "var" / "log" / "apt" / "history.log").exists())
+        self.assertEqual(sorted(p.name for p in (self.root / "var/lib/apt/lists").iterdir()), ['lock'])
+
+    def test_timestamps(self):
+        """Test manifest and volume dates come from the epoch"""
+        self.assertEqual(build_timestamp(EPOCH), "2023-11-14T22:13:20+00:00")
+        self.assertEqual(iso_date(EPOCH), "2023111422132000")
+
+    def test_mksquashfs_mkfs_time(self):
+        """Test the squashfs timestamp is pinned only in reproducible mode"""
+        profile = get_profile('fast-build')
+        cmd = mksquashfs_command('rootfs', 'out.squashfs', profile, 4, '1G',
+                                 excludes=['boot'], mkfs_time=EPOCH)
+        self.assertEqual(cmd[cmd.index('-mkfs-time') + 1], str(EPOCH))
+        self.assertEqual(cmd[-2:], ['-e', 'boot'])
+        self.assertNotIn('-mkfs-time', mksquashfs_command('rootfs', 'out', profile, 4, '1G'))
+
+    def test_normalize_stage(self):
+        """Test reproducible builds normalize the rootfs right before compression"""
+        with mock.patch.dict(os.environ):
+            os.environ.pop('SOURCE_DATE_EPOCH', None)
+            plain = ISOBuilder({'version': '1.0'}).stage_fingerprints(self.root)
+            builder = ISOBuilder({'version': '1.0', 'reproducible': {'enabled': True}})
+            reproducible = builder.stage_fingerprints(self.root)
+            stages = {stage.name: stage for stage in builder._build_stages('test.iso')}
+        self.assertNotIn('normalize', plain)
+        self.assertIn('rootfs:normalized', stages['squashfs'].inputs)
+        self.assertIn('rootfs:packages', stages['normalize'].inputs)
+        self.assertEqual(plain['bootstrap'], reproducible['bootstrap'])
+        self.assertNotEqual(plain['squashfs'], reproducible['squashfs'])
+
+
+if __name__ == '__main__':
+    unittest.main()
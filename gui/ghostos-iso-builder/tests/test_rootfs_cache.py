@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the rootfs snapshot cache
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from rootfs_cache import RootfsSnapshotCache
+
+
+class TestRootfsSnapshotCache(unittest.TestCase):
+    """Test cases for RootfsSnapshotCache"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source = self.root / "rootfs"
+        (self.source / "etc").mkdir(parents=True)
+        (self.source / "etc" / "hostname").write_text("heckcheckos\n")
+        self.cache = RootfsSnapshotCache(self.root / "cache")
+        self.key = RootfsSnapshotCache.make_key('bookworm', 'amd64', 'http://mirror/', ['curl'])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_restore_roundtrip(self):
+        """Test a stored snapshot restores to an identical tree"""
+        self.assertFalse(self.cache.restore(self.key, self.root / "miss"))
+        self.cache.store(self.key, self.source)
+        target = self.root / "restored"
+        self.assertTrue(self.cache.restore(self.key, target))
+        self.assertEqual((target / "etc" / "hostname").read_text(), "heckcheckos\n")
+
+    def test_materialized_tree_survives_while_held(self):
+        """Test a held tree is not deleted when its snapshot is dropped"""
+        self.cache.store(self.key, self.source)
+        hold = self.cache.hold_tree(self.key)
+        tree = self.cache.materialize(self.key)
+        self.assertTrue((tree / "etc" / "hostname").exists())
+
+        self.cache.invalidate(self.key)
+        self.assertTrue(tree.exists())
+
+        hold.close()
+        self.cache.invalidate()
+        self.assertFalse(tree.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
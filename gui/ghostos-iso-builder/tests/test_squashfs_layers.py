@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for splitting the live filesystem into squashfs layers
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+import shutil
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from squashfs_layers import SquashfsLayers, rootfs_manifest
+from squashfs_profiles import PROFILES
+
+
+class TestSquashfsLayers(unittest.TestCase):
+    """Test cases for layer ownership tracking"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rootfs = Path(self.tmp.name) / "rootfs"
+        (self.rootfs / "etc").mkdir(parents=True)
+        (self.rootfs / "boot").mkdir()
+        (self.rootfs / "etc" / "os-release").write_text("base\n")
+        (self.rootfs / "etc" / "gtk.ini").write_text("light\n")
+        self.layers = SquashfsLayers(Path(self.tmp.name) / "state",
+                                     ['base', 'theme', 'files'], excludes=['boot'])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _theme(self, progress):
+        (self.rootfs / "etc" / "gtk.ini").write_text("dark\n")
+        (self.rootfs / "usr" / "share" / "themes").mkdir(parents=True)
+        (self.rootfs / "usr" / "share" / "themes" / "dark.css").write_text("*{}\n")
+
+    def _files(self, progress):
+        (self.rootfs / "etc" / "gtk.ini").write_text("custom\n")
+        (self.rootfs / "etc" / "motd").write_text("hi\n")
+
+    def test_describing_a_build_leaves_no_state(self):
+        """Test the state directory only appears once a layer is recorded"""
+        from iso_builder_backend import ISOBuilder
+        state = Path(self.tmp.name) / "state"
+        self.assertFalse(state.exists())
+        output = Path(self.tmp.name) / "output"
+        ISOBuilder({'squashfs': {'layered': True}, 'theme': {'mode': 'dark'}},
+                   str(output))._artifact_fingerprints()
+        self.assertFalse(output.exists())
+        self.layers.capture('theme', self.rootfs, self._theme)(None)
+        self.assertTrue(state.is_dir())
+
+    def test_topmost_writer_owns_each_path(self):
+        """Test layers partition the rootfs by the last stage that wrote a path"""
+        self.layers.capture('theme', self.rootfs, self._theme)(None)
+        self.layers.capture('files', self.rootfs, self._files)(None)
+        assignment = self.layers.assign(rootfs_manifest(self.rootfs, ['boot']))
+
+        self.assertEqual(assignment['base'], ['etc', 'etc/os-release'])
+        self.assertEqual(assignment['theme'], ['usr', 'usr/share', 'usr/share/themes',
+                                               'usr/share/themes/dark.css'])
+        self.assertEqual(assignment['files'], ['etc/gtk.ini', 'etc/motd'])
+
+    def test_upper_layer_staging(self):
+        """Test an upper layer is staged with its parent directories"""
+        self.layers.capture('files', self.rootfs, self._files)(None)
+        paths = self.layers.assign(rootfs_manifest(self.rootfs, ['boot']))['files']
+        staging = Path(self.tmp.name) / "staging"
+        self.layers._stage_upper(self.rootfs, paths, staging)
+
+        self.assertEqual((staging / "etc" / "motd").read_text(), "hi\n")
+        self.assertFalse((staging / "etc" / "os-release").exists())
+
+    def test_digest_follows_content_not_inodes(self):
+        """Test a rootfs rebuilt with the same contents keeps its layer digest"""
+        profile = PROFILES['max-ratio']
+        before = rootfs_manifest(self.rootfs, ['boot'])
+        digest = SquashfsLayers.digest(sorted(before), before, profile)
+
+        rebuilt = Path(self.tmp.name) / "rebuilt"
+        shutil.copytree(self.rootfs, rebuilt)
+        os.utime(rebuilt / "etc" / "os-release", ns=(1, 1))
+        after = rootfs_manifest(rebuilt, ['boot'])
+        self.assertEqual(SquashfsLayers.digest(sorted(after), after, profile), digest)
+
+        # Same size, different bytes
+        (rebuilt / "etc" / "os-release").write_text("next\n")
+        changed = rootfs_manifest(rebuilt, ['boot'])
+        self.assertNotEqual(SquashfsLayers.digest(sorted(changed), changed, profile), digest)
+
+    def test_unchanged_files_are_not_hashed_again(self):
+        """Test cached content hashes are reused while a file's stat is unchanged"""
+        hashes = {}
+        rootfs_manifest(self.rootfs, ['boot'], hashes)
+        with mock.patch('squashfs_layers.file_digest') as file_digest:
+            rootfs_manifest(self.rootfs, ['boot'], hashes)
+        file_digest.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
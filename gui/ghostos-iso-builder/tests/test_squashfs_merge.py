@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Tests for copying packages out of source live squashfs images
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from squashfs_merge import (canonical_path, conffiles, installed_stanzas, locate_squashfs,
+                            parse_listing, payload_paths, register_packages, select_packages,
+                            unpacked_packages)
+from test_iso9660 import build_iso
+
+LISTING = """drwxr-xr-x root/root               123 2023-06-10 12:00 squashfs-root
+lrwxrwxrwx root/root                 7 2023-06-10 12:00 squashfs-root/bin -> usr/bin
+drwxr-xr-x root/root                 3 2023-06-10 12:00 squashfs-root/usr
+drwxr-xr-x root/root                 3 2023-06-10 12:00 squashfs-root/usr/bin
+-rwxr-xr-x root/root           1234376 2023-06-10 12:00 squashfs-root/usr/bin/bash
+-rwxr-xr-x root/root             55000 2023-06-10 12:00 squashfs-root/usr/bin/[
+lrwxrwxrwx root/root                 4 2023-06-10 12:00 squashfs-root/usr/bin/rbash -> bash
+crw-r--r-- root/root             1,  3 2023-06-10 12:00 squashfs-root/dev/null
+"""
+
+STATUS = """Package: bash
+Status: install ok installed
+Architecture: amd64
+Version: 5.2.15-2
+Depends: base-files (>= 2.1.12), debianutils (>= 5.6-0.1)
+
+Package: git
+Status: install ok installed
+Architecture: amd64
+Version: 1:2.39.2-1.1
+Depends: libc6 (>= 2.34), git-man (>> 1:2.39.2)
+Config-Version: 1:2.39.2-1.1
+Conffiles:
+ /etc/bash_completion.d/git-prompt 7baac5c3ced94ebf2c0e1dde65c3b1a6
+
+Package: git-man
+Status: install ok installed
+Architecture: all
+Version: 1:2.39.2-1.1
+
+Package: nodejs
+Status: install ok installed
+Architecture: amd64
+Depends: libnode108
+
+Package: removed
+Status: deinstall ok config-files
+Architecture: amd64
+
+Package: libc6
+Status: install ok installed
+Architecture: i386
+"""
+
+
+class TestSquashfsMerge(unittest.TestCase):
+    """Test cases for squashfs_merge"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.listing = parse_listing(LISTING.splitlines())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_listing(self):
+        """Test directories, symlinks and device nodes from unsquashfs -lls"""
+        self.assertEqual(self.listing.dirs, {'usr', 'usr/bin'})
+        self.assertEqual(self.listing.symlinks, {'bin': 'usr/bin', 'usr/bin/rbash': 'bash'})
+        self.assertIn('usr/bin/[', self.listing.paths)
+        self.assertIn('dev/null', self.listing.paths)
+
+    def test_canonical_path(self):
+        """Test directory symlinks are resolved but the last component is not"""
+        symlinks = {'bin': 'usr/bin', 'lib64': '/usr/lib64', 'usr/lib64': 'lib'}
+        self.assertEqual(canonical_path('/bin/bash', symlinks), 'usr/bin/bash')
+        self.assertEqual(canonical_path('/bin', symlinks), 'bin')
+        self.assertEqual(canonical_path('/lib64/ld.so', symlinks), 'usr/lib/ld.so')
+        self.assertEqual(canonical_path('/usr/./share/../bin/x', symlinks), 'usr/bin/x')
+
+    def test_payload_paths(self):
+        """Test .list directories and files missing from the image are skipped"""
+        paths = payload_paths("/.\n/bin\n/bin/bash\n/bin/rbash\n/usr/bin/[\n/usr/share/doc/gone\n",
+                              self.listing)
+        self.assertEqual(paths, ['bin', 'usr/bin/bash', 'usr/bin/rbash', 'usr/bin/['])
+
+    def test_existing_conffiles_are_kept(self):
+        """Test conffiles the rootfs already has are not extracted over"""
+        stanzas = installed_stanzas(STATUS, 'amd64')
+        self.assertEqual(conffiles(stanzas['git']), ['/etc/bash_completion.d/git-prompt'])
+        self.assertEqual(conffiles(stanzas['bash']), [])
+        paths = payload_paths("/bin/bash\n/usr/bin/[\n", self.listing, keep={'usr/bin/bash'})
+        self.assertEqual(paths, ['usr/bin/['])
+
+    def test_merge_stage_runs_after_config_stages(self):
+        """Test the merge stage cannot overwrite what the config stages wrote"""
+        from iso_builder_backend import ISOBuilder
+        builder = ISOBuilder({'iso_sources': ['a.iso', 'b.iso'], 'theme': {'name': 'dark'}})
+        stages = {stage.name: stage for stage in builder._build_stages('test.iso')}
+        for name in ('repositories', 'telemetry', 'privacy', 'autonomy', 'amd-am5', 'theme'):
+            for output in stages[name].outputs:
+                self.assertIn(output, stages['merge'].inputs)
+        self.assertIn('packages:merged', stages['packages'].inputs)
+
+    def test_select_packages(self):
+        """Test only closed dependency sets are copied, the first source winning"""
+        first = installed_stanzas(STATUS, 'amd64')
+        self.assertEqual(sorted(first), ['bash', 'git', 'git-man', 'nodejs'])
+        second = {'git-man': first['git-man'], 'vim': 'Package: vim\nVersion: 9.0\nStatus: install ok installed'}
+        installed = {'libc6': 'Package: libc6\nVersion: 2.36-9', 'bash': first['bash']}
+        chosen, left = select_packages([{'git': first['git']}, second],
+                                       ['git', 'nodejs', 'bash', 'vim'], installed,
+                                       self.dir / "index")
+        self.assertEqual(chosen, {'git': 0, 'git-man': 1, 'vim': 1})
+        self.assertEqual(left, ['nodejs'])
+
+    def test_select_packages_checks_versions(self):
+        """Test a rootfs or source version too old for a versioned Depends leaves the root to apt"""
+        first = installed_stanzas(STATUS, 'amd64')
+        old_man = first['git-man'].replace('Version: 1:2.39.2-1.1', 'Version: 1:2.30.2-1')
+        chosen, left = select_packages([{'git': first['git'], 'git-man': old_man}], ['git'],
+                                       {'libc6': 'Package: libc6\nVersion: 2.36-9'},
+                                       self.dir / "index")
+        self.assertEqual((chosen, left), ({}, ['git']))
+
+        chosen, left = select_packages([{'git': first['git'], 'git-man': first['git-man']}],
+                                       ['git'], {'libc6': 'Package: libc6\nVersion: 2.31-13'},
+                                       self.dir / "index")
+        self.assertEqual((chosen, left), ({}, ['git']))
+
+        virtual = 'Package: libc-new\nVersion: 1\nProvides: libc6 (= 2.36-9)'
+        chosen, left = select_packages([{'git': first['git'], 'git-man': first['git-man']}],
+                                       ['git'], {'libc-new': virtual}, self.dir / "index")
+        self.assertEqual((chosen, left), ({'git': 0, 'git-man': 0}, []))
+
+    def test_register_packages(self):
+        """Test copied packages join the dpkg database as unpacked"""
+        status = self.dir / "var" / "lib" / "dpkg" / "status"
+        status.parent.mkdir(parents=True)
+        status.write_text("Package: libc6\nStatus: install ok installed\nArchitecture: amd64\n")
+        stanzas = installed_stanzas(STATUS, 'amd64')
+        register_packages(self.dir, [stanzas['git'], stanzas['git-man']])
+        self.assertEqual(unpacked_packages(self.dir), ['git', 'git-man'])
+        self.assertEqual(sorted(installed_stanzas(status.read_text(), 'amd64')), ['libc6'])
+        self.assertIn(" /etc/bash_completion.d/git-prompt", status.read_text())
+        self.assertNotIn("Config-Version", status.read_text())
+        self.assertTrue((status.parent / "status-old").exists())
+
+    def test_locate_squashfs(self):
+        """Test the live image is found with its byte offset in the ISO"""
+        iso = self.dir / "live.iso"
+        squashfs = b'hsqs' + bytes(5000)
+        build_iso(iso, {'live/filesystem.squashfs': squashfs, '.disk/info': b'x'})
+        source = locate_squashfs(iso)
+        self.assertEqual(source.path, 'live/filesystem.squashfs')
+        self.assertEqual(source.size, len(squashfs))
+        with open(iso, 'rb') as f:
+            f.seek(source.offset)
+            self.assertEqual(f.read(4), b'hsqs')
+
+        build_iso(iso, {'.disk/info': b'x'})
+        self.assertIsNone(locate_squashfs(iso))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for squashfs compression profiles and their benchmark
+"""
+
+import unittest
+import subprocess
+import tempfile
+import sys
+import os
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from squashfs_profiles import (DEFAULT_PROFILE, PROFILES, SquashfsBenchmark,
+                               default_memory, get_profile, mksquashfs_command)
+
+
+class TestSquashfsProfiles(unittest.TestCase):
+    """Test cases for profile selection and mksquashfs arguments"""
+
+    def _command(self, name: str, **kwargs) -> list:
+        return mksquashfs_command('/rootfs', '/live/filesystem.squashfs', get_profile(name),
+                                  processors=4, memory='2G', **kwargs)
+
+    def test_profile_selection(self):
+        """Test profiles are looked up by name, defaulting to max-ratio"""
+        self.assertEqual(get_profile().name, DEFAULT_PROFILE)
+        self.assertEqual(get_profile(None).name, 'max-ratio')
+        self.assertIs(get_profile('fast-boot'), PROFILES['fast-boot'])
+        with self.assertRaises(ValueError) as ctx:
+            get_profile('gzip')
+        self.assertIn('balanced', str(ctx.exception))
+
+    def test_profile_arguments(self):
+        """Test each profile contributes its compressor options and block size"""
+        expected = {
+            'max-ratio': ['-comp', 'xz', '-Xbcj', 'x86', '-b', '1M'],
+            'balanced': ['-comp', 'zstd', '-Xcompression-level', '15', '-b', '1M'],
+            'fast-build': ['-comp', 'zstd', '-Xcompression-level', '3', '-b', '1M'],
+            'fast-boot': ['-comp', 'lz4', '-Xhc', '-b', '256K'],
+        }
+        self.assertEqual(sorted(expected), sorted(PROFILES))
+        for name, options in expected.items():
+            self.assertEqual(self._command(name),
+                             ['mksquashfs', '/rootfs', '/live/filesystem.squashfs', '-noappend']
+                             + options + ['-processors', '4', '-mem', '2G'])
+
+    def test_optional_arguments(self):
+        """Test progress, reproducibility and exclude options, with -e last"""
+        cmd = self._command('balanced', mkfs_time=1700000000, percentage=True,
+                            exclude_file='/tmp/upper', excludes=['boot', 'tmp'])
+        self.assertEqual(cmd[-9:], ['-reproducible', '-mkfs-time', '1700000000', '-percentage',
+                                    '-ef', '/tmp/upper', '-e', 'boot', 'tmp'])
+        self.assertEqual(self._command('balanced', progress=False)[-1], '-no-progress')
+
+    def test_default_memory_is_bounded(self):
+        """Test the -mem default is a quarter of available RAM within 256M..8G"""
+        for available_kb, expected in [(4 * 1024 ** 2, '1024M'), (512 * 1024, '256M'),
+                                       (128 * 1024 ** 2, '8192M')]:
+            meminfo = f"MemTotal: 999 kB\nMemAvailable: {available_kb} kB\n"
+            with mock.patch('builtins.open', mock.mock_open(read_data=meminfo)):
+                self.assertEqual(default_memory(), expected)
+
+
+class TestSquashfsBenchmark(unittest.TestCase):
+    """Test cases for SquashfsBenchmark (mksquashfs and unsquashfs are mocked)"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rootfs = Path(self.tmp.name) / "rootfs"
+        self.rootfs.mkdir()
+        (self.rootfs / "data").write_bytes(b'x' * 4000)
+        self.commands = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _tool(self, cmd, check=False, stdout=None):
+        """Write a fake image a tenth of the rootfs size, or a fake extraction"""
+        self.commands.append(cmd)
+        if cmd[0] == 'mksquashfs':
+            Path(cmd[2]).write_bytes(b'i' * 400)
+        else:
+            Path(cmd[cmd.index('-d') + 1]).mkdir()
+        return subprocess.CompletedProcess(cmd, 0)
+
+    def test_benchmark_builds_and_extracts_each_profile(self):
+        """Test every requested profile is compressed, measured and cleaned up"""
+        benchmark = SquashfsBenchmark(self.rootfs, self.tmp.name, processors=2, memory='1G')
+        with mock.patch('squashfs_profiles.subprocess.run', side_effect=self._tool):
+            results = benchmark.run(['fast-build', 'fast-boot'])
+
+        self.assertEqual([r['profile'] for r in results], ['fast-build', 'fast-boot'])
+        self.assertEqual([r['image_bytes'] for r in results], [400, 400])
+        self.assertEqual(results[0]['ratio'], 0.1)
+        builds = [cmd for cmd in self.commands if cmd[0] == 'mksquashfs']
+        self.assertEqual([cmd[cmd.index('-comp') + 1] for cmd in builds], ['zstd', 'lz4'])
+        self.assertTrue(all('-no-progress' in cmd and cmd[cmd.index('-processors') + 1] == '2'
+                            for cmd in self.commands))
+        # Scratch images and extractions are gone afterwards
+        self.assertEqual(sorted(p.name for p in Path(self.tmp.name).iterdir()), ['rootfs'])
+
+    def test_benchmark_defaults_to_every_profile(self):
+        """Test an empty profile list benchmarks all profiles"""
+        with mock.patch('squashfs_profiles.subprocess.run', side_effect=self._tool):
+            results = SquashfsBenchmark(self.rootfs, self.tmp.name).run()
+        self.assertEqual([r['profile'] for r in results], list(PROFILES))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming build tool runner
+"""
+
+import unittest
+import subprocess
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tool_runner import (AptStatusParser, DebootstrapParser, MksquashfsParser,
+                         UnsquashfsParser, XorrisoParser, run_tool, scaled)
+
+
+class TestParsers(unittest.TestCase):
+    """Test cases for tool output parsers"""
+
+    def test_debootstrap_phases(self):
+        """Test debootstrap progress advances through retrieve, unpack and configure"""
+        parser = DebootstrapParser(expected_packages=2)
+        lines = [
+            "I: Retrieving InRelease",
+            "I: Retrieving libc6 2.36-9",
+            "I: Retrieving bash 5.2-2",
+            "I: Unpacking required packages...",
+            "I: Unpacking libc6:amd64...",
+            "I: Configuring bash...",
+            "I: Configuring libc6:amd64...",
+        ]
+        updates = [u for u in map(parser.feed, lines) if u]
+        percents = [percent for percent, message in updates]
+        self.assertEqual(len(updates), 5)
+        self.assertEqual(percents, sorted(percents))
+        self.assertEqual(percents[-1], 100)
+        self.assertEqual(updates[0][1], "Downloading libc6")
+
+    def test_apt_status(self):
+        """Test apt status-fd lines split into download and install shares"""
+        parser = AptStatusParser(download_share=30)
+        self.assertEqual(parser.feed("dlstatus:1:50:Retrieving file 1 of 2"),
+                         (15, "Retrieving file 1 of 2"))
+        self.assertEqual(parser.feed("pmstatus:vim:50:Installing vim"), (65, "Installing vim"))
+        self.assertIsNone(parser.feed("Reading package lists..."))
+
+    def test_mksquashfs_and_xorriso(self):
+        """Test percentage lines from mksquashfs and xorriso"""
+        self.assertEqual(MksquashfsParser().feed("42")[0], 42)
+        self.assertIsNone(MksquashfsParser().feed("Parallel mksquashfs: Using 4 processors"))
+        update = XorrisoParser().feed("xorriso : UPDATE :  12.34% done, estimate finish Thu")
+        self.assertAlmostEqual(update[0], 12.34)
+        update = UnsquashfsParser().feed("[=========-          ] 1150/3030  37%")
+        self.assertEqual(update[0], 37)
+        self.assertIsNone(UnsquashfsParser().feed("created 1150 files"))
+
+
+class TestRunTool(unittest.TestCase):
+    """Test cases for run_tool"""
+
+    def test_streams_progress_and_keeps_tail(self):
+        """Test progress is reported per line and only the output tail is kept"""
+        reports = []
+        result = run_tool(['sh', '-c', 'for i in 10 20 30; do echo $i; done; echo done'],
+                          MksquashfsParser(), scaled(lambda p, m: reports.append(p), 50, 100),
+                          tail_lines=2)
+        self.assertEqual(reports, [55, 60, 65])
+        self.assertEqual(result.stdout, "30\ndone")
+
+    def test_overlong_lines_are_cut(self):
+        """Test the rest of an overlong line is dropped but a redrawn frame still counts"""
+        reports = []
+        script = ("import sys; w = sys.stdout.write; w('a' * 65536 + '77\\n'); "
+                  "w('x' * 70000 + '\\r33\\n'); w('done\\n')")
+        result = run_tool([sys.executable, '-c', script], MksquashfsParser(),
+                          lambda p, m: reports.append(p))
+        self.assertEqual(reports, [33])
+        self.assertEqual(result.stdout.split('\n'), ['a' * 65536, '33', 'done'])
+
+    def test_carriage_return_frames_report_progress(self):
+        """Test every redraw of a progress bar is parsed, not only its final frame"""
+        reports = []
+        script = ("import sys, time; w = sys.stdout.write\n"
+                  "for i in (10, 40, 100):\n"
+                  "    w('\\r[====] %d/100  %d%%' % (i, i)); sys.stdout.flush(); time.sleep(0.05)\n"
+                  "w('\\ncreated 100 files\\n')")
+        result = run_tool([sys.executable, '-c', script], UnsquashfsParser(),
+                          lambda p, m: reports.append(p))
+        self.assertEqual(reports, [10, 40, 100])
+        self.assertEqual(result.stdout.split('\n'), ['[====] 100/100  100%', 'created 100 files'])
+
+    def test_failure_raises_with_output(self):
+        """Test a failing tool raises CalledProcessError carrying its output"""
+        with self.assertRaises(subprocess.CalledProcessError) as ctx:
+            run_tool(['sh', '-c', 'echo broken >&2; exit 3'])
+        self.assertEqual(ctx.exception.returncode, 3)
+        self.assertEqual(ctx.exception.output, "broken")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-variant fan-out builds
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from variant_builds import VariantBuild, merge_config
+
+
+class TestVariantBuild(unittest.TestCase):
+    """Test cases for VariantBuild"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_merge_config(self):
+        """Test overlays merge nested dicts and None removes keys"""
+        base = {'theme': {'mode': 'dark', 'accent': 'blue'}, 'self_install': {'enabled': True}}
+        merged = merge_config(base, {'theme': {'mode': 'gaming'}, 'self_install': None})
+        self.assertEqual(merged, {'theme': {'mode': 'gaming', 'accent': 'blue'}})
+        self.assertEqual(base['theme']['mode'], 'dark')
+
+    def test_shared_stages_stop_where_variants_diverge(self):
+        """Test only stages unaffected by the variant overlays are shared"""
+        build = VariantBuild({
+            'version': '1.0',
+            'packages': ['vim'],
+            'variants': {
+                'dark': {'theme': {'mode': 'dark'}},
+                'gaming': {'theme': {'mode': 'gaming'}},
+            },
+        })
+        shared = build.shared_stages(self.work_dir)
+        self.assertIn('bootstrap', shared)
+        self.assertIn('grub-config', shared)
+        self.assertNotIn('theme', shared)
+        # Variant builds theme after the packages, so those stay shared
+        self.assertIn('packages', shared)
+        self.assertNotIn('squashfs', shared)
+        self.assertNotIn('iso', shared)
+
+    def test_differing_packages_are_not_shared(self):
+        """Test variants with their own packages diverge at the packages stage"""
+        build = VariantBuild({
+            'version': '1.0',
+            'variants': {'small': {'packages': ['vim']}, 'dev': {'packages': ['vim', 'git']}},
+        })
+        shared = build.shared_stages(self.work_dir)
+        self.assertIn('privacy', shared)
+        self.assertNotIn('packages', shared)
+
+    def test_variant_names_reach_the_iso_filename(self):
+        """Test each variant config is named after its variant"""
+        build = VariantBuild({'variants': {'dark': {}, 'gaming': {'version': '2'}}})
+        configs = build.variant_configs()
+        self.assertEqual(configs['gaming']['variant'], 'gaming')
+        self.assertEqual(configs['gaming']['version'], '2')
+        self.assertNotIn('variants', configs['dark'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for build workspace management
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from workspace_manager import WorkspaceManager
+
+
+class TestWorkspaceManager(unittest.TestCase):
+    """Test cases for WorkspaceManager"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = WorkspaceManager(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_preflight_rejects_oversized_builds(self):
+        """Test a build that cannot fit fails before any work dir is left behind"""
+        with self.assertRaises(RuntimeError):
+            self.manager.create(1024 ** 5)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_teardown_moves_workspace_aside(self):
+        """Test teardown frees the work dir path immediately and deletes the tree"""
+        work_dir = self.manager.create(1024)
+        (work_dir / "rootfs" / "etc").mkdir(parents=True)
+        self.manager.teardown(work_dir, background=False)
+        self.assertFalse(work_dir.exists())
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_estimate_grows_with_packages(self):
+        """Test the space estimate accounts for packages and compression output"""
+        small = WorkspaceManager.estimate(0)
+        large = WorkspaceManager.estimate(100)
+        self.assertGreater(large['workspace'], small['workspace'])
+        self.assertGreater(small['workspace'], small['rootfs'])
+
+
+if __name__ == '__main__':
+    unittest.main()
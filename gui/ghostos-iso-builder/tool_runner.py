@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Tool Runner
+Streams long-running build tools line by line and turns their output into progress
+"""
+
+import re
+import time
+import subprocess
+from collections import deque
+from typing import Callable, Optional, Tuple
+
+from build_telemetry import record_command
+
+# Longest line kept from a tool; the rest of a longer line is read and dropped,
+# not buffered (a progress bar's latest frame still wins, see output_frames)
+MAX_LINE_BYTES = 64 * 1024
+
+FRAME_END = re.compile(rb'[\r\n]')
+
+ProgressUpdate = Optional[Tuple[float, str]]
+
+
+class OutputParser:
+    """Turns tool output lines into (percent, message) progress updates"""
+
+    def feed(self, line: str) -> ProgressUpdate:
+        """Return a progress update for this line, or None if it carries none"""
+        return None
+
+
+class DebootstrapParser(OutputParser):
+    """
+    debootstrap 'I: Retrieving/Unpacking/Configuring <package>' lines
+
+    The package count is only known once retrieval ends, so retrieval progress
+    is measured against expected_packages until then.
+    """
+
+    # Share of the run spent in each phase
+    PHASES = {'retrieve': (0, 45), 'unpack': (45, 70), 'configure': (70, 100)}
+    LINE = re.compile(r'^I: (Retrieving|Validating|Extracting|Unpacking|Configuring) (\S+)')
+
+    def __init__(self, expected_packages: int = 250):
+        self.expected = expected_packages
+        self.retrieved = 0
+        self.unpacked = 0
+        self.configured = 0
+
+    def _phase(self, phase: str, done: int, total: int) -> float:
+        start, end = self.PHASES[phase]
+        return start + (end - start) * min(1.0, done / max(total, 1))
+
+    def feed(self, line: str) -> ProgressUpdate:
+        match = self.LINE.match(line)
+        if not match:
+            return None
+        action, package = match.groups()
+        if package.endswith('...'):
+            package = package[:-3]
+        total = max(self.retrieved, 1)
+        if action == 'Retrieving':
+            # "Retrieving Packages"/"Release" are index files, not packages
+            if package[:1].isupper():
+                return None
+            self.retrieved += 1
+            return (self._phase('retrieve', self.retrieved, max(self.expected, self.retrieved + 1)),
+                    f"Downloading {package}")
+        if action == 'Unpacking':
+            if package in ('required', 'the'):
+                return None
+            self.unpacked += 1
+            return self._phase('unpack', self.unpacked, total), f"Unpacking {package}"
+        if action == 'Configuring':
+            if package in ('required', 'the'):
+                return None
+            self.configured += 1
+            return self._phase('configure', self.configured, total), f"Configuring {package}"
+        return None
+
+
+class AptStatusParser(OutputParser):
+    """apt-get -o APT::Status-Fd=1 'dlstatus:' and 'pmstatus:' lines"""
+
+    def __init__(self, download_share: float = 30):
+        """
+        Args:
+            download_share: Percent of the run attributed to downloading
+        """
+        self.download_share = download_share
+
+    def feed(self, line: str) -> ProgressUpdate:
+        parts = line.split(':', 3)
+        if len(parts) != 4 or parts[0] not in ('dlstatus', 'pmstatus'):
+            return None
+        try:
+            percent = float(parts[2])
+        except ValueError:
+            return None
+        if parts[0] == 'dlstatus':
+            return percent * self.download_share / 100, parts[3].strip()
+        return (self.download_share + percent * (100 - self.download_share) / 100,
+                parts[3].strip())
+
+
+class MksquashfsParser(OutputParser):
+    """mksquashfs -percentage output: one bare percentage per line"""
+
+    def feed(self, line: str) -> ProgressUpdate:
+        line = line.strip()
+        if line.isdigit():
+            return float(line), "Compressing filesystem..."
+        return None
+
+
+class UnsquashfsParser(OutputParser):
+    """unsquashfs progress bar: '[====|    ] 1150/3030  37%'"""
+
+    LINE = re.compile(r'\]\s+(\d+)/(\d+)\s+(\d+)%')
+
+    def feed(self, line: str) -> ProgressUpdate:
+        match = self.LINE.search(line)
+        if match:
+            return float(match.group(3)), "Extracting files..."
+        return None
+
+
+class XorrisoParser(OutputParser):
+    """xorriso 'UPDATE : 12.34% done' lines"""
+
+    LINE = re.compile(r'UPDATE\s*:\s*([\d.]+)% done')
+
+    def feed(self, line: str) -> ProgressUpdate:
+        match = self.LINE.search(line)
+        if match:
+            return float(match.group(1)), "Writing ISO image..."
+        return None
+
+
+def scaled(progress_callback: Callable, start: float, end: float) -> Optional[Callable]:
+    """Map a tool's 0-100 progress into [start, end] of a stage's progress"""
+    if progress_callback is None:
+        return None
+
+    def report(percent, message=None):
+        progress_callback(start + (end - start) * percent / 100, message)
+    return report
+
+
+def output_frames(stream):
+    """
+    Split a tool's output into frames ending at a newline or a carriage return
+
+    Progress bars (mksquashfs, unsquashfs) redraw their line with carriage
+    returns and only end it with a newline once done, so every redraw is a
+    frame of its own. A frame is cut at MAX_LINE_BYTES and the rest of it is
+    read and dropped.
+
+    Yields:
+        (frame, terminator), the terminator being b'\n', b'\r' or b'' at the end
+    """
+    pending = bytearray()
+    overflow = False
+    while True:
+        data = stream.read1(MAX_LINE_BYTES)
+        if not data:
+            break
+        start = 0
+        for match in FRAME_END.finditer(data):
+            if not overflow:
+                pending += data[start:match.start()]
+            yield bytes(pending[:MAX_LINE_BYTES]), match.group()
+            pending.clear()
+            overflow = False
+            start = match.end()
+        if not overflow:
+            pending += data[start:]
+            if len(pending) > MAX_LINE_BYTES:
+                del pending[MAX_LINE_BYTES:]
+                overflow = True
+    if pending:
+        yield bytes(pending), b''
+
+
+def run_tool(cmd: list, parser: OutputParser = None, progress_callback: Callable = None,
+             check: bool = True, echo: bool = False, tail_lines: int = 200,
+             **popen_kwargs) -> subprocess.CompletedProcess:
+    """
+    Run a tool, streaming its combined stdout/stderr through a parser
+
+    Every frame of a redrawn progress line is parsed, but only the line's
+    latest frame is kept. Only the last tail_lines lines, each cut at
+    MAX_LINE_BYTES, are kept, so memory stays flat however much the tool prints.
+
+    Args:
+        cmd: Command to run
+        parser: Turns output lines into progress updates
+        progress_callback: Called with (percent, message) when progress advances
+        check: Raise CalledProcessError on a non-zero exit
+        echo: Print output lines that carry no progress
+
+    Returns:
+        CompletedProcess whose stdout holds the output tail
+    """
+    parser = parser or OutputParser()
+    tail = deque(maxlen=tail_lines)
+    last_percent = -1
+    start = time.monotonic()
+    returncode = None
+    try:
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              stdin=subprocess.DEVNULL, **popen_kwargs) as proc:
+            # Latest non-empty frame of the current line, and whether it carried progress
+            line, progressed = '', False
+            for raw, end in output_frames(proc.stdout):
+                if raw:
+                    line = raw.decode(errors='replace')
+                    update = parser.feed(line)
+                    progressed = update is not None
+                    if update is not None:
+                        percent, message = update
+                        if progress_callback and int(percent) > last_percent:
+                            last_percent = int(percent)
+                            progress_callback(percent, message)
+                if end == b'\r':
+                    continue
+                tail.append(line)
+                if echo and line and not progressed:
+                    print(f"    {line}")
+                line, progressed = '', False
+            returncode = proc.wait()
+    finally:
+        record_command(cmd, returncode, time.monotonic() - start)
+
+    output = '\n'.join(tail)
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output=output)
+    return subprocess.CompletedProcess(cmd, returncode, stdout=output)
@@ -10,83 +10,12 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                               QFileDialog, QGroupBox, QCheckBox, QTreeWidget,
                               QTreeWidgetItem, QProgressBar, QMessageBox,
                               QScrollArea, QFrame)
-from PyQt6.QtCore import Qt, pyqtSignal, QThread
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer
 from PyQt6.QtGui import QFont
 
-
-class ISOAnalyzerThread(QThread):
-    """Background thread for analyzing ISO contents"""
-    progress_update = pyqtSignal(int, str)
-    analysis_complete = pyqtSignal(dict)
-    
-    def __init__(self, iso_path):
-        super().__init__()
-        self.iso_path = iso_path
-        
-    def run(self):
-        """Analyze ISO and extract package information"""
-        try:
-            self.progress_update.emit(10, "Reading ISO metadata...")
-            
-            # Simulate ISO analysis (in real implementation, would parse ISO)
-            import time
-            time.sleep(0.5)
-            
-            self.progress_update.emit(30, "Extracting package list...")
-            time.sleep(0.5)
-            
-            self.progress_update.emit(60, "Categorizing components...")
-            time.sleep(0.5)
-            
-            # Mock data - in real implementation, extract from ISO
-            iso_info = {
-                'path': self.iso_path,
-                'name': Path(self.iso_path).name,
-                'size': os.path.getsize(self.iso_path) if os.path.exists(self.iso_path) else 0,
-                'components': {
-                    'Base System': {
-                        'Linux Kernel': {'size': '250MB', 'required': True},
-                        'System Libraries': {'size': '180MB', 'required': True},
-                        'Init System': {'size': '50MB', 'required': True},
-                    },
-                    'Desktop Environment': {
-                        'MATE Desktop': {'size': '420MB', 'required': False},
-                        'XFCE Desktop': {'size': '380MB', 'required': False},
-                        'KDE Plasma': {'size': '650MB', 'required': False},
-                        'GNOME Desktop': {'size': '720MB', 'required': False},
-                    },
-                    'Security Tools': {
-                        'Debian Security Suite': {'size': '1.2GB', 'required': False},
-                        'Network Analysis': {'size': '450MB', 'required': False},
-                        'Forensics Tools': {'size': '380MB', 'required': False},
-                        'Password Cracking': {'size': '280MB', 'required': False},
-                    },
-                    'Development Tools': {
-                        'GCC/G++ Compilers': {'size': '320MB', 'required': False},
-                        'Python Development': {'size': '180MB', 'required': False},
-                        'Node.js & NPM': {'size': '120MB', 'required': False},
-                        'Git & Version Control': {'size': '85MB', 'required': False},
-                    },
-                    'Gaming Support': {
-                        'Steam': {'size': '450MB', 'required': False},
-                        'Lutris': {'size': '120MB', 'required': False},
-                        'Wine/Proton': {'size': '380MB', 'required': False},
-                        'GPU Drivers': {'size': '520MB', 'required': False},
-                    },
-                    'Productivity': {
-                        'LibreOffice Suite': {'size': '620MB', 'required': False},
-                        'GIMP': {'size': '180MB', 'required': False},
-                        'Inkscape': {'size': '120MB', 'required': False},
-                        'Blender': {'size': '350MB', 'required': False},
-                    },
-                }
-            }
-            
-            self.progress_update.emit(100, "Analysis complete!")
-            self.analysis_complete.emit(iso_info)
-            
-        except Exception as e:
-            self.progress_update.emit(0, f"Error: {str(e)}")
+from analysis_cache import AnalysisCache
+from analysis_service import AnalysisService
+from package_index import component_closure, format_size, installed_size
 
 
 class ISOLoaderWidget(QWidget):
@@ -99,6 +28,13 @@ class ISOLoaderWidget(QWidget):
         super().__init__()
         self.loaded_isos = []  # List of loaded ISO info dicts
         self.selected_components = {}  # Components selected for installation
+        self.analysis_cache = AnalysisCache()
+        # Analyses run in worker processes; the timer collects what they report
+        self.analysis_service = AnalysisService()
+        self.analysis_progress = {}  # ISO path -> percent, for analyses in flight
+        self.analysis_timer = QTimer(self)
+        self.analysis_timer.setInterval(50)
+        self.analysis_timer.timeout.connect(self.poll_analyses)
         self.setup_ui()
         
     def setup_ui(self):
@@ -349,7 +285,7 @@ class ISOLoaderWidget(QWidget):
             return
             
         # Check if already loaded
-        for iso in self.loaded_isos:
+        for iso in self.loaded_isos + [{'path': path} for path in self.analysis_progress]:
             if iso['path'] == iso_path:
                 QMessageBox.information(self, "Already Loaded", "This ISO is already loaded.")
                 return
@@ -387,16 +323,49 @@ class ISOLoaderWidget(QWidget):
         self.iso_loaded.emit(iso_path)
         
     def analyze_iso(self, iso_path):
-        """Analyze ISO in background thread"""
+        """Analyze ISO in a worker process"""
+        # An unchanged ISO seen before needs no analysis at all
+        cached = self.analysis_cache.get(iso_path)
+        if cached is not None:
+            self.on_analysis_complete(cached)
+            return
+            
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
         self.progress_label.setVisible(True)
         self.progress_label.setText("Starting analysis...")
         
-        self.analyzer_thread = ISOAnalyzerThread(iso_path)
-        self.analyzer_thread.progress_update.connect(self.on_analysis_progress)
-        self.analyzer_thread.analysis_complete.connect(self.on_analysis_complete)
-        self.analyzer_thread.start()
+        self.analysis_progress[iso_path] = 0
+        self.analysis_service.submit(iso_path)
+        self.analysis_timer.start()
+        
+    def poll_analyses(self):
+        """Apply what the analysis workers reported since the last poll"""
+        # Stopped while handling, so a message box cannot re-enter the poll
+        self.analysis_timer.stop()
+        for _, iso_path, kind, payload in self.analysis_service.poll():
+            iso_name = Path(iso_path).name
+            if kind == 'progress':
+                self.analysis_progress[iso_path], message = payload
+                overall = sum(self.analysis_progress.values()) // len(self.analysis_progress)
+                self.on_analysis_progress(overall, f"{iso_name}: {message}")
+            elif kind == 'volume' and payload.get('label'):
+                # Show what the ISO is while its packages are still being read
+                for i in range(self.iso_list.count()):
+                    item = self.iso_list.item(i)
+                    if item.data(Qt.ItemDataRole.UserRole) == iso_path:
+                        item.setText(f"📀 ISO #{i+1}: {iso_name} ({payload['label']})")
+            elif kind == 'done':
+                self.analysis_progress.pop(iso_path, None)
+                self.on_analysis_complete(payload)
+            elif kind == 'error':
+                self.analysis_progress.pop(iso_path, None)
+                if not self.analysis_progress:
+                    self.progress_bar.setVisible(False)
+                    self.progress_label.setVisible(False)
+                QMessageBox.warning(self, "Analysis Failed", f"Could not analyze {iso_name}:\n\n{payload}")
+        if self.analysis_service.busy:
+            self.analysis_timer.start()
         
     def on_analysis_progress(self, progress, message):
         """Update progress during ISO analysis"""
@@ -408,6 +377,11 @@ class ISOLoaderWidget(QWidget):
         self.loaded_isos.append(iso_info)
         self.populate_component_tree()
         
+        if self.analysis_progress:
+            # More ISOs are still being analyzed
+            self.progress_label.setText(f"✓ Analyzed {iso_info['name']}")
+            return
+            
         self.progress_bar.setVisible(False)
         self.progress_label.setVisible(False)
         
@@ -424,6 +398,13 @@ class ISOLoaderWidget(QWidget):
         if current_item:
             iso_path = current_item.data(Qt.ItemDataRole.UserRole)
             
+            # Stop its analysis if it is still running
+            if self.analysis_service.cancel(iso_path):
+                self.analysis_progress.pop(iso_path, None)
+                if not self.analysis_progress:
+                    self.progress_bar.setVisible(False)
+                    self.progress_label.setVisible(False)
+            
             # Remove from loaded list
             self.loaded_isos = [iso for iso in self.loaded_isos if iso['path'] != iso_path]
             
@@ -530,6 +511,10 @@ class ISOLoaderWidget(QWidget):
                         comp_item.setCheckState(0, Qt.CheckState.Checked)
                         comp_item.setDisabled(True)
                         comp_item.setToolTip(0, "Required component")
+                    elif not comp_info.get('available', True):
+                        comp_item.setCheckState(0, Qt.CheckState.Unchecked)
+                        comp_item.setDisabled(True)
+                        comp_item.setToolTip(0, "Packages not found on this ISO")
                     else:
                         comp_item.setCheckState(0, Qt.CheckState.Unchecked)
                         
@@ -567,6 +552,7 @@ class ISOLoaderWidget(QWidget):
         """Update the summary label"""
         total_components = 0
         total_size_mb = 0
+        selected_names = []
         
         for i in range(self.component_tree.topLevelItemCount()):
             category = self.component_tree.topLevelItem(i)
@@ -574,6 +560,7 @@ class ISOLoaderWidget(QWidget):
                 component = category.child(j)
                 if component.checkState(0) == Qt.CheckState.Checked:
                     total_components += 1
+                    selected_names.append(component.text(0))
                     size_str = component.text(1)
                     # Parse size (e.g., "250MB", "1.2GB")
                     try:
@@ -590,6 +577,14 @@ class ISOLoaderWidget(QWidget):
             size_str = f"{total_size_mb / 1024:.2f} GB"
         else:
             size_str = f"{total_size_mb:.0f} MB"
+        
+        # With package indexes, shared dependencies are counted once
+        indexed = [iso for iso in self.loaded_isos if iso.get('package_index')]
+        if indexed:
+            base = set().union(*(iso['base_packages'] for iso in indexed))
+            closure = component_closure([iso['package_index'] for iso in indexed],
+                                        selected_names, base)
+            size_str = format_size(installed_size(closure))
             
         self.summary_label.setText(
             f"Total Size: {size_str} | Components: {total_components} selected"
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Variant Builds
+Builds several ISO variants of one base config, running the stages they share once
+"""
+
+import sys
+import json
+import copy
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from build_telemetry import run_command
+from iso_builder_backend import ISOBuilder
+from tool_runner import scaled
+from workspace_manager import WorkspaceManager
+
+
+def merge_config(base: dict, overlay: dict) -> dict:
+    """
+    Apply a variant overlay to a base config
+
+    Nested dicts are merged key by key; any other value replaces the base
+    value, and None removes the key.
+    """
+    merged = copy.deepcopy(base)
+    for key, value in overlay.items():
+        if value is None:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def fork_workspace(source: Path, target: Path):
+    """
+    Copy a workspace, sharing file data with the source where the filesystem allows
+
+    On btrfs and XFS the reflink copy only duplicates metadata; elsewhere it
+    falls back to a full copy. With 'rootfs_overlay' enabled the rootfs is just
+    the overlay upper dir, so even a full copy stays small.
+    """
+    result = run_command(['cp', '-a', '--reflink=auto', str(source), str(target)],
+                         capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not fork workspace {source}: {result.stderr.strip()}")
+
+
+class VariantBuild:
+    """
+    Fan-out build of one base config into several ISO variants
+
+    Every variant's stage graph is fingerprinted; stages whose fingerprints
+    agree across all variants form the shared trunk. The trunk runs once in its
+    own workspace, which is then forked per variant, checkpoints included, so
+    each variant build resumes right where the variants diverge.
+    """
+
+    # Share of overall progress spent on the shared trunk
+    TRUNK_SHARE = 40
+
+    def __init__(self, config: dict, output_dir: str = None):
+        """
+        Initialize variant build
+
+        Args:
+            config: Base build configuration; its 'variants' entry maps each
+                    variant name to a config overlay (see merge_config)
+            output_dir: Output directory for the ISOs (default: ~/heckcheckos-ultimate)
+        """
+        self.base_config = {key: value for key, value in config.items() if key != 'variants'}
+        self.variants = dict(config.get('variants') or {})
+        if not self.variants:
+            raise ValueError("A variant build needs at least one entry in 'variants'")
+        self.output_dir = output_dir
+
+    def variant_configs(self) -> Dict[str, dict]:
+        """Full build config of each variant"""
+        return {name: dict(merge_config(self.base_config, overlay or {}), variant=name)
+                for name, overlay in self.variants.items()}
+
+    def variant_stages(self, work_dir: Path) -> Dict[str, Dict[str, str]]:
+        """Stage fingerprints of each variant"""
+        return {name: ISOBuilder(config, self.output_dir).stage_fingerprints(work_dir)
+                for name, config in self.variant_configs().items()}
+
+    def shared_stages(self, work_dir: Path) -> List[str]:
+        """
+        Stages with the same fingerprint in every variant, in dependency order
+
+        Variant builds run the theme, custom files and self-install after the
+        packages (as a layered build does), so variants that differ only in
+        those share everything up to and including the packages.
+        """
+        fingerprints = list(self.variant_stages(work_dir).values())
+        # A stage's fingerprint covers its upstream, so the shared set is closed
+        return [name for name, value in fingerprints[0].items()
+                if all(other.get(name) == value for other in fingerprints[1:])]
+
+    @staticmethod
+    def _workspace_config(config: dict, work_dir: Path) -> dict:
+        workspace = dict(config.get('workspace', {}), persistent=True, dir=str(work_dir))
+        return dict(config, workspace=workspace)
+
+    def build(self, progress_callback: Callable = None) -> Dict[str, Path]:
+        """
+        Build every variant
+
+        Returns:
+            Dict of variant name to ISO path
+
+        Raises:
+            RuntimeError naming the failed variants, after all variants were tried
+        """
+        workspace = self.base_config.get('workspace', {})
+        manager = WorkspaceManager(workspace.get('base_dir'))
+        root = None
+        if workspace.get('persistent', False):
+            # The trunk is the named workspace and resumes like a normal build
+            trunk = ISOBuilder(self.base_config, self.output_dir).workspace_path
+            forks_dir = trunk.with_name(f"{trunk.name}.variants")
+        else:
+            estimate = ISOBuilder(self.base_config, self.output_dir).estimate_space()
+            # The trunk plus the one fork being built at a time
+            root = manager.create(
+                2 * estimate['workspace'] if workspace.get('preflight', True) else 0,
+                tmpfs=workspace.get('tmpfs', False),
+                ram_fraction=workspace.get('ram_fraction', 0.5)
+            )
+            trunk = root / "shared"
+            forks_dir = root
+        forks_dir.mkdir(parents=True, exist_ok=True)
+        forks = WorkspaceManager(forks_dir)
+        forks.sweep()
+
+        configs = self.variant_configs()
+        outputs = {}
+        failed = {}
+        try:
+            trunk.mkdir(parents=True, exist_ok=True)
+            shared = self.shared_stages(trunk)
+            print(f"[*] Building {len(configs)} variants, sharing {len(shared)} stages: "
+                  f"{', '.join(shared) or 'none'}")
+            if shared:
+                first = next(iter(configs.values()))
+                trunk_config = self._workspace_config(dict(first, variant='shared'), trunk)
+                ISOBuilder(trunk_config, self.output_dir).build(
+                    scaled(progress_callback, 0, self.TRUNK_SHARE), stage_names=shared)
+
+            span = (100 - self.TRUNK_SHARE) / len(configs)
+            for index, (name, config) in enumerate(configs.items()):
+                start = self.TRUNK_SHARE + index * span
+                fork = forks_dir / name
+                if fork.exists():
+                    forks.teardown(fork)
+                print(f"[*] Building variant {name}...")
+                fork_workspace(trunk, fork)
+                # A fork never carries 'fresh' over: it would throw the trunk's work away
+                fork_config = self._workspace_config(config, fork)
+                fork_config['workspace'].pop('fresh', None)
+                try:
+                    outputs[name] = ISOBuilder(fork_config, self.output_dir).build(
+                        scaled(progress_callback, start, start + span))
+                    print(f"✓ Variant {name}: {outputs[name]}")
+                except Exception as e:
+                    print(f"✗ Variant {name} failed: {e}")
+                    failed[name] = e
+                finally:
+                    forks.teardown(fork)
+        finally:
+            if root is not None:
+                manager.teardown(root)
+
+        if failed:
+            raise RuntimeError("Variant build failed for: " +
+                               "; ".join(f"{name} ({error})" for name, error in failed.items()))
+        if progress_callback:
+            progress_callback(100, "All variants built!")
+        return outputs
+
+
+def run_build(config: dict, output_dir: str = None, progress_callback: Callable = None):
+    """
+    Build a config: every variant if it has a 'variants' section, otherwise one ISO
+
+    Returns:
+        ISO path, or dict of variant name to ISO path
+    """
+    if config.get('variants'):
+        return VariantBuild(config, output_dir).build(progress_callback)
+    return ISOBuilder(config, output_dir).build(progress_callback)
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Variant Builds - Build every variant of a config in one run'
+    )
+    parser.add_argument('config', help="Build config JSON with a 'variants' section")
+    parser.add_argument('--output-dir', help='Output directory for the ISOs')
+    parser.add_argument('--plan', action='store_true',
+                        help='Only show which stages the variants share')
+
+    args = parser.parse_args()
+    with open(args.config) as f:
+        config = json.load(f)
+    build = VariantBuild(config, args.output_dir)
+
+    if args.plan:
+        import tempfile
+        with tempfile.TemporaryDirectory() as work_dir:
+            shared = build.shared_stages(Path(work_dir))
+            stages = build.variant_stages(Path(work_dir))
+        print(f"Shared stages: {', '.join(shared) or 'none'}")
+        print("(theme, custom files and self-install run after packages in variant builds)")
+        for name, fingerprints in stages.items():
+            own = [stage for stage in fingerprints if stage not in shared]
+            print(f"  {name}: {', '.join(own) or 'nothing of its own'}")
+        return 0
+
+    for name, path in build.build().items():
+        print(f"✓ {name}: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Heck-CheckOS Workspace Manager
+Build work directories on disk or tmpfs, space preflight and background teardown
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+from build_telemetry import run_command
+
+
+class WorkspaceManager:
+    """Creates and disposes of per-build work directories"""
+
+    TRASH_PREFIX = ".heckcheckos-trash-"
+
+    # Rough sizes used to predict how much space a build needs
+    BASE_ROOTFS_BYTES = 1536 * 1024 ** 2
+    PACKAGE_BYTES = 40 * 1024 ** 2
+    SQUASHFS_RATIO = 0.5
+    # Headroom on top of the prediction, for logs, apt lists and estimate error
+    SAFETY_FACTOR = 1.25
+
+    def __init__(self, base_dir: str = None):
+        """
+        Initialize workspace manager
+
+        Args:
+            base_dir: Parent of on-disk work dirs (default: system temp dir)
+        """
+        self.base_dir = Path(base_dir or tempfile.gettempdir())
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def estimate(cls, package_count: int = 0, base_bytes: int = None,
+                 extra_bytes: int = 0) -> dict:
+        """
+        Predict the space a build needs
+
+        Returns:
+            Dict with 'rootfs', 'workspace' (rootfs plus squashfs) and 'iso' bytes
+        """
+        rootfs = (cls.BASE_ROOTFS_BYTES if base_bytes is None else base_bytes)
+        rootfs += package_count * cls.PACKAGE_BYTES + extra_bytes
+        squashfs = int(rootfs * cls.SQUASHFS_RATIO)
+        return {
+            'rootfs': rootfs,
+            'workspace': int((rootfs + squashfs) * cls.SAFETY_FACTOR),
+            'iso': int(squashfs * cls.SAFETY_FACTOR),
+        }
+
+    @staticmethod
+    def available_memory() -> Optional[int]:
+        """MemAvailable in bytes, or None if unknown"""
+        try:
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) * 1024
+        except (OSError, ValueError):
+            pass
+        return None
+
+    @staticmethod
+    def preflight(path: Path, required_bytes: int, purpose: str = "build"):
+        """Fail early if the filesystem holding path cannot fit required_bytes"""
+        free = shutil.disk_usage(path).free
+        if free < required_bytes:
+            raise RuntimeError(
+                f"Not enough space for the {purpose} in {path}: "
+                f"{free / 1024 ** 3:.1f} GB free, about {required_bytes / 1024 ** 3:.1f} GB needed"
+            )
+
+    def create(self, required_bytes: int, tmpfs: bool = False, ram_fraction: float = 0.5) -> Path:
+        """
+        Create a work directory, in RAM if requested and it fits
+
+        Args:
+            required_bytes: Predicted workspace size
+            tmpfs: Back the work dir with tmpfs
+            ram_fraction: Share of available RAM a tmpfs workspace may use
+
+        Returns:
+            Path of the new work directory
+        """
+        self.sweep()
+        work_dir = Path(tempfile.mkdtemp(prefix="heckcheckos-build-", dir=self.base_dir))
+
+        if tmpfs:
+            available = self.available_memory()
+            budget = int(available * ram_fraction) if available else 0
+            if budget >= required_bytes:
+                result = run_command(['mount', '-t', 'tmpfs', '-o',
+                                      f'size={required_bytes},mode=0755',
+                                      'heckcheckos-build', str(work_dir)],
+                                     capture_output=True, text=True)
+                if result.returncode == 0:
+                    print(f"  ✓ Workspace in RAM ({required_bytes / 1024 ** 3:.1f} GB tmpfs)")
+                    return work_dir
+                print(f"  ⚠ Could not mount tmpfs, using disk: {result.stderr.strip()}")
+            else:
+                print(f"  ⚠ Build needs ~{required_bytes / 1024 ** 3:.1f} GB but the RAM budget is "
+                      f"{budget / 1024 ** 3:.1f} GB, using disk")
+
+        try:
+            self.preflight(work_dir, required_bytes)
+        except RuntimeError:
+            work_dir.rmdir()
+            raise
+        return work_dir
+
+    def teardown(self, work_dir: Path, background: bool = True):
+        """
+        Dispose of a work directory without making the caller wait
+
+        tmpfs workspaces are simply unmounted. On disk, the directory is renamed
+        aside (instant) and a detached 'rm' deletes it, so it finishes even if
+        the GUI exits first.
+        """
+        work_dir = Path(work_dir)
+        if not work_dir.exists():
+            return
+        if os.path.ismount(work_dir):
+            if run_command(['umount', str(work_dir)]).returncode == 0:
+                work_dir.rmdir()
+                return
+            run_command(['umount', '--lazy', str(work_dir)], check=False)
+
+        trash = work_dir.with_name(f"{self.TRASH_PREFIX}{work_dir.name}")
+        os.rename(work_dir, trash)
+        self._delete(trash, background)
+
+    def _delete(self, path: Path, background: bool):
+        # --one-file-system: never follow a leftover bind mount (/dev, /proc) out of the tree
+        cmd = ['rm', '-rf', '--one-file-system', str(path)]
+        if background:
+            subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL, start_new_session=True)
+        else:
+            run_command(cmd, check=False)
+
+    def sweep(self, background: bool = True) -> int:
+        """Delete trash left by teardowns that were interrupted"""
+        leftovers = list(self.base_dir.glob(f"{self.TRASH_PREFIX}*"))
+        for trash in leftovers:
+            self._delete(trash, background)
+        return len(leftovers)
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Heck-CheckOS Workspace Manager - Estimate build space and clean up old workspaces'
+    )
+    parser.add_argument('--base-dir', help='Parent of build work dirs (default: system temp dir)')
+    parser.add_argument('--packages', type=int, default=0, help='Number of extra packages to estimate for')
+    parser.add_argument('--sweep', action='store_true', help='Delete leftover workspaces now')
+
+    args = parser.parse_args()
+    manager = WorkspaceManager(args.base_dir)
+
+    if args.sweep:
+        print(f"✓ Removed {manager.sweep(background=False)} leftover workspace(s)")
+        return 0
+
+    estimate = WorkspaceManager.estimate(args.packages)
+    free = shutil.disk_usage(manager.base_dir).free
+    available = WorkspaceManager.available_memory()
+    print(f"Estimated rootfs:    {estimate['rootfs'] / 1024 ** 3:.1f} GB")
+    print(f"Estimated workspace: {estimate['workspace'] / 1024 ** 3:.1f} GB")
+    print(f"Free in {manager.base_dir}: {free / 1024 ** 3:.1f} GB")
+    if available is not None:
+        print(f"Available RAM:       {available / 1024 ** 3:.1f} GB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())